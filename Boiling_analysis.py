@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:47:09 2026
+
+Boiling curve analysis
+Takes the SS files generated by the control software during hot runs, and outputs the boiling curve of each run:
+the average wall temperature, heat flux, heat transfer coefficient and pressure drop at each power step, with
+their uncertainties.
+
+Works on every hot-run folder (chip_fw_50ml_min, chip_bw_30ml_min_12, ...) in the Data folder at once:
+    - SS files are read in chunks of --chunk rows, and only the columns needed are read, so memory use doesn't
+      grow with the size of the logs. Only running statistics are kept for each step.
+    - a new step begins whenever the PSU setpoint changes
+    - for every row, the total heater power, mean wall temperature, heat flux and HTC are calculated from the
+      heater columns (H1.Q, H1.T, ...), the inlet temperature (TC1.T) and the heated area
+    - folders are worked on in parallel, one process each (--workers)
+Writes <folder>_boiling_curve.csv into each folder, plus boiling_curves.csv (every step of every run, with chip,
+direction and flowrate) in the Data folder.
+
+Uncertainties are the standard error of the mean of each step (std/sqrt(n)); instrument errors are not included.
+
+Usage:
+    python Boiling_analysis.py --area 0.5                 # heated area in cm2
+    python Boiling_analysis.py --area 0.5 --data D:/Data --workers 4 --chunk 200000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Hot-run folders, as named by __main__ and the campaign
+FOLDER_PATTERN=re.compile(r'^(?P<chip>[^_]+)_(?P<direction>fw|bw)_(?P<flowrate>[\d.]+)ml_min(_(?P<limit>\d+))?$')
+HEATER_COLUMN=re.compile(r'^H\d+\.[QT]$')
+
+STEP_COLUMN='PSU.SP'
+INLET_COLUMN='TC1.T'
+OTHER_COLUMNS=['t','dP.P','PUMP.SP']
+
+def default_folder():
+    # Operates on 'Data' folder in same path as itself.
+    root=(os.path.abspath(os.curdir)).split('Analysis')[0]
+    return os.path.join(root,'Data')
+
+def ss_files(folder):
+    # SS_1.csv, SS_2.csv, ... in the order they were written
+    files=[file for file in os.listdir(folder) if re.match(r'^SS_\d+\.csv$',file)]
+    return [os.path.join(folder,file) for file in sorted(files,key=lambda file: int(re.findall(r'\d+',file)[0]))]
+
+def derive(chunk, heaters, area):
+    # Per-row wall temperature, power, heat flux and HTC, all columns at once
+    Q=chunk[[heater+'.Q' for heater in heaters]].to_numpy()
+    T=chunk[[heater+'.T' for heater in heaters]].to_numpy()
+
+    derived=pd.DataFrame(index=chunk.index)
+    derived['Q_total [W]']=Q.sum(axis=1)
+    derived['T_wall [C]']=T.mean(axis=1)
+    derived['q [W/cm2]']=derived['Q_total [W]']/area
+    derived['dT_wall [K]']=derived['T_wall [C]']-chunk[INLET_COLUMN]
+    # q in W/m2, so h in W/m2K. No h where the wall is at the inlet temperature (rather than inf).
+    dT_wall=derived['dT_wall [K]'].where(derived['dT_wall [K]']!=0)
+    derived['h [W/m2K]']=derived['q [W/cm2]']*1e4/dT_wall
+
+    for column in [INLET_COLUMN]+[column for column in OTHER_COLUMNS if column!='t']:
+        if column in chunk.columns:
+            derived[column]=chunk[column]
+    for heater in heaters:
+        derived[heater+'.T']=chunk[heater+'.T']
+    return derived
+
+class step_sums(object):
+    # Running count, mean and sum of squared deviations (M2) of every column for each step. Stays small however long
+    # the logs are.
+    def __init__(self):
+        self.count=None
+        self.mean=None
+        self.M2=None
+        self.t_start=None
+        self.t_end=None
+        self.setpoints=None
+
+        self.block=0
+        self.last_setpoint=None
+
+    def label_steps(self, setpoints):
+        # A new step starts wherever the setpoint changes, carrying on from the end of the last chunk
+        previous=np.concatenate([[self.last_setpoint if self.last_setpoint is not None else np.nan],setpoints[:-1]])
+        changed=setpoints!=previous
+        blocks=self.block+np.cumsum(changed)
+        self.block=int(blocks[-1])
+        self.last_setpoint=setpoints[-1]
+        return blocks
+
+    def add(self, derived, blocks, setpoints, t):
+        grouped=derived.groupby(blocks)
+        count=grouped.count()
+        mean=grouped.mean()
+        M2=grouped.var(ddof=0)*count
+        t_start=t.groupby(blocks).min()
+        t_end=t.groupby(blocks).max()
+        setpoint=setpoints.groupby(blocks).first()
+
+        if self.count is None:
+            self.count, self.mean, self.M2=count, mean, M2
+            self.t_start, self.t_end, self.setpoints=t_start, t_end, setpoint
+        else:
+            # A step can run across two chunks. Their statistics are combined with Chan's update, which (unlike the
+            # sum of squares less n*mean^2) doesn't lose precision when the spread is small next to the mean.
+            index=self.count.index.union(count.index)
+            n_a, mean_a, M2_a=[frame.reindex(index).fillna(0) for frame in (self.count,self.mean,self.M2)]
+            n_b, mean_b, M2_b=[frame.reindex(index).fillna(0) for frame in (count,mean,M2)]
+            n=n_a+n_b
+            delta=mean_b-mean_a
+            self.count=n
+            self.mean=mean_a+delta*n_b/n
+            self.M2=M2_a+M2_b+delta**2*n_a*n_b/n
+            self.t_start=pd.concat([self.t_start,t_start]).groupby(level=0).min()
+            self.t_end=pd.concat([self.t_end,t_end]).groupby(level=0).max()
+            self.setpoints=pd.concat([self.setpoints,setpoint]).groupby(level=0).first()
+
+    def table(self):
+        mean=self.mean
+        # No spread from a single row
+        variance=(self.M2/(self.count-1)).where(self.count>=2)
+        sem=np.sqrt(variance/self.count)
+
+        table=pd.DataFrame({'step':np.arange(1,len(mean)+1),STEP_COLUMN:self.setpoints,
+                            'n':self.count.max(axis=1).astype(int),'t_start':self.t_start,'t_end':self.t_end},index=mean.index)
+        for column in mean.columns:
+            table[column]=mean[column]
+            table['U_'+column]=sem[column]
+        return table.reset_index(drop=True)
+
+def analyse(folder, area, chunk_size):
+    # Boiling curve of one run. Runs in a worker process.
+    name=os.path.basename(os.path.normpath(folder))
+    timings={'folder':name,'rows':0}
+    start=time.perf_counter()
+
+    files=ss_files(folder)
+    if len(files)==0:
+        return name, None, timings, f'{name}: no SS files'
+
+    # Only the columns used are read
+    header=pd.read_csv(files[0],nrows=0).columns
+    heaters=sorted({column.split('.')[0] for column in header if HEATER_COLUMN.match(column)})
+    heaters=[heater for heater in heaters if heater+'.Q' in header and heater+'.T' in header]
+    missing=[column for column in (STEP_COLUMN,INLET_COLUMN) if column not in header]
+    if len(heaters)==0 or len(missing)>0:
+        return name, None, timings, f'{name}: SS files have no heater columns or no {missing}'
+    wanted=set([STEP_COLUMN,INLET_COLUMN]+OTHER_COLUMNS+[heater+'.'+attr for heater in heaters for attr in 'QT'])
+
+    sums=step_sums()
+    for file in files:
+        for chunk in pd.read_csv(file,usecols=lambda column: column in wanted,chunksize=chunk_size):
+            # Repeated headers and broken lines become NaN and are dropped
+            chunk=chunk.apply(pd.to_numeric,errors='coerce').dropna(subset=[STEP_COLUMN])
+            if len(chunk)==0:
+                continue
+            timings['rows']+=len(chunk)
+
+            blocks=sums.label_steps(chunk[STEP_COLUMN].to_numpy())
+            sums.add(derive(chunk,heaters,area),blocks,chunk[STEP_COLUMN],chunk['t'])
+
+    if sums.count is None:
+        return name, None, timings, f'{name}: SS files are empty'
+
+    table=sums.table()
+    table.insert(0,'folder',name)
+    match=FOLDER_PATTERN.match(name)
+    table.insert(1,'chip',match['chip'])
+    table.insert(2,'direction',match['direction'])
+    table.insert(3,'flowrate [ml/min]',float(match['flowrate']))
+
+    file_name=''.join([name,'_boiling_curve.csv'])
+    try:
+        table.to_csv(os.path.join(folder,file_name),index=False)
+        report=f'{file_name} written: {len(table)} steps from {timings["rows"]} rows.'
+    except OSError:
+        report=f'{file_name} failed to write...'
+
+    timings['time_s']=time.perf_counter()-start
+    return name, table, timings, report
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Calculate the boiling curve of every hot run.')
+    parser.add_argument('--area',type=float,required=True,help='heated area [cm2]')
+    parser.add_argument('--data',default=default_folder(),help='folder holding one folder per run')
+    parser.add_argument('--workers',type=int,default=None,help='processes to use (default: one per CPU)')
+    parser.add_argument('--chunk',type=int,default=100000,help='rows read at a time')
+    args=parser.parse_args(argv)
+
+    folders=sorted(f.path for f in os.scandir(args.data) if f.is_dir() and FOLDER_PATTERN.match(f.name))
+    if len(folders)==0:
+        print(f'No hot-run folders in {args.data}')
+        return 1
+
+    start=time.perf_counter()
+    tables=[]
+    timings=[]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for name, table, timing, report in pool.map(analyse,folders,[args.area]*len(folders),
+                                                    [args.chunk]*len(folders)):
+            print(report)
+            timings.append(timing)
+            if table is not None:
+                tables.append(table)
+    total=time.perf_counter()-start
+
+    if len(tables)>0:
+        curves=pd.concat(tables,ignore_index=True)
+        curves.to_csv(os.path.join(args.data,'boiling_curves.csv'),index=False)
+        print(f'\nboiling_curves.csv written: {len(curves)} steps from {len(tables)} runs.')
+
+    timings=pd.DataFrame(timings).set_index('folder')
+    print('\nTimings:\n'+timings.round(3).to_string())
+    print(f'{len(folders)} runs in {total:.2f} s')
+    return 0
+
+if __name__=='__main__':
+    sys.exit(main())
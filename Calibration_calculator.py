@@ -5,13 +5,35 @@ Created on Wed Nov 17 00:50:28 2021
 RTD calibration calculator
 Simply takes the files generated by the control software on calibration mode, and outputs summary file containing TCRs of each RTD.
 
+Works on every calibration folder ('cal' in the name) in the Data folder at once:
+    - all USS files of a chip are read and joined in one go, then converted and sorted once
+    - the line through (R, T) is fitted for all heaters of a chip at once, with closed-form Deming regression
+      (errors in both R and T, as ODR did). The error bounds come from the same two perturbed fits as before,
+      also done for all heaters at once.
+    - chips are worked on in parallel, one process each (--workers)
+Writes the usual <chip>_summary.csv into each chip's folder, plus TCR_summary.csv (one row per chip and heater)
+in the Data folder, and prints how long each chip took. With --store, the results are also added to the calibration
+store (calibrations.sqlite in the Data folder, or the file given), from which the control code's heaters read them.
+
+Usage:
+    python Calibration_calculator.py                    # Data folder next to this one
+    python Calibration_calculator.py --data D:/Data --workers 4
+    python Calibration_calculator.py --compare-odr      # also run scipy's ODR on each heater, to check the fit
+    python Calibration_calculator.py --store            # also add the results to the calibration store
+
 @author: ccsalmean
 """
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from numpy import polyfit
-from scipy.odr import *
+
+# The calibration store belongs to the control code, and is only imported (through its package) with --store
+CONTROL_CODE=os.path.join(os.path.dirname(os.path.abspath(__file__)),'Flow Boiling Control Code')
 
 pd.options.mode.chained_assignment = None  # default='warn'
 
@@ -20,127 +42,217 @@ pd.options.mode.chained_assignment = None  # default='warn'
 # Highlights silly values (i.e. lost connection)
 # Generates slope, intercept, rsq, p-value and st error of each.
 
-# Operates on 'Data' folder in same path as itself.
-root=(os.path.abspath(os.curdir)).split('Analysis')[0]
-folder=os.path.join(root,'Data')
-
-projects = [f.path for f in os.scandir(folder) if f.is_dir()]
-
 TC_error=0.1 # abs error in degC
+R_error=0.000025 # relative error in resistance measurement
 
-# Define a function (quadratic in our case) to fit the data with.
+# Define a function (linear in our case) to fit the data with.
 def lin_func(p, x):
      m, c = p
      return m*x + c
 
-for project in projects:
-    chip_name=project.split('_')[0]
-    # Only operates on files which have 'cal' in their names
-    if 'cal' in project:
-        print('\n*********************************************\n',project)
-        # We will just attempt to overwrite them all anyway, if they do exist.
-        filelist=[file for file in os.listdir(project) if (file.endswith('.csv'
-                        )) and ('USS' in file)]
-            
-        RTDdata=pd.DataFrame()
-        for file in filelist:
-            RTDdata=pd.concat([RTDdata,pd.read_csv(os.path.join(project,file))]).apply(pd.to_numeric, errors='coerce').sort_values('TC1.T')
-                
-        chip_name = project.split('\\')[-1]
-        file_name=''.join([chip_name,'_summary'+'.csv'])
-        complete_name=os.path.join(project,file_name)
-    
-        # isolate the column containing temperature information
-        ys=list(RTDdata['TC1.T'])
-        y = np.array(ys)
-        y_err = np.full(np.shape(y),TC_error) # degrees error in thermocouple measurement
-    
-        # Isolate the columns which contain resistance measurements
-        Rcols=[col for col in RTDdata.columns if (col[-1] == 'R' and 'RTD' not in col)]
-        Rdata=RTDdata[Rcols]
-        
-        results=pd.DataFrame()
-        results['Var']=pd.Series(['m','c','U_m [%]','U_c [%]' ])
-        
-        summarystring=''
-        
-        for col in Rdata.columns:
-            print('_____________________________\n')
-            x=np.array(Rdata[col])
-            x_err = np.array([0.000025*i for i in x])
-
-            # find slope in best and worst case scenarios
-            # 1: unaltered
-
-            # Create a model for fitting.
-            lin_model = Model(lin_func)
-            
-            # Create a RealData object using our initiated data from above.
-            data = RealData(x, y, sx=x_err, sy=y_err)
-            
-            # Set up ODR with the model and data.
-            odr = ODR(data, lin_model, beta0=[0., 1.])
-            
-            # Run the regression.
-            out = odr.run()
-            
-            # parameters and uncertainties 
-            params_a= out.beta
-            unca=np.sqrt(np.diag(out.cov_beta * out.res_var))
-            # print(f'Unaltered: {params_a},\nUnc: {unca}')
-            
-            # Now alter in one direction:
-            new_x=x.copy()
-            new_x[x<np.mean(x)]-=x_err[x<np.mean(x)]
-            new_x[x>np.mean(x)]+=x_err[x>np.mean(x)]
-            
-            new_y=y.copy()
-            new_y[y<np.mean(y)]+=TC_error
-            new_y[y>np.mean(y)]-=TC_error
-            
-            params_b = polyfit(new_x,new_y,1)
-            # print(f'Low: {params_b}')
-            
-            # Now alter in other direction:
-            new_x=x.copy()
-            new_x[x<np.mean(x)]+=x_err[x<np.mean(x)]
-            new_x[x>np.mean(x)]-=x_err[x>np.mean(x)]
-            
-            new_y=y.copy()
-            new_y[y<np.mean(y)]-=TC_error
-            new_y[y>np.mean(y)]+TC_error
-            
-            params_c = polyfit(new_x,new_y,1)
-            
-            # print(f'High: {params_c}')
-            
-            m_diff=100*(params_c[0]-params_b[0])/(2*params_a[0])
-            c_diff=100*(params_c[1]-params_b[1])/(2*params_a[1])
-            
-            print(f'\n{col} Summary:\nm: {np.round(params_a[0],4)} ',u"\u00B1",
-                  f' {np.round(m_diff,4)} %,\nc: {np.round(params_a[1],4)} ',
-                  u"\u00B1",f' {np.round(c_diff,4)} %')
-            
-            results[col]=pd.Series([params_a[0],params_a[1],m_diff,c_diff])
-            
-            heater=col.split('.')[0]
-            summarystring+=(heater+'_b:'+str(params_a[0])+','
-                            +heater+'_c:'+str(params_a[1])+',')
-            
-        results['Average']=np.mean(results[Rcols],axis=1)
-        
-        df_new = pd.DataFrame({'Average':[summarystring]})
+def default_folder():
+    # Operates on 'Data' folder in same path as itself.
+    root=(os.path.abspath(os.curdir)).split('Analysis')[0]
+    return os.path.join(root,'Data')
+
+def read_project(project):
+    # All USS files of one calibration, read and joined at once
+    filelist=sorted(file for file in os.listdir(project) if (file.endswith('.csv')) and ('USS' in file))
+    if len(filelist)==0:
+        return pd.DataFrame()
+
+    RTDdata=pd.concat([pd.read_csv(os.path.join(project,file)) for file in filelist],ignore_index=True)
+    return RTDdata.apply(pd.to_numeric, errors='coerce').sort_values('TC1.T')
+
+def column_means(X, valid):
+    # Mean of each column, counting only the valid rows
+    return np.where(valid,X,0).sum(axis=0)/valid.sum(axis=0)
+
+def deming(X, Y, delta, valid):
+    # Closed-form Deming regression of every column of Y on the same column of X at once.
+    # delta is the ratio of the y error variance to the x error variance, one per column.
+    # Rows which aren't valid (missing readings) are left out of that column only.
+    n=valid.sum(axis=0)
+    x_mean=column_means(X,valid)
+    y_mean=column_means(Y,valid)
+    dx=np.where(valid,X-x_mean,0)
+    dy=np.where(valid,Y-y_mean,0)
+
+    sxx=(dx*dx).sum(axis=0)/(n-1)
+    syy=(dy*dy).sum(axis=0)/(n-1)
+    sxy=(dx*dy).sum(axis=0)/(n-1)
+
+    m=(syy-delta*sxx+np.sqrt((syy-delta*sxx)**2+4*delta*sxy**2))/(2*sxy)
+    c=y_mean-m*x_mean
+    return m, c
+
+def least_squares(X, Y, valid):
+    # Ordinary least squares line through every column at once (as polyfit(x,y,1), column by column)
+    x_mean=column_means(X,valid)
+    y_mean=column_means(Y,valid)
+    dx=np.where(valid,X-x_mean,0)
+    dy=np.where(valid,Y-y_mean,0)
+
+    m=(dx*dy).sum(axis=0)/(dx*dx).sum(axis=0)
+    c=y_mean-m*x_mean
+    return m, c
+
+def perturbed(X, Y, X_err, valid, direction):
+    # Pushes the points apart (direction=1) or together (direction=-1) by their errors, to find the steepest and
+    # shallowest lines the errors allow.
+    x_mean=column_means(X,valid)
+    y_mean=column_means(Y,valid)
+    new_X=X-direction*np.sign(x_mean-X)*X_err
+    new_Y=Y+direction*np.sign(y_mean-Y)*TC_error
+    return least_squares(new_X,new_Y,valid)
+
+def fit_heaters(RTDdata, Rcols):
+    # isolate the column containing temperature information, and the columns which contain resistance measurements
+    X=RTDdata[Rcols].to_numpy(dtype=float)
+    y=RTDdata['TC1.T'].to_numpy(dtype=float)
+    Y=np.repeat(y[:,None],len(Rcols),axis=1)
+    valid=~(np.isnan(X)|np.isnan(Y))
+
+    X_err=R_error*np.abs(X)
+
+    # Deming needs one error ratio per heater. Resistance errors are relative, so the mean error is used.
+    delta=TC_error**2/column_means(X_err**2,valid)
+    m, c=deming(X,Y,delta,valid)
+
+    # find slope in best and worst case scenarios
+    m_b, c_b=perturbed(X,Y,X_err,valid,1)
+    m_c, c_c=perturbed(X,Y,X_err,valid,-1)
+
+    m_diff=100*(m_c-m_b)/(2*m)
+    c_diff=100*(c_c-c_b)/(2*c)
+    return m, c, m_diff, c_diff
+
+def odr_fit(x, y):
+    # scipy ODR fit of one heater, as this calculator used to do. Only used to check the closed-form fit.
+    from scipy.odr import Model, ODR, RealData
+
+    valid=~(np.isnan(x)|np.isnan(y))
+    x, y=x[valid], y[valid]
+    data = RealData(x, y, sx=R_error*np.abs(x), sy=np.full(np.shape(y),TC_error))
+    out = ODR(data, Model(lin_func), beta0=[0., 1.]).run()
+    return out.beta
+
+def calibrate(project, compare_odr=False):
+    # Fit every heater of one chip and write its summary file. Runs in a worker process.
+    timings={'chip':os.path.basename(os.path.normpath(project))}
+    chip_name=timings['chip']
+    start=time.perf_counter()
+
+    RTDdata=read_project(project)
+    timings['read_s']=time.perf_counter()-start
+    timings['rows']=len(RTDdata)
+    if len(RTDdata)==0:
+        return chip_name, None, timings, f'{chip_name}: no USS files'
+
+    # Isolate the columns which contain resistance measurements
+    Rcols=[col for col in RTDdata.columns if (col[-1] == 'R' and 'RTD' not in col)]
+
+    start=time.perf_counter()
+    m, c, m_diff, c_diff=fit_heaters(RTDdata,Rcols)
+    timings['fit_s']=time.perf_counter()-start
+
+    lines=['\n*********************************************\n'+project]
+    results=pd.DataFrame()
+    results['Var']=pd.Series(['m','c','U_m [%]','U_c [%]' ])
+
+    summarystring=''
+    table=[]
+    for number, col in enumerate(Rcols):
+        lines.append(f'{col}: m: {np.round(m[number],4)} '+u"\u00B1"+f' {np.round(m_diff[number],4)} %, '
+                     f'c: {np.round(c[number],4)} '+u"\u00B1"+f' {np.round(c_diff[number],4)} %')
+
+        results[col]=pd.Series([m[number],c[number],m_diff[number],c_diff[number]])
+
+        heater=col.split('.')[0]
+        summarystring+=(heater+'_b:'+str(m[number])+','
+                        +heater+'_c:'+str(c[number])+',')
+        table.append({'chip':chip_name,'heater':heater,'m':m[number],'c':c[number],
+                      'U_m [%]':m_diff[number],'U_c [%]':c_diff[number]})
+
+    if compare_odr:
+        start=time.perf_counter()
+        y=RTDdata['TC1.T'].to_numpy(dtype=float)
+        for number, col in enumerate(Rcols):
+            m_odr, c_odr=odr_fit(RTDdata[col].to_numpy(dtype=float),y)
+            table[number]['m_odr']=m_odr
+            table[number]['c_odr']=c_odr
+        timings['odr_s']=time.perf_counter()-start
+
+    results['Average']=np.mean(results[Rcols],axis=1)
+
+    df_new = pd.DataFrame({'Average':[summarystring]})
+
+    results = (pd.concat([results, df_new], ignore_index=True)
+              .reindex(columns=results.columns)
+              .fillna(0))
+
+    file_name=''.join([chip_name,'_summary'+'.csv'])
+    complete_name=os.path.join(project,file_name)
+
+    start=time.perf_counter()
+    try:
+        results.to_csv(complete_name, mode = 'w')
+        lines.append(f'{file_name} written.')
+    except OSError:
+        lines.append(f'{file_name} failed to write...')
+    timings['write_s']=time.perf_counter()-start
+
+    return chip_name, pd.DataFrame(table), timings, '\n'.join(lines)
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Calculate the TCR of every heater of every calibrated chip.')
+    parser.add_argument('--data',default=default_folder(),help='folder holding one folder per calibration')
+    parser.add_argument('--workers',type=int,default=None,help='processes to use (default: one per CPU)')
+    parser.add_argument('--compare-odr',action='store_true',help='also fit with scipy ODR, and time it')
+    parser.add_argument('--store',nargs='?',const='',default=None,
+                        help='add the results to the calibration store: this file, or calibrations.sqlite in the data folder')
+    args=parser.parse_args(argv)
+
+    # Only operates on folders which have 'cal' in their names
+    projects=sorted(f.path for f in os.scandir(args.data) if f.is_dir() and 'cal' in f.name)
+    if len(projects)==0:
+        print(f'No calibration folders in {args.data}')
+        return 1
+
+    start=time.perf_counter()
+    tables=[]
+    timings=[]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for chip_name, table, timing, report in pool.map(calibrate,projects,[args.compare_odr]*len(projects)):
+            print(report)
+            timings.append(timing)
+            if table is not None:
+                tables.append(table)
+    total=time.perf_counter()-start
+
+    if len(tables)>0:
+        summary=pd.concat(tables,ignore_index=True)
+        complete_name=os.path.join(args.data,'TCR_summary.csv')
+        summary.to_csv(complete_name,index=False)
+        print(f'\nTCR_summary.csv written: {len(summary)} heaters on {len(tables)} chips.')
 
-        results = (pd.concat([results, df_new], ignore_index=True)
-                  .reindex(columns=results.columns)
-                  .fillna(0, downcast='infer'))
+    if args.store is not None and len(tables)>0:
+        if CONTROL_CODE not in sys.path:
+            sys.path.append(CONTROL_CODE)
+        from core.calibration_store import STORE_NAME, calibration_store, chip_name as store_chip_name
         
+        store=calibration_store(args.store if args.store!='' else os.path.join(args.data,STORE_NAME))
+        for table in tables:
+            coefficients={row['heater']:{'a':0,'b':row['m'],'c':row['c'],'offset':0,
+                                         'U_b [%]':row['U_m [%]'],'U_c [%]':row['U_c [%]']}
+                          for row in table.to_dict('records')}
+            store.write(store_chip_name(table['chip'].iloc[0]),coefficients,source='Calibration_calculator')
+        print(f'Added to calibration store {store.path}')
 
-        file_name=''.join([chip_name,'_summary'+'.csv'])
-        complete_name=os.path.join(project,file_name)
+    timings=pd.DataFrame(timings).set_index('chip')
+    print('\nTimings [s]:\n'+timings.round(4).to_string())
+    print(f'{len(projects)} chips in {total:.2f} s')
+    return 0
 
-        try:
-            results.to_csv(complete_name, mode = 'w')
-            print(f'{file_name} written.')
-        except:
-            print(f'{file_name} failed to write...')
+if __name__=='__main__':
+    sys.exit(main())
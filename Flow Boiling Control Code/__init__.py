@@ -9,6 +9,6 @@ sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
 from core import *
 from modules import *
-from interface import *
 from config import *
-from hardware import *
\ No newline at end of file
+
+# Hardware and interface classes are loaded by name when needed: see core/registry.py
\ No newline at end of file
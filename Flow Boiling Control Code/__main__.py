@@ -5,124 +5,84 @@ Created on Tue Sep 14 13:04:17 2021
 Main control code for Flow boiling experiments
 Most functions are carried out in adjoining scripts. This script just ties everything together.
 
+Run with no arguments, it asks about the run (save, chip, dummy, mode...) and turns the answers into a run
+specification, which is checked and run in the same way as launcher.py does with a file (see config/run_spec.py).
+Answers which don't fit are reported together, as for a file. --check on its own stops once the answers have been
+checked. Given specification files, it is launcher.py:
+    python . --check
+    python . runs/chip3.toml --check
+
+Objects aren't put into the console. During a run, look at them with the keylogger or command server 'get'
+(see core/commands.py). In a console already running an event loop, the run is a task whose result is the
+manager, so afterwards objects can be found with man.find(name).
+
 @author: Chris
 """
 
 """
 Imports
 """
-import matplotlib
-matplotlib.use('Qt5Agg')
-import matplotlib.pyplot as plt
-from __init__ import *
+import os
+import sys
 import time
+startup=time.perf_counter()
+
+from __init__ import *
+from launcher import execute, main as launch
+print(f'Imports took {time.perf_counter()-startup:.2f} s')
+
+MODES={'M':'manual','C':'calibration','E':'experiment','F':'friction'}
+
+def yes_no(answer):
+    # Anything other than y/n is left as it is, for the specification check to report
+    return {'Y':True,'N':False}.get(answer.upper(),answer)
+
+def questions():
+    """
+    Setup
+    - Ask user to determine specific details of this run so logger and control software can act accordingly
+    """
+    spec={}
+    spec['save']=yes_no(input('Save results?\n[y/n]\n'))
+    spec['name']=input('Chip name?\n') if spec['save']==True else 'plc'
+    spec['chip']=spec['name']
+    spec['dummy']=yes_no(input('Dummy run?\n[y/n]\n'))
 
-"""
-Setup
-- Ask user to determine specific details of this run so logger and control software can act accordingly""" 
-while True:
-    save=input('Save results?\n[y/n]\n')
-    if save.upper()=='Y':
-        save=True
-        chip_name=input('Chip name?\n')
-        break
-    
-    elif save.upper()=='N':
-        save=False
-        chip_name='plc'
-        break
-    
-    else:
-        print('Please choose from the options above.')
-        continue
-
-while True:
-    dummy=input('Dummy run?\n[y/n]\n')
-    if dummy.upper()=='Y':
-        dummy=True
-        break
-    
-    elif dummy.upper()=='N':
-        dummy=False
-        break
-    else:
-        print('Please choose from the options above.')
-        continue
-
-while True:
     mode=input('Mode?\n[M: Manual control only\nC: Calibration\nE: Experimental run\nF: Friction]\n')
-    if mode.upper() == 'E':
-        while True:
-            flowrate=input('Intended flowrate? [ml/min]\n')
-            direction=input('Flow direction? [fw/bw/n]\n')
-            
-            if direction.upper() == 'N':
-                folder_name=''.join([chip_name,"_fw_",flowrate,"ml_min"])
-                break
-            elif direction.upper() == 'FW' or direction.upper() == 'BW':
-                folder_name=''.join([chip_name,"_",direction,"_",flowrate,"ml_min"])
-                break
-            else:
-                print('Please choose from the options above.')
-                continue
-        
-        configurator=exp_config_dictionary(save,folder_name,dummy)
-        break
-
-    elif mode.upper() == 'C':
-        folder_name=''.join([chip_name,"_cal"])
-        configurator=cal_config_dictionary(save,folder_name,dummy)
-        print(f'Calibration started at {time.asctime()}')
-        break
-    
-    elif mode.upper() == 'M':
-        folder_name=''.join([chip_name,"_man"])
-        configurator=man_config_dictionary(save,folder_name,dummy)
-        break
-    
-    elif mode.upper() == 'F':
-        folder_name=''.join([chip_name,"_f"])
-        configurator=friction_config_dictionary(save,folder_name,dummy)
-        break
-
-    else:
-        print('Configuration failed. Please choose from the above options.')
-        continue
+    spec['mode']=MODES.get(mode.upper(),mode)
+    if spec['mode']=='experiment':
+        flowrate=input('Intended flowrate? [ml/min]\n')
+        try:
+            spec['flowrate']=float(flowrate)
+        except ValueError:
+            spec['flowrate']=flowrate
+        spec['direction']=input('Flow direction? [fw/bw/n]\n').lower()
+    return spec
 
-"""
-Instantiation
-- Use configuration file to find global objects which must be created, set them
-all up with links to each other, then activate them.    
-"""
-# Create manager for experiment
-man=module_manager()
-
-# hardware must be set up before modules. Otherwise they have nothing for
-# modules to refer to.
-hardwares=[]
-for name, settings in configurator.hardware.items():
-    modtype=eval(settings['Type'])
-    globals()[name]=modtype(name,man,**settings['kwargs'])
-    hardwares.append(globals()[name])
-
-modules=[]
-for name, settings in configurator.modules.items():
-    modtype=eval(settings['Type'])
-    globals()[name]=modtype(name,man,**settings['kwargs'])
-    modules.append(globals()[name])
+if len(sys.argv)>1 and sys.argv[1:]!=['--check']:
+    sys.exit(launch(sys.argv[1:]))
 
-"""
-Processing
-- Activate asyncronous tasks, assign all to manager so they can be stopped after their usefulness is up.
-"""
+try:
+    spec=run_spec(questions(),'answers')
+except spec_error as error:
+    print(f'Invalid run {error}')
+    sys.exit(1)
 
-tasks=[]
-tasks.append(asyncio.create_task(man.process()))
+if '--check' in sys.argv:
+    print(f'{spec.name}: {spec.spec["mode"]} run, data in {spec.folder_name()}')
+    sys.exit(0)
 
-for hardware in hardwares:
-    tasks.append(asyncio.create_task(hardware.process()))
-    
-for module in modules:
-    tasks.append(asyncio.create_task(module.process()))
+# If this run was interrupted before, it can carry on from the step it reached
+checkpoint=find_checkpoint(spec)
+if checkpoint is not None:
+    spec.resume=yes_no(input(f'Checkpoint found in {os.path.dirname(checkpoint)}. Resume from it?\n[y/n]\n'))==True
 
-man.tasks=tasks
\ No newline at end of file
+if spec.spec['mode']=='calibration':
+    print(f'Calibration started at {time.asctime()}')
+
+"""
+Processing
+- Objects are created inside the run, so they use the run's event loop (see core/runtime.py), and are then run
+until it is shut down, all in one task group so they are all stopped when the run ends.
+"""
+start_run(execute(spec))
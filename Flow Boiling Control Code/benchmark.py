@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:27:33 2026
+
+Throughput benchmark for the control code.
+
+Runs the same pipeline as __main__ (manager, DAQ, sensors, controller, logger) without any user input,
+using the emulated DAQ and dummy pump from config/benchmark_configuration.py. Reports:
+    - scans/s taken by the DAQ and scans/s which made it all the way through to the logger
+    - latency of each stage (trigger, parse, distribute, convert, alarm, SS, control, log, display, persist),
+      taken from the manager's stage tracer (see core/tracer.py)
+    - event loop lag, from the manager's watchdog (see core/watchdog.py)
+    - memory growth over the run
+    - import and startup time, with the time taken to import each driver (see core/registry.py) and to create
+      each hardware object (see core/builder.py)
+
+Results are written as JSON, so that runs from different versions of the code can be compared.
+
+Usage (from this folder):
+    python benchmark.py --channels 20 --sweeps 10 --duration 30 --output results.json
+
+Several values can be given for --channels and --sweeps. Each combination is then run in its own process
+and the results are collected into one file.
+
+To compare the DAQ's double-buffered readout with the usual scan-then-read, give both to --readout. The emulated
+DAQ only takes time to scan and to send readings back if --reading-time and --transfer-time are set:
+    python benchmark.py --readout single double --reading-time 0.001 --transfer-time 0.0002
+With --period 0 (the default) the timer triggers the DAQ again as soon as it is free (see core/timer.py), i.e.:
+    python benchmark.py --channels 10 --sweeps 5 --reading-time 0.002 --transfer-time 0.001 --readout single double --period 0
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_START=time.perf_counter()
+
+import numpy as np
+import pandas as pd
+
+from __init__ import *
+
+IMPORT_TIME=time.perf_counter()-IMPORT_START
+
+try:
+    import psutil
+except ImportError:
+    psutil=None
+
+CHANNEL_LIMITS=(5,200)
+SWEEP_LIMITS=(1,100)
+
+def memory_usage():
+    # Resident memory of this process in MB. Falls back to peak memory if psutil is not installed.
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss/1e6
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1e3
+    except ImportError:
+        return float('nan')
+
+# Stages of one scan, in the order they happen, and the tracer spans which make them up.
+# Note: 'convert' for heaters includes the time spent waiting for their shunt to be converted.
+STAGES={'trigger':'.trigger',
+        'parse':'.parse_data',
+        'distribute':'.send_to_sensors',
+        'convert':'.process_data',
+        'alarm':'.check_alarms',
+        'SS':'.determine_SS',
+        'controller':'.process',
+        'control':'.calculate_response',
+        'log':'.gather_data',
+        'display':'.extract_dfs',
+        'persist':'.save_to_file'}
+
+async def run_benchmark(args):
+    save_path=tempfile.mkdtemp(prefix='flowboiling_bench_')
+
+    configurator=bench_config_dictionary(not args.no_save,'bench',True,
+                                         n_channels=args.channels,
+                                         n_sweeps=args.sweeps,
+                                         period=args.period,
+                                         reading_time=args.reading_time,
+                                         transfer_time=args.transfer_time,
+                                         double_buffered=args.readout=='double')
+    configurator.modules['log']['kwargs']['save_path']=save_path
+
+    startup=time.perf_counter()
+    man=module_manager()
+
+    # Instantiate everything exactly as __main__ does
+    hardwares, modules=await build(man,configurator)
+    startup=time.perf_counter()-startup
+
+    running=asyncio.ensure_future(run_experiment(man,hardwares,modules))
+
+    # Let the pipeline settle, then start counting.
+    await asyncio.sleep(args.warmup)
+    man.tracer.reset()
+    stalls=man.watchdog.stall_count
+
+    mem_start=memory_usage()
+    start=time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed=time.perf_counter()-start
+    mem_end=memory_usage()
+
+    stages={stage:man.tracer.combined(suffix) for stage, suffix in STAGES.items()}
+    spans={span:histogram.summary() for span, histogram in man.tracer.histograms.items()}
+    loop_lag=man.tracer.histogram('loop.lag').summary()
+    loop_lag['stalls']=man.watchdog.stall_count-stalls
+    scans=stages['distribute'].count
+    logged=stages['log'].count
+
+    man.shutdown()
+    await running
+    shutil.rmtree(save_path,ignore_errors=True)
+
+    return {'channels':args.channels,
+            'sweeps':args.sweeps,
+            'period_s':args.period,
+            'reading_time_s':args.reading_time,
+            'transfer_time_s':args.transfer_time,
+            'readout':args.readout,
+            'saving':not args.no_save,
+            'duration_s':elapsed,
+            'startup_s':startup,
+            'import_s':IMPORT_TIME,
+            'driver_imports_s':dict(import_times),
+            'connect_s':dict(man.connect_times),
+            'scans':scans,
+            'scans_per_s':scans/elapsed,
+            'logged_scans_per_s':logged/elapsed,
+            'readings_per_s':scans*args.channels*args.sweeps/elapsed,
+            'stages':{stage:histogram.summary() for stage, histogram in stages.items()},
+            'spans':spans,
+            'loop_lag':loop_lag,
+            'memory':{'start_MB':mem_start,
+                      'end_MB':mem_end,
+                      'growth_MB':mem_end-mem_start,
+                      'growth_MB_per_min':(mem_end-mem_start)*60/elapsed}}
+
+def environment():
+    # Record what was benchmarked, so that results can be compared across releases.
+    try:
+        commit=subprocess.run(['git','rev-parse','HEAD'],capture_output=True,text=True,
+                              cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip()
+    except OSError:
+        commit=''
+    return {'time':time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit':commit,
+            'python':platform.python_version(),
+            'platform':platform.platform(),
+            'numpy':np.__version__,
+            'pandas':pd.__version__}
+
+def bounded(limits):
+    def check(value):
+        value=int(value)
+        if not limits[0]<=value<=limits[1]:
+            raise argparse.ArgumentTypeError(f'must be between {limits[0]} and {limits[1]}')
+        return value
+    return check
+
+def parse_args():
+    parser=argparse.ArgumentParser(description='Headless throughput benchmark of the flow boiling control code.')
+    parser.add_argument('--channels',type=bounded(CHANNEL_LIMITS),nargs='+',default=[20],
+                        help='number of DAQ channels (5-200)')
+    parser.add_argument('--sweeps',type=bounded(SWEEP_LIMITS),nargs='+',default=[10],
+                        help='number of sweeps per scan (1-100)')
+    parser.add_argument('--duration',type=float,default=30,help='measured duration of each run [s]')
+    parser.add_argument('--warmup',type=float,default=5,help='time allowed to settle before measuring [s]')
+    parser.add_argument('--period',type=float,default=0,help='timer period [s]. 0 triggers as fast as possible')
+    parser.add_argument('--reading-time',type=float,default=0,help='emulated instrument time per reading [s]')
+    parser.add_argument('--transfer-time',type=float,default=0,help='emulated time to send back each reading [s]')
+    parser.add_argument('--readout',choices=['single','double'],nargs='+',default=['single'],
+                        help='DAQ readout: scan then read (single), or read one buffer while scanning into another (double)')
+    parser.add_argument('--no-save',action='store_true',help='do not write csv files during the run')
+    parser.add_argument('--output',default=None,help='JSON results file. Printed if not given')
+    return parser.parse_args()
+
+def run_single(args):
+    # The pipeline prints to the console on every scan. Discard this, so that terminal speed is not measured.
+    with open(os.devnull,'w') as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(run_benchmark(args))
+
+def run_matrix(args):
+    # Run each combination in a fresh process, so that runs do not affect each other's memory or objects.
+    runs=[]
+    for channels in args.channels:
+        for sweeps in args.sweeps:
+            for readout in args.readout:
+                print(f'Benchmarking {channels} channels, {sweeps} sweeps, {readout} readout')
+                with tempfile.TemporaryDirectory() as tmp:
+                    output=os.path.join(tmp,'run.json')
+                    cmd=[sys.executable,os.path.realpath(__file__),
+                         '--channels',str(channels),'--sweeps',str(sweeps),
+                         '--duration',str(args.duration),'--warmup',str(args.warmup),
+                         '--period',str(args.period),'--reading-time',str(args.reading_time),
+                         '--transfer-time',str(args.transfer_time),'--readout',readout,
+                         '--output',output]
+                    if args.no_save:
+                        cmd.append('--no-save')
+                    subprocess.run(cmd,check=True)
+
+                    with open(output) as file:
+                        runs.extend(json.load(file)['runs'])
+    return runs
+
+def readout_speedup(runs):
+    # Effective scans/s with double-buffered readout, relative to single, for each channel/sweep combination
+    single={(run['channels'],run['sweeps']):run['scans_per_s'] for run in runs if run['readout']=='single'}
+    return {(run['channels'],run['sweeps']):run['scans_per_s']/single[(run['channels'],run['sweeps'])]
+            for run in runs if run['readout']=='double' and single.get((run['channels'],run['sweeps']))}
+
+if __name__=='__main__':
+    args=parse_args()
+
+    if len(args.channels)==1 and len(args.sweeps)==1 and len(args.readout)==1:
+        args.channels=args.channels[0]
+        args.sweeps=args.sweeps[0]
+        args.readout=args.readout[0]
+        runs=[run_single(args)]
+    else:
+        runs=run_matrix(args)
+
+    results=json.dumps({'environment':environment(),'runs':runs},indent=2)
+
+    if args.output is None:
+        print(results)
+    else:
+        with open(args.output,'w') as file:
+            file.write(results)
+
+        for run in runs:
+            print(f"{run['channels']} channels, {run['sweeps']} sweeps, {run['readout']} readout: "
+                  f"{run['scans_per_s']:.2f} scans/s, {run['logged_scans_per_s']:.2f} logged/s, "
+                  f"loop lag p99 {run['loop_lag'].get('p99_ms',0):.1f} ms")
+        for (channels, sweeps), speedup in readout_speedup(runs).items():
+            print(f'{channels} channels, {sweeps} sweeps: double-buffered readout x{speedup:.2f} scans/s')
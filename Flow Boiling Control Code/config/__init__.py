@@ -6,10 +6,9 @@ Created on Wed Sep 15 10:22:03 2021
 """
 from .hotrun_configuration import *
 from .calibration_configuration import *
-from .calibration_configuration_des2 import *
 
 from .manual_configuration import *
-from .hotrun_configuration_DC import *
-from .hotrun_configuration_des2 import *
-from .hotrun_configuration_DC_bw import *
-from .friction_configuration import *
\ No newline at end of file
+from .friction_configuration import *
+from .benchmark_configuration import *
+from .campaign_configuration import *
+from .run_spec import *
\ No newline at end of file
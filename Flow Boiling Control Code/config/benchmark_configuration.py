@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:27:33 2026
+
+Configuration file for benchmark runs. No hardware is needed: the DAQ is emulated, and the pump is a dummy.
+
+Rather than describing a real chip, the sensors are generated from the requested number of channels. They
+are taken in blocks of 8 (shunt, 3 heaters, pressure transducer, RTD, thermocouple, PT100), so that every
+type of conversion used in the real experiments is exercised.
+
+Used by benchmark.py. Can also be selected from __main__ like any other configuration.
+"""
+import os
+
+class bench_config_dictionary(object):
+    def __init__(self, save, folder_name, dummy, n_channels=20, n_sweeps=10, period=0, reading_time=0,
+                 transfer_time=0, double_buffered=False):
+        self.dummy=dummy
+
+        self.n_channels=n_channels
+        self.SS_sweeps=n_sweeps
+        self.USS_sweeps=n_sweeps
+
+        # Timer period. At 0 the DAQ is triggered as fast as the rest of the code allows.
+        self.SS_period=period
+        self.USS_period=period
+
+        # Time per reading of the emulated DAQ. At 0, only the time spent by the control code is measured.
+        self.reading_time=reading_time
+        # Time per reading to send the buffer back to the host
+        self.transfer_time=transfer_time
+        # Read one buffer while the next scan fills the other (see hardware/DAQ/Keithley_DAQ6510.py)
+        self.double_buffered=double_buffered
+
+        # Keep the DAQ cycling between SS and USS so that both paths are timed.
+        self.USS_min_count=20
+        self.SS_count=10
+
+        self.DAQ_type='DAQ6510'
+
+        self.display_length=14
+
+        self.save=save
+        self.save_path=os.path.join(os.path.abspath(os.curdir).split('Control')[0],'Benchmark')
+
+        self.folder_name=folder_name
+
+        self.module_configuration()
+        self.hardware_configuration()
+
+    def module_configuration(self):
+        """ Dictionary of modules in format name:{type,kwargs}.
+            No keylogger, since benchmark runs are headless.
+        """
+        self.modules={
+            'log': {'Type':'datalogger',
+                    'kwargs':{'saving':self.save,
+                        'save_path':self.save_path,
+                        'folder_name':self.folder_name,
+
+                        'conf_location':str(__file__),
+
+                        'SS_target':'DAQ',
+                        'control_target':'cont',
+
+                        'save_length':10,
+                        'display_length':self.display_length
+                        }},
+
+            'tim': {'Type':'timer',
+                    'kwargs':{
+                        'target': 'DAQ',
+                        'mode':'periodic',
+                        'SS_target':'DAQ',
+                        'intervals': {'SS':self.SS_period,
+                                      'USS':self.USS_period
+                            }}}
+            }
+
+        for module, settings in self.modules.items():
+            if 'kwargs' not in settings.keys():
+                self.modules[module]['kwargs']={'kwargs':None}
+
+            self.modules[module]['kwargs']['dummy']=self.dummy
+
+        return self.modules
+
+    def channel_number(self, index):
+        # 20 channels per card, cards in slots 1, 2, 3...
+        return 100*(1+index//20)+1+index%20
+
+    def sensor_configuration(self):
+        # Generate the sensors in blocks of 8. Alarm limits are set well out of reach, so alarms are checked but never raised.
+        block=['DC_shunt','DC_heater','DC_heater','DC_heater','P_sensor','RTD','TC','PT100']
+        prefixes={'DC_shunt':'S','DC_heater':'H','P_sensor':'P','RTD':'RTD','TC':'TC','PT100':'PT'}
+        counters={prefix:0 for prefix in prefixes.values()}
+
+        sensors={}
+        shunt=None
+        for index in range(self.n_channels):
+            sensor_type=block[index%len(block)]
+            prefix=prefixes[sensor_type]
+            counters[prefix]+=1
+            name=prefix+str(counters[prefix])
+
+            kwargs={'DAQ_type':self.DAQ_type,
+                    'DAQ':'DAQ',
+                    'channel':self.channel_number(index),
+                    'range':100,
+                    'nplc':0.5,
+                    'settling_time':0}
+
+            if sensor_type=='DC_shunt':
+                shunt=name
+                kwargs['resistance']=4.999
+                kwargs['alarms']=[('H','I',1e12,'Alert')]
+
+            elif sensor_type=='DC_heater':
+                kwargs['shunt']=shunt
+                kwargs['T_sensing']=True
+                kwargs['a']=0
+                kwargs['b']=2.2
+                kwargs['c']=-230
+                kwargs['offset']=0
+                kwargs['alarms']=[('H','T',1e12,'Alert')]
+
+            elif sensor_type=='P_sensor':
+                kwargs['signal_range']=[0,20]
+                kwargs['reading_range']=[0,6]
+                kwargs['alarms']=[('H','P',1e12,'Alert')]
+
+                # First pressure transducer is used for steady-state detection
+                if counters[prefix]==1:
+                    kwargs['SS']=True
+                    kwargs['USS_length']=10
+
+            elif sensor_type=='RTD':
+                kwargs['n_wires']=4
+                kwargs['a']=0
+                kwargs['b']=2.2
+                kwargs['c']=-230
+                kwargs['offset']=0
+                kwargs['alarms']=[('H','T',1e12,'Alert')]
+
+            else:
+                kwargs['alarms']=[('H','T',1e12,'Alert')]
+
+            sensors[name]={'Type':sensor_type,'kwargs':kwargs}
+
+        return sensors
+
+    def hardware_configuration(self):
+        """ Sets up dictionary of hardware items, which will be set up by the benchmark (or __main__) script.
+        """
+        self.hardware={
+            'DAQ':{'Type': self.DAQ_type,
+                   'kwargs':{
+                       'method':'emulated',
+                       'address':'EMULATED::'+self.DAQ_type,
+                       'reading_time':self.reading_time,
+                       'transfer_time':self.transfer_time,
+                       'double_buffered':self.double_buffered,
+                       'n_sweeps':{'SS':self.SS_sweeps,
+                                   'USS':self.USS_sweeps},
+
+                       'SS_count':self.SS_count,
+                       'USS_count':self.USS_min_count
+                             }}}
+
+        self.hardware.update(self.sensor_configuration())
+
+        self.hardware.update({
+            'Activator':{'Type':'activator',
+                         'kwargs':{'target':'DAQ'}},
+
+            'cont':{'Type':'controller',
+                    'kwargs':{'SS_target':'DAQ'}},
+
+            'PUMP':{'Type':'HNPM', # Dummy pump, so that the controller has a device to distribute to.
+                    'kwargs':{'controller':'cont',
+
+                              'address':"ASRL6::INSTR",
+                              'method':'serial',
+                              'timeout':5000,
+
+                              'PID':False,
+
+                              'SP':1,
+                              'home':0,
+                              'safe_position':0,
+                              'limits':{'H':6000,
+                                        'L':0}}},
+            })
+
+        # For all hardware devices, set parameters which have not been specified
+        for device, settings in self.hardware.items():
+            if 'kwargs' not in settings.keys():
+                self.hardware[device]['kwargs']={'kwargs':None}
+
+            if 'alarms' not in settings['kwargs'].keys():
+                self.hardware[device]['kwargs']['alarms']=[("","","","")]
+
+            if 'SS' not in settings['kwargs'].keys():
+                self.hardware[device]['kwargs']['SS']=False
+
+            if 'SP' not in settings['kwargs'].keys():
+                self.hardware[device]['kwargs']['SP']=0
+
+            self.hardware[device]['kwargs']['dummy']=self.dummy
+
+        # The DAQ is emulated rather than dummy, so that triggering and parsing are timed too.
+        self.hardware['DAQ']['kwargs']['dummy']=False
+
+        return self.hardware
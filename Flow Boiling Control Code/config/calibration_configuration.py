@@ -70,7 +70,22 @@ class cal_config_dictionary(object):
                         
                         'display_length':self.display_length
                         }},
+            
+            # Fits each heater's TCR as the run goes, and stops the run once the fits are good enough
+            'fit': {'Type':'tcr_fit',
+                    'kwargs':{'controller':'cont',
+                              'logger':'log',
+                              'reference':'TC1', # Oven temperature
+                              'heaters':['H1','H2','H3','H4','H5'],
+                              'target_uncertainty':0.5, # [%] standard error of each slope
+                              'min_blocks':3, # Oven temperatures needed, at least
+                              'shutdown_when_done':True,
+                              'calibration_store':os.path.join(self.save_path,'calibrations.sqlite') # Later runs on this chip read the TCRs from here
+                              }},
 
+            'disp': {'Type':'display',
+                     'kwargs':{'source':'log'}},
+            
             'tim': {'Type':'timer',
                     'kwargs':{
                         'target': 'DAQ',
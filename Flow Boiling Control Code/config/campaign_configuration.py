@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:37:12 2026
+
+***Configuration file for campaigns: several hot runs, one after another.***
+
+Uses the hot run configuration as it is, and adds a campaign module which works through every combination of
+flow direction, flowrate and PSU step limit (see core/campaign.py). Each operating point is saved in its own
+folder, named as for a single hot run.
+"""
+from .hotrun_configuration import exp_config_dictionary
+
+class campaign_config_dictionary(exp_config_dictionary):
+    def __init__(self, save, folder_name, dummy, chip='chip', flowrates=(50,), directions=('fw',), step_limits=(10,),
+                 shutdown_when_done=True, calibration_file=None):
+        self.chip=chip
+        self.flowrates=list(flowrates)
+        self.directions=list(directions)
+        self.step_limits=list(step_limits)
+        self.shutdown_when_done=shutdown_when_done
+        
+        super().__init__(save,folder_name,dummy,calibration_file)
+        
+    def module_configuration(self):
+        super().module_configuration()
+        
+        # Campaign must come after the logger, so it can find it.
+        self.modules['camp']={'Type':'campaign',
+                              'kwargs':{'chip':self.chip,
+                                        'controller':'cont',
+                                        'logger':'log',
+                                        'pump':'PUMP',
+                                        'psu':'PSU',
+                                        
+                                        'flowrates':self.flowrates,
+                                        'directions':self.directions, # Operator is asked to change direction in between
+                                        'step_limits':self.step_limits, # Last PSU step recorded at each point
+                                        
+                                        'shutdown_when_done':self.shutdown_when_done,
+                                        'dummy':self.dummy}}
+        
+        return self.modules
@@ -72,6 +72,9 @@ class friction_config_dictionary(object):
                         'display_length':self.display_length
                         }},
 
+            'disp': {'Type':'display',
+                     'kwargs':{'source':'log'}},
+            
             'tim': {'Type':'timer',
                     'kwargs':{
                         'target': 'DAQ',
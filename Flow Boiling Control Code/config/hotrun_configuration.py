@@ -20,10 +20,16 @@ investigate the settings for each specific run.
 """
 import os
 
+from core.tcr_fit import read_coefficients
+from core.calibration_store import STORE_NAME, chip_name
+
 class exp_config_dictionary(object):
-    def __init__(self, save, folder_name, dummy):
+    def __init__(self, save, folder_name, dummy, calibration_file=None):
         self.dummy=dummy
         
+        # TCR_coefficients.json written by a calibration run. Used instead of the additional settings below.
+        self.calibration_file=calibration_file
+        
         self.SS_sweeps=1
         self.USS_sweeps=1
         
@@ -85,6 +91,20 @@ class exp_config_dictionary(object):
                         'display_length':self.display_length
                         }},
 
+            'disp': {'Type':'display',
+                     'kwargs':{'source':'log'}},
+            
+            'tel': {'Type':'telemetry',
+                    'kwargs':{'controller':'cont', # Every scan is published once the controller has dealt with it
+                              'port':5555, # Local only. Watch with 'python -m interface.telemetry'
+                              'queue_length':256 # Slow subscribers lose their oldest scans beyond this
+                              }},
+            
+            'cmd': {'Type':'command_server',
+                    'kwargs':{'controller':'cont',
+                              'port':5556 # Local only. i.e. 'python -m interface.command_server skip'
+                              }},
+            
             'tim': {'Type':'timer',
                     'kwargs':{
                         'target': 'DAQ',
@@ -92,7 +112,9 @@ class exp_config_dictionary(object):
                         'SS_target':'DAQ',
                         'intervals': {'SS':self.SS_period,
                                       'USS':self.USS_period             
-                            }}}
+                            },
+                        'overrun_policy':'skip' # Triggers missed while the loop was blocked are dropped ('catch_up' sends them late)
+                        }}
             }
         
         for module, settings in self.modules.items():
@@ -116,7 +138,18 @@ class exp_config_dictionary(object):
                                    'USS':self.USS_sweeps},
                        
                        'SS_count':self.SS_count,
-                       'USS_count':self.USS_min_count
+                       'USS_count':self.USS_min_count,
+                       
+                       # Reset and configuration are skipped if the DAQ still has the configuration noted here
+                       'config_cache':os.path.join(self.save_path,'DAQ_configuration.json'),
+                       
+                       # Name of a shared-memory ring to publish every scan to, i.e. 'flowboiling_DAQ', for other programs to follow (see core/scan_ring.py)
+                       'scan_ring':None,
+                       
+                       # True: DAQ scans on its own timer at these intervals (set the timer module to 'triggered')
+                       'hardware_timed':False,
+                       'intervals':{'SS':self.SS_period,
+                                    'USS':self.USS_period}
                              }},
             
             'PRES':{'Type':'P_sensor',
@@ -213,6 +246,8 @@ class exp_config_dictionary(object):
                       'range':100,
                       'nplc':1,
                       'settling_time':1e-3,
+                      'tc_type':'T',
+                      'mode':'instrument', # 'voltage' to measure only the voltage and convert here. Needs 'reference' (a PT100 at the DAQ terminals) or 'reference_T'
                       
                       'SS': True,
                       'USS_length':self.USS_min_count
@@ -466,6 +501,18 @@ class exp_config_dictionary(object):
         except:
             print('Config failed to update additional settings.Please check them and try again' )
         
+        if self.calibration_file is not None:
+            for target, coefficients in read_coefficients(self.calibration_file).items():
+                if target in self.hardware:
+                    self.hardware[target]['kwargs'].update(coefficients)
+                    print(f'{target} TCR read from {self.calibration_file}: {coefficients}')
+        else:
+            # Temperature-sensing heaters look up the latest calibration of this chip, if there is one
+            for device, settings in self.hardware.items():
+                if settings.get('kwargs',{}).get('T_sensing')==True:
+                    settings['kwargs']['chip']=chip_name(self.folder_name)
+                    settings['kwargs']['calibration_store']=os.path.join(self.save_path,STORE_NAME)
+        
         # For all hardware devices, set parameters which have not been specified
         for device, settings in self.hardware.items():
             if 'kwargs' not in settings.keys():
@@ -84,6 +84,9 @@ class man_config_dictionary(object):
                         'display_length':self.display_length
                         }},
 
+            'disp': {'Type':'display',
+                     'kwargs':{'source':'log'}},
+            
             'tim': {'Type':'timer',
                     'kwargs':{
                         'target': 'DAQ',
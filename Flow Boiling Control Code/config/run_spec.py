@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:35:58 2026
+
+***Run specifications: configuration from a JSON, TOML or YAML file instead of a Python class.***
+
+A run specification describes one run. It can either start from one of the configuration classes in this
+folder and change some of its settings:
+
+    name = "chip3_fw_50ml_min"
+    mode = "experiment"          # experiment, calibration, manual, friction, benchmark or campaign
+    chip = "chip3"
+    flowrate = 50                # experiment only
+    direction = "fw"             # experiment only. fw, bw or n
+    save = true
+    dummy = false
+    resume = true                # carry on from the checkpoint in the data folder, if there is one
+
+    [overrides.hardware.DAQ]
+    address = "USB0::0x05E6::0x6510::04515817::0::INSTR"
+
+or list every object itself, in the same format as the configuration classes ('hardware' and 'modules', each
+name:{Type, kwargs}). Settings not given are filled in the same way as the configuration classes do.
+
+A file can hold one run, or several under 'runs' (in TOML, [[runs]] tables). They are run one after another
+by launcher.py.
+
+Everything is checked before anything is started: unknown settings, wrong types, unknown device Types, and
+references to objects (DAQ, shunt, controller etc.) which are not set up before the object which needs them.
+All problems are reported together in a spec_error.
+
+TOML needs Python 3.11 (or the tomli package), YAML needs PyYAML.
+"""
+import json
+import os
+
+from core.registry import driver_names
+
+from .hotrun_configuration import exp_config_dictionary
+from .calibration_configuration import cal_config_dictionary
+from .manual_configuration import man_config_dictionary
+from .friction_configuration import friction_config_dictionary
+from .benchmark_configuration import bench_config_dictionary
+from .campaign_configuration import campaign_config_dictionary
+
+BASE_CONFIGURATIONS={'experiment':exp_config_dictionary,
+                     'calibration':cal_config_dictionary,
+                     'manual':man_config_dictionary,
+                     'friction':friction_config_dictionary,
+                     'benchmark':bench_config_dictionary,
+                     'campaign':campaign_config_dictionary}
+
+# Setting: (allowed types, required)
+SPEC_SCHEMA={'name':(str,True),
+             'mode':(str,False),
+             'chip':(str,False),
+             'flowrate':((int,float),False),
+             'direction':(str,False),
+             'save':(bool,False),
+             'dummy':(bool,False),
+             'save_path':(str,False),
+             'duration':((int,float),False),
+             'resume':(bool,False),
+             'options':(dict,False),
+             'overrides':(dict,False),
+             'hardware':(dict,False),
+             'modules':(dict,False)}
+
+DIRECTIONS=('fw','bw','n')
+
+# kwargs which name another object
+REFERENCE_KWARGS=('DAQ','shunt','controller','target','SS_target','control_target','target_sensor','inverter','logger',
+                  'source')
+
+class spec_error(ValueError):
+    def __init__(self, source, problems):
+        self.source=source
+        self.problems=problems
+        super().__init__(f'{source}:\n    '+'\n    '.join(problems))
+
+def read_file(path):
+    # Returns the contents of a specification file as a dictionary
+    extension=os.path.splitext(path)[1].lower()
+
+    if extension=='.json':
+        with open(path) as file:
+            return json.load(file)
+
+    elif extension=='.toml':
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+        with open(path,'rb') as file:
+            return tomllib.load(file)
+
+    elif extension in ('.yaml','.yml'):
+        import yaml
+        with open(path) as file:
+            return yaml.safe_load(file)
+
+    raise spec_error(path,[f'Unknown file type {extension}. Use .json, .toml, .yaml or .yml'])
+
+def load_specs(path):
+    # A file holds one run, or a list of them under 'runs'. Settings outside 'runs' apply to every run.
+    contents=read_file(path)
+    if not isinstance(contents,dict):
+        raise spec_error(path,['File must contain a table/mapping of settings'])
+
+    if 'runs' not in contents:
+        return [run_spec(contents,path)]
+
+    shared={key:value for key, value in contents.items() if key!='runs'}
+    return [run_spec({**shared,**run},path) for run in contents['runs']]
+
+def check_entries(group, entries, known, problems):
+    # Checks one of the 'hardware'/'modules' dictionaries. known holds the names set up so far.
+    types=driver_names()
+    for name, settings in entries.items():
+        if not isinstance(settings,dict) or 'Type' not in settings:
+            problems.append(f'{group}.{name}: needs a Type')
+            known.add(name)
+            continue
+
+        if settings['Type'] not in types:
+            problems.append(f"{group}.{name}: unknown Type {settings['Type']}")
+
+        kwargs=settings.get('kwargs',{})
+        if not isinstance(kwargs,dict):
+            problems.append(f'{group}.{name}: kwargs must be a table/mapping')
+            kwargs={}
+
+        for key in REFERENCE_KWARGS:
+            if key in kwargs and kwargs[key] not in known:
+                problems.append(f'{group}.{name}: {key} refers to {kwargs[key]}, which is not set up before it')
+
+        for pair in kwargs.get('inputlist',[]):
+            for item in pair:
+                if item not in known:
+                    problems.append(f'{group}.{name}: inputlist refers to {item}, which is not set up before it')
+
+        known.add(name)
+
+class run_spec(object):
+    def __init__(self, spec, source):
+        self.spec=spec
+        self.source=source
+
+        self.validate()
+
+        self.name=spec['name']
+        self.save=spec.get('save',False)
+        self.dummy=spec.get('dummy',False)
+        self.duration=spec.get('duration')
+        self.resume=spec.get('resume',False)
+
+        self.configure()
+        self.check_graph()
+
+    def validate(self):
+        # Checks the settings themselves, before any configuration is made
+        problems=[]
+        for key, value in self.spec.items():
+            if key not in SPEC_SCHEMA:
+                problems.append(f'Unknown setting {key}')
+            elif not isinstance(value,SPEC_SCHEMA[key][0]) or (isinstance(value,bool) and SPEC_SCHEMA[key][0]!=bool):
+                problems.append(f'{key} has the wrong type ({type(value).__name__})')
+
+        for key, (_, required) in SPEC_SCHEMA.items():
+            if required and key not in self.spec:
+                problems.append(f'{key} is required')
+
+        mode=self.spec.get('mode')
+        declared='hardware' in self.spec or 'modules' in self.spec
+        if mode is None and not declared:
+            problems.append('Give either a mode or the hardware and modules')
+        elif mode is not None and declared:
+            problems.append('Give either a mode or the hardware and modules, not both. Use overrides to change a mode')
+        elif mode is not None and mode not in BASE_CONFIGURATIONS:
+            problems.append(f'Unknown mode {mode}. Choose from {", ".join(BASE_CONFIGURATIONS)}')
+        elif declared and not ('hardware' in self.spec and 'modules' in self.spec):
+            problems.append('Both hardware and modules are needed')
+
+        if mode=='experiment':
+            for key in ('flowrate','direction'):
+                if key not in self.spec:
+                    problems.append(f'{key} is required for experiments')
+        if self.spec.get('direction',DIRECTIONS[0]) not in DIRECTIONS:
+            problems.append(f'direction must be one of {", ".join(DIRECTIONS)}')
+
+        duration=self.spec.get('duration')
+        if isinstance(duration,(int,float)) and duration<=0:
+            problems.append('duration must be positive')
+
+        if len(problems)>0:
+            raise spec_error(f"{self.source} ({self.spec.get('name','unnamed')})",problems)
+
+    def folder_name(self):
+        # Same folder names as the questions in __main__ give
+        chip=self.spec.get('chip',self.spec['name'])
+        mode=self.spec.get('mode')
+        if mode=='experiment':
+            direction=self.spec['direction']
+            if direction=='n':
+                direction='fw'
+            flowrate=self.spec['flowrate']
+            if isinstance(flowrate,float) and flowrate.is_integer():
+                flowrate=int(flowrate)
+            return ''.join([chip,'_',direction,'_',str(flowrate),'ml_min'])
+        elif mode=='calibration':
+            return chip+'_cal'
+        elif mode=='manual':
+            return chip+'_man'
+        elif mode=='friction':
+            return chip+'_f'
+        return self.spec['name']
+
+    def configure(self):
+        problems=[]
+        if 'mode' in self.spec:
+            try:
+                base=BASE_CONFIGURATIONS[self.spec['mode']](self.save,self.folder_name(),self.dummy,**self.spec.get('options',{}))
+            except TypeError as error:
+                raise spec_error(f'{self.source} ({self.name})',[f'options: {error}'])
+            self.hardware=base.hardware
+            self.modules=base.modules
+            
+            if 'save_path' in self.spec:
+                for settings in self.modules.values():
+                    if settings['Type']=='datalogger':
+                        settings['kwargs']['save_path']=self.spec['save_path']
+
+            # Change individual kwargs of the base configuration
+            for group, overrides in self.spec.get('overrides',{}).items():
+                if group not in ('hardware','modules'):
+                    problems.append(f'overrides.{group}: only hardware and modules can be overridden')
+                    continue
+                entries=getattr(self,group)
+                for name, kwargs in overrides.items():
+                    if name not in entries:
+                        problems.append(f'overrides.{group}.{name}: no such object in {self.spec["mode"]} configuration')
+                    elif not isinstance(kwargs,dict):
+                        problems.append(f'overrides.{group}.{name}: must be a table/mapping of kwargs')
+                    else:
+                        entries[name]['kwargs'].update(kwargs)
+        else:
+            self.hardware=self.spec['hardware']
+            self.modules=self.spec['modules']
+            self.fill_defaults()
+
+        if len(problems)>0:
+            raise spec_error(f'{self.source} ({self.name})',problems)
+
+    def fill_defaults(self):
+        # Settings which the configuration classes fill in for every object
+        save_path=self.spec.get('save_path',os.path.join(os.path.abspath(os.curdir).split('Control')[0],'Data'))
+
+        for settings in self.modules.values():
+            if not isinstance(settings,dict):
+                continue
+            settings.setdefault('kwargs',{'kwargs':None})
+            settings['kwargs']['dummy']=self.dummy
+
+            if settings.get('Type')=='datalogger':
+                settings['kwargs'].setdefault('saving',self.save)
+                settings['kwargs'].setdefault('save_path',save_path)
+                settings['kwargs'].setdefault('folder_name',self.folder_name())
+                # The specification is saved with the data, in place of the configuration file
+                settings['kwargs'].setdefault('conf_location',os.path.abspath(self.source))
+
+        for settings in self.hardware.values():
+            if not isinstance(settings,dict):
+                continue
+            settings.setdefault('kwargs',{'kwargs':None})
+            settings['kwargs'].setdefault('alarms',[("","","","")])
+            settings['kwargs'].setdefault('SS',False)
+            settings['kwargs'].setdefault('SP',0)
+            settings['kwargs']['dummy']=self.dummy
+
+    def check_graph(self):
+        # Hardware is set up first, then modules. Each object may only refer to objects set up before it.
+        problems=[]
+        known=set()
+        check_entries('hardware',self.hardware,known,problems)
+        check_entries('modules',self.modules,known,problems)
+
+        if len(problems)>0:
+            raise spec_error(f'{self.source} ({self.name})',problems)
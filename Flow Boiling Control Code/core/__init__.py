@@ -5,4 +5,17 @@ Created on Tue Sep 14 14:14:29 2021
 @author: Chris
 """
 from .manager import *
-from .timer import *
\ No newline at end of file
+from .timer import *
+from .campaign import *
+from .tracer import *
+from .watchdog import *
+from .supervisor import *
+from .registry import *
+from .builder import *
+from .checkpoint import *
+from .commands import *
+from .tcr_fit import *
+from .calibration_store import *
+from .safe_state import *
+from .runtime import *
+from .deployment import *
\ No newline at end of file
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:35:58 2026
+
+Builds the objects for a run from a configuration (anything with 'hardware' and 'modules' dictionaries of
+name:{'Type','kwargs'}, i.e. the classes in config/ or a run specification from config/run_spec.py).
+
+Objects are registered with the manager as they are created, and refer to each other through manager.find(),
+so nothing needs to be put into the globals of __main__.
+
+Hardware is created in order of dependency. An item depends on any other hardware named in its kwargs which refer
+to another object (REFERENCE_KWARGS in config/run_spec.py: sensors on their DAQ, heaters on their shunt...) or in
+its inputlist (combined_Q on its heaters). Instruments which depend on nothing open their connections at the same
+time, each in its own thread, so startup takes as long as the slowest instrument rather than all of them added
+together. Only the connection is opened in the threads: every object is then created on the event loop, in
+configuration order with each item after those it depends on, so that its Events belong to the loop. The time
+each item took is printed, and kept in manager.connect_times.
+
+build is a coroutine, so it must be awaited:
+    hardwares, modules=await build(man,configurator)
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.registry import load_driver
+from config.run_spec import REFERENCE_KWARGS
+from hardware.hardware import connect, serial_hardware
+
+def dependencies(hardware):
+    # name: other hardware it refers to
+    needs={}
+    for name, settings in hardware.items():
+        kwargs=settings['kwargs']
+        refs={kwargs[key] for key in REFERENCE_KWARGS if key in kwargs}
+        refs.update(item for pair in kwargs.get('inputlist',[]) for item in pair)
+        needs[name]={ref for ref in refs if ref in hardware and ref!=name}
+    return needs
+
+def dependency_order(names, needs, ready):
+    # Configuration order, except that nothing comes before what it depends on
+    order=[]
+    remaining=list(names)
+    done=set(ready)
+    while remaining:
+        for name in remaining:
+            if needs[name]<=done:
+                break
+        else:
+            # Circular reference: leave the rest in configuration order and let find() report it
+            return order+remaining
+        remaining.remove(name)
+        order.append(name)
+        done.add(name)
+    return order
+
+def timed(modtype, name, manager, kwargs):
+    start=time.perf_counter()
+    obj=modtype(name,manager,**kwargs)
+    return obj, time.perf_counter()-start
+
+def opens_connection(driver, kwargs):
+    return issubclass(driver,serial_hardware) and kwargs.get('dummy',True)==False and 'method' in kwargs
+
+def open_connection(kwargs):
+    # Runs in a worker thread. None if the instrument can't be reached, which the object reports as 'Connecting 2'.
+    start=time.perf_counter()
+    try:
+        connection=connect(**kwargs)
+    except:
+        connection=None
+    return connection, time.perf_counter()-start
+
+async def build_hardware(manager, hardware, max_workers=8):
+    # Drivers are imported here, one at a time, so that their import times are measured properly
+    drivers={name:load_driver(settings['Type']) for name, settings in hardware.items()}
+    needs=dependencies(hardware)
+    # Copies, so that open connections aren't put into the configuration
+    kwargs={name:dict(settings['kwargs']) for name, settings in hardware.items()}
+    created={}
+
+    start=time.perf_counter()
+    independent=[name for name in hardware if len(needs[name])==0 and opens_connection(drivers[name],kwargs[name])]
+    if len(independent)>0:
+        loop=asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            opened=await asyncio.gather(*[loop.run_in_executor(pool,open_connection,kwargs[name])
+                                          for name in independent])
+        for name, (connection, taken) in zip(independent,opened):
+            kwargs[name]['connection']=connection
+            manager.connect_times[name]=taken
+    connected=time.perf_counter()-start
+
+    for name in dependency_order(list(hardware),needs,set()):
+        created[name], taken=timed(drivers[name],name,manager,kwargs[name])
+        manager.connect_times[name]=manager.connect_times.get(name,0)+taken
+
+    # Items register with the manager as they are created. Put everything back in configuration order.
+    registered=dict(manager.hardware_dict)
+    manager.hardware_dict.clear()
+    manager.hardware_dict.update({name:registered[name] for name in hardware if name in registered})
+    manager.hardware_dict.update(registered)
+
+    if len(independent)>0:
+        print(f'{len(independent)} instruments connected in {connected:.2f} s:')
+        for name in independent:
+            print(f'    {name}: {manager.connect_times[name]:.2f} s')
+
+    return [created[name] for name in hardware]
+
+async def build(manager, configurator):
+    # Hardware must be set up before modules. Otherwise they have nothing for modules to refer to.
+    # Returns the hardware and modules in configuration order.
+    hardwares=await build_hardware(manager,configurator.hardware)
+
+    modules=[]
+    for name, settings in configurator.modules.items():
+        modtype=load_driver(settings['Type'])
+        modules.append(modtype(name,manager,**settings['kwargs']))
+
+    return hardwares, modules
+
+def launch(manager, hardwares, modules):
+    # Start the manager, then every object under the manager's supervision
+    manager.tasks.append(manager.supervisor.spawn(manager.process()))
+
+    for item in hardwares+modules:
+        manager.launch(item)
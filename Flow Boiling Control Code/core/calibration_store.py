@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:46:17 2026
+
+Calibration store. One SQLite file holding the TCR coefficients (a, b, c, offset) of every heater of every chip,
+so they no longer need to be copied into the configuration files by hand.
+
+Coefficients are written by Calibration_calculator.py and by the tcr_fit module at the end of a calibration run.
+Every calibration is kept; a lookup returns the latest one for each heater.
+RTD, DC_heater and AC_heater read their coefficients from here at startup when the configuration gives them a
+'chip' and a 'calibration_store'. Any heater not found in the store keeps the coefficients in its configuration.
+
+All heaters of a chip are read in one query, the first time any of them is looked up, and kept for later lookups.
+
+Only uses the standard library, so the analysis scripts can use it without the rest of the control code.
+"""
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+STORE_NAME='calibrations.sqlite'
+SETTINGS=('a','b','c','offset')
+
+SCHEMA='''CREATE TABLE IF NOT EXISTS coefficients (
+              chip TEXT NOT NULL,
+              heater TEXT NOT NULL,
+              a REAL, b REAL, c REAL, offset REAL,
+              U_b REAL, U_c REAL,
+              source TEXT,
+              created REAL NOT NULL);
+          CREATE INDEX IF NOT EXISTS chip_heater ON coefficients (chip, heater, created);'''
+
+# (path, chip): {heater: coefficients}
+_cache={}
+
+def chip_name(folder_name):
+    # Chip name from a data folder name, i.e. 'chip3_cal' or 'chip3_fw_50ml_min' -> 'chip3'
+    return os.path.basename(os.path.normpath(folder_name)).split('_')[0]
+
+class calibration_store(object):
+    def __init__(self, path):
+        self.path=path
+
+    def connect(self):
+        connection=sqlite3.connect(self.path,timeout=10)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def write(self, chip, coefficients, source=''):
+        # coefficients: {heater: {'a':..,'b':..,'c':..,'offset':.., optionally 'U_b [%]', 'U_c [%]'}}
+        created=time.time()
+        rows=[(chip,heater,values.get('a',0),values['b'],values['c'],values.get('offset',0),
+               values.get('U_b [%]'),values.get('U_c [%]'),source,created)
+              for heater, values in coefficients.items()]
+
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.executemany('INSERT INTO coefficients VALUES (?,?,?,?,?,?,?,?,?,?)',rows)
+        _cache.pop((self.path,chip),None)
+
+    def chip(self, chip):
+        # Latest coefficients of every heater of the chip, as {heater: {'a':..,'b':..,'c':..,'offset':..}}
+        if (self.path,chip) not in _cache:
+            if not os.path.exists(self.path):
+                return {}
+            with closing(self.connect()) as connection:
+                # SQLite takes the other columns from the row with the latest 'created'
+                rows=connection.execute('SELECT heater, a, b, c, offset, MAX(created) FROM coefficients '
+                                        'WHERE chip=? GROUP BY heater',(chip,)).fetchall()
+            _cache[(self.path,chip)]={row[0]:dict(zip(SETTINGS,row[1:5])) for row in rows}
+        return _cache[(self.path,chip)]
+
+    def lookup(self, chip, heater):
+        return self.chip(chip).get(heater)
+
+    def chips(self):
+        if not os.path.exists(self.path):
+            return []
+        with closing(self.connect()) as connection:
+            return [row[0] for row in connection.execute('SELECT DISTINCT chip FROM coefficients ORDER BY chip')]
+
+def heater_coefficients(name, kwargs):
+    # Coefficients for a temperature-sensing heater: from the store if it has them, otherwise from its kwargs
+    coefficients={setting:kwargs[setting] for setting in SETTINGS if setting in kwargs}
+    if kwargs.get('chip') is not None and kwargs.get('calibration_store') is not None:
+        stored=calibration_store(kwargs['calibration_store']).lookup(kwargs['chip'],name)
+        if stored is not None:
+            coefficients.update(stored)
+            print(f"{name}: TCR of {kwargs['chip']} taken from calibration store: b={stored['b']}, c={stored['c']}")
+        else:
+            print(f"{name}: {kwargs['chip']} not in calibration store, using configured TCR")
+    return coefficients
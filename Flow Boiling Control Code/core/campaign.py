@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:37:12 2026
+
+Campaign. Runs a whole series of hot runs (operating points) without restarting the code in between.
+
+The campaign is a matrix of flow directions x flowrates x step limits. For each operating point it:
+    - sends the logger to a new folder, named as __main__ would (chip_fw_50ml_min). If the same flowrate and
+      direction appear with several step limits, the limit is added to the name (chip_fw_50ml_min_12).
+    - sets the pump to the flowrate and the PSU back to step 0, through the controller (as 'set_PUMP_50' would)
+    - waits while the controller steps the PSU up each time the DAQ has recorded SS, until the SS at the
+      step limit has been recorded
+then moves straight on to the next point. Instrument sessions are kept open throughout.
+
+Flow direction can't be changed by the code. When the direction changes, the PSU and pump are set to zero and
+the campaign waits for the operator to swap the connections and type 'next' in the keylogger.
+
+When all points are done, the PSU and pump are set to zero and (if shutdown_when_done) the run is shut down.
+"""
+import asyncio
+import itertools
+import re
+
+from modules.module import *
+
+class campaign(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.campaign=self
+
+        self.chip=kwargs['chip']
+        self.controller=self.manager.find(kwargs['controller'])
+        self.logger=self.manager.find(kwargs['logger'])
+        self.pump=kwargs['pump']
+        self.psu=kwargs['psu']
+
+        self.shutdown_when_done=kwargs.get('shutdown_when_done',True)
+
+        # Every combination of direction, flowrate and step limit, with direction changing least often
+        self.points=list(itertools.product(kwargs['directions'],kwargs['flowrates'],kwargs['step_limits']))
+        self.index=kwargs.get('start_index',0)
+
+        self.resume=asyncio.Event()
+        self.waiting_for_operator=False
+        
+        # Set when restored from a checkpoint: the current point is already set up
+        self.resuming=False
+
+        self.status='Startup 1'
+
+    def folder_name(self, point):
+        direction, flowrate, step_limit=point
+        if direction=='n':
+            direction='fw'
+        if isinstance(flowrate,float) and flowrate.is_integer():
+            flowrate=int(flowrate)
+        name=''.join([self.chip,'_',direction,'_',str(flowrate),'ml_min'])
+
+        # Only add the limit if it is needed to tell points apart
+        repeats=[p for p in self.points if p[0]==point[0] and p[1]==flowrate]
+        if len(repeats)>1:
+            name+='_'+str(step_limit)
+        return name
+
+    def next_point(self):
+        # Called from the keylogger thread when the operator is ready
+        if self.waiting_for_operator:
+            self.loop.call_soon_threadsafe(self.resume.set)
+        else:
+            print('Campaign is not waiting for the operator.')
+
+    def go_to_zero(self):
+        self.manager.set_param(self.psu,0)
+        self.manager.set_param(self.pump,0)
+
+    async def wait_for_operator(self, direction):
+        self.go_to_zero()
+        c1= '\x1b[1;30;43m'
+        c2='\x1b[0m'
+        print(c1+f'Campaign paused. Change the flow direction to {direction}, then type "next".'+c2)
+
+        self.status='waiting for operator 0'
+        self.waiting_for_operator=True
+        self.resume.clear()
+        await self.resume.wait()
+        self.waiting_for_operator=False
+
+    async def run_point(self, point):
+        direction, flowrate, step_limit=point
+        print(f'Campaign point {self.index+1} of {len(self.points)}: {direction}, {flowrate} ml/min, '
+              f'up to step {step_limit}')
+
+        if self.resuming:
+            self.resuming=False
+        else:
+            self.status='changing folder 0'
+            self.logger.change_folder(self.folder_name(point))
+
+            self.status='setting point 0'
+            self.manager.set_param(self.psu,0)
+            self.manager.set_param(self.pump,flowrate)
+
+        # The controller moves on to the next step once each SS has been recorded.
+        self.status='stepping 0'
+        while self.controller.step_count<=step_limit and not self._shutdown.is_set():
+            await self.controller.processed.wait()
+
+    async def process(self):
+        try:
+            while self.index<len(self.points) and not self._shutdown.is_set():
+                point=self.points[self.index]
+                if self.index>0 and point[0]!=self.points[self.index-1][0] and not self.resuming:
+                    await self.wait_for_operator(point[0])
+
+                await self.run_point(point)
+                self.index+=1
+
+            if not self._shutdown.is_set():
+                print('Campaign finished.')
+                self.go_to_zero()
+                self.status='finished 1'
+                if self.shutdown_when_done:
+                    self.manager.shutdown()
+                else:
+                    await self._shutdown.wait()
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        print(f'{self.name}: shutting down at point {self.index+1} of {len(self.points)}')
+        self._shutdown.set()
+        # Release the operator wait, so the task can finish
+        self.resume.set()
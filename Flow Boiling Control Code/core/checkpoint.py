@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:38:29 2026
+
+Checkpoints. Keeps a small JSON file with everything needed to pick a hot run up where it stopped:
+    - controller step count, and the setpoint/fine stepping state of each controlled device (PSU, pump...)
+    - DAQ state (SS/USS), lock and counter
+    - SS history of each SS sensor, so SS can be detected again straight away
+    - logger folder and file number, so data carries on in the same files
+    - position in the campaign, if there is one
+    - running TCR fits of a calibration run, if there are any
+
+The file is written every 'interval' seconds and at shutdown, to checkpoint.json in the logger's data folder
+(the folder the run started in, even if a campaign has since moved the logger on).
+It is written to a temporary file first and then moved into place, so a crash part way through a write never
+leaves a broken checkpoint.
+
+To resume, the objects are built as normal and restore() is called before they are started. The DAQ is put
+back into USS with only 'warmup' loops left to wait, instead of the full USS_count.
+"""
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+CHECKPOINT_NAME='checkpoint.json'
+
+def to_json(value):
+    # numpy arrays and numbers aren't JSON serialisable
+    if isinstance(value,np.ndarray):
+        return value.tolist()
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,(list,tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value,dict):
+        return {key:to_json(item) for key, item in value.items()}
+    return value
+
+def find_checkpoint(configurator):
+    # Checkpoint left in the data folder of a configuration, if there is one
+    for settings in configurator.modules.values():
+        if settings['Type']=='datalogger':
+            kwargs=settings['kwargs']
+            path=os.path.join(kwargs['save_path'],kwargs['folder_name'],CHECKPOINT_NAME)
+            if kwargs['saving']==True and os.path.exists(path):
+                return path
+    return None
+
+class checkpointer(object):
+    def __init__(self, manager, interval=30, warmup=10, path=None):
+        self.manager=manager
+        self.interval=interval
+        self.warmup=warmup
+        self.path=path
+        self.last_write=None
+        # Processes which only follow a run (see core/deployment.py) have nothing to checkpoint
+        self.enabled=True
+
+    def location(self):
+        # Saved alongside the data. Nothing is written if the run isn't saving.
+        if self.path is None:
+            for module in self.manager.module_dict.values():
+                if 'datalogger' in module[0].__class__.__name__ and module[0].saving==True:
+                    self.path=os.path.join(module[0].save_path,module[0].folder_name,CHECKPOINT_NAME)
+                    break
+        return self.path
+
+    def snapshot(self):
+        state={'time':time.time(),'devices':{},'DAQs':{},'sensors':{},'loggers':{}}
+
+        if 'controller' in dir(self.manager):
+            state['step_count']=self.manager.controller.step_count
+
+        for name, device in self.manager.control_dict.items():
+            device=device[0]
+            state['devices'][name]={'SP':device.SP,
+                                    'fine':getattr(device,'fine',False),
+                                    'fine_counter':getattr(device,'fine_counter',0)}
+
+        for name, hardware in self.manager.hardware_dict.items():
+            hardware=hardware[0]
+            if 'SS_bin' in dir(hardware):
+                state['DAQs'][name]={'state':hardware.state,
+                                     'counter':hardware._counter,
+                                     'locked':hardware.locked}
+
+        for name, sensor in self.manager.sensor_dict.items():
+            if 'history' in dir(sensor):
+                state['sensors'][name]={'history':sensor.history}
+
+        for name, module in self.manager.module_dict.items():
+            if 'datalogger' in module[0].__class__.__name__:
+                state['loggers'][name]={'folder_name':module[0].folder_name,
+                                        'filenumber':module[0].filenumber}
+
+        if 'campaign' in dir(self.manager):
+            state['campaign_index']=self.manager.campaign.index
+
+        if 'tcr_fit' in dir(self.manager):
+            state['tcr_fit']={'blocks':self.manager.tcr_fit.blocks,
+                              'fits':{heater:fit.state() for heater, fit in self.manager.tcr_fit.fits.items()}}
+
+        return to_json(state)
+
+    def write(self):
+        path=self.location() if self.enabled else None
+        if path is None:
+            return
+
+        temporary=path+'.tmp'
+        with open(temporary,'w') as file:
+            json.dump(self.snapshot(),file,separators=(',',':'))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary,path)
+        self.last_write=time.time()
+
+    def restore(self, path):
+        # Put the built (but not yet started) objects back into the checkpointed state
+        with open(path) as file:
+            state=json.load(file)
+        self.path=path
+
+        if 'step_count' in state and 'controller' in dir(self.manager):
+            self.manager.controller.step_count=state['step_count']
+
+        for name, saved in state['devices'].items():
+            if name in self.manager.control_dict:
+                device=self.manager.control_dict[name][0]
+                device.SP=np.array(saved['SP'])
+                if 'fine' in dir(device):
+                    device.fine=saved['fine']
+                    device.fine_counter=saved['fine_counter']
+
+        for name, saved in state['DAQs'].items():
+            if name in self.manager.hardware_dict:
+                DAQ=self.manager.hardware_dict[name][0]
+                # Start in USS, but only wait for a short warm-up before looking for SS again
+                DAQ.state='USS'
+                DAQ.locked=True
+                DAQ._counter=max(DAQ.USS_count-self.warmup,0)
+
+        for name, saved in state['sensors'].items():
+            if name in self.manager.sensor_dict:
+                self.manager.sensor_dict[name].history=saved['history']
+
+        for name, saved in state['loggers'].items():
+            if name in self.manager.module_dict:
+                logger=self.manager.module_dict[name][0]
+                if logger.folder_name!=saved['folder_name']:
+                    logger.folder_name=saved['folder_name']
+                    logger.create_directories()
+                logger.filenumber=saved['filenumber']
+                # Carry on appending to the same files rather than starting new ones
+                logger.startup=False
+
+        if 'campaign_index' in state and 'campaign' in dir(self.manager):
+            self.manager.campaign.index=state['campaign_index']
+            self.manager.campaign.resuming=True
+
+        if 'tcr_fit' in state and 'tcr_fit' in dir(self.manager):
+            self.manager.tcr_fit.blocks=state['tcr_fit']['blocks']
+            for heater, saved in state['tcr_fit']['fits'].items():
+                if heater in self.manager.tcr_fit.fits:
+                    self.manager.tcr_fit.fits[heater].restore(saved)
+
+        age=time.time()-state['time']
+        print(f"Resumed from checkpoint taken {age/60:.1f} min ago, at step {state.get('step_count',0)}")
+
+    async def process(self):
+        while not self.manager._shutdown.is_set():
+            try:
+                await asyncio.wait_for(self.manager._shutdown.wait(),self.interval)
+            except asyncio.TimeoutError:
+                try:
+                    self.write()
+                except OSError as error:
+                    print(f'Checkpoint not saved: {error}')
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:42:54 2026
+
+Commands. The one place where operator commands are turned into calls on the manager, shared by the keylogger
+(typed commands) and the command server (JSON requests from other programs).
+
+A command is a dict with a 'cmd' and its arguments, i.e.
+    {'cmd':'set', 'parameter':'PSU', 'value':20}
+    {'cmd':'batch', 'set':{'PSU':20, 'PUMP.SP':50}}     all or nothing, applied between two scans
+    {'cmd':'get', 'parameters':['PSU.SP','P1.P']}
+run_command() carries it out and returns a result which can be sent back as JSON. A command which can't be carried
+out raises command_error, with the reason, and changes nothing.
+
+Typed commands ('set_PSU_20', 'skip', ...) are converted with parse_text().
+"""
+from core.checkpoint import to_json
+
+HELP=('Welcome to the control code for flow-boiling experiments.'+
+      ' To set controllable variables, use the format, "set_device.parameter_value".'+
+      ' Device names can be found in the configuration dictionary or on the output table.\n'+' Can also type "trig" to trigger DAQ even if not at steady state. \n'+
+      ' To skip ahead to the next power increment or go back, use '+
+      'the "skip" and "back" commands.\n To see how long each stage of the acquisition takes, use "trace".\n'+
+      ' During a campaign, type "next" once the flow direction has been changed.\n'+
+      ' To safely exit the program use "quit".\n'+
+
+      ' The right arrow key serves in place of the enter key.\n\n'+
+      ' Code written by Chris Salmean- open for anyone to use but '
+      'please provide credit, share any improvements you make and '
+      'do not use for profit.')
+
+class command_error(ValueError):
+    pass
+
+def parse_text(text):
+    # Typed command to command dict. 'set_P1.SP_1' -> {'cmd':'set','parameter':'P1.SP','value':'1'}
+    if text[0:3] == 'set':
+        if len(text.split('_'))<3:
+            raise command_error(f'{text} not a command. Use "set_device.parameter_value"')
+        return {'cmd':'set','parameter':text.split('_')[1],'value':text.split('_')[-1]}
+
+    if text[0:3] == 'inp':
+        return {'cmd':'inp','value':text.split('_')[-1]}
+
+    return {'cmd':text}
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError,ValueError):
+        raise command_error(f'{value} is not a number')
+
+def read_values(manager, parameter):
+    # Current value of 'device' (its setpoint, or all its recorded values) or 'device.attribute'
+    device=parameter.split('.')[0].upper()
+    try:
+        target=manager.find(device)
+    except KeyError as error:
+        raise command_error(error.args[0])
+
+    if len(parameter.split('.'))>1:
+        attributes=[parameter.split('.')[-1]]
+    elif device in manager.control_dict:
+        attributes=['SP']
+    else:
+        attributes=manager.recorded_variables.get(device,{}).get('SS',[])
+
+    values={}
+    for attribute in attributes:
+        if attribute not in dir(target):
+            raise command_error(f'{device} has no attribute {attribute}')
+        values[device+'.'+attribute]=to_json(getattr(target,attribute))
+    return values
+
+def run_command(manager, command):
+    # Carry out one command. Returns whatever the command reports back (None for most).
+    name=command.get('cmd')
+
+    if name == 'quit':
+        manager.shutdown()
+
+    elif name == 'trig':
+        manager.manual_trigger()
+
+    elif name == 'inp':
+        manager.manual_input(to_float(command.get('value')))
+
+    elif name == 'set':
+        try:
+            return manager.set_params({command['parameter']:command['value']})
+        except KeyError as error:
+            raise command_error(f'set needs {error} as well as parameter and value')
+
+    elif name == 'batch':
+        if not isinstance(command.get('set'),dict) or len(command['set'])==0:
+            raise command_error('batch needs "set": {parameter: value, ...}')
+        return manager.set_params(command['set'])
+
+    elif name == 'get':
+        parameters=command.get('parameters',[command.get('parameter')])
+        if None in parameters:
+            raise command_error('get needs "parameter" or "parameters"')
+        values={}
+        for parameter in parameters:
+            values.update(read_values(manager,parameter))
+        return values
+
+    elif name == 'skip':
+        manager.step(1)
+
+    elif name == 'back':
+        manager.step(-1)
+
+    elif name == 'fine':
+        manager.toggle_fine()
+
+    elif name == 'trace':
+        manager.dump_trace()
+
+    elif name == 'next':
+        manager.next_point()
+
+    elif name == 'status':
+        status={name:record[1] for name, record in manager.module_dict.items()}
+        status.update({name:record[1] for name, record in manager.hardware_dict.items()})
+        if 'controller' in dir(manager):
+            status['step_count']=manager.controller.step_count
+            status['state']=manager.controller.state
+        return status
+
+    elif name == 'help':
+        return HELP
+
+    else:
+        raise command_error(f'{name} not a command.')
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:50 2026
+
+Multi-process deployment. Runs one experiment as three processes instead of one event loop, so that logging and
+display can no longer hold up control:
+    - control (this process): the instruments, sensors, controller, timer, alarms, telemetry and command server.
+      The datalogger is replaced by a ring publisher (see interface/ring_publisher.py), which only copies each
+      scan into shared memory.
+    - logging: the datalogger, which saves the SS/USS and error files as before, but prints nothing.
+    - display: a copy of the datalogger which doesn't save, the display module (or printed tables if there
+      isn't one), and the keylogger. Typed commands are sent back to the control process.
+The logging and display processes follow the scan ring (see interface/ring_follower.py).
+
+Between the processes there are only:
+    - the scan ring (core/scan_ring.py): every recorded value of every scan
+    - one event queue per process: alarms and errors for the error log, saves, folder changes and 'stop'
+    - one command queue: typed commands, from the display process to the control process
+
+    separate=deployment(spec)
+    hardwares, modules=await build(man,separate)
+    separate.start(man)
+    await run_experiment(man,hardwares,modules)
+    separate.join()
+
+Only the control process writes checkpoints. A resumed run carries on in the checkpointed folder, but the logger
+starts new files there rather than appending to the last ones.
+"""
+import asyncio
+import copy
+import multiprocessing
+import signal
+import time
+from types import SimpleNamespace
+
+from core.manager import module_manager
+from core.builder import build
+from core.runtime import run_experiment
+
+# Types which run outside the control process, and the process they go to
+OUTPUT_TYPES={'display':'display','keylogger':'display'}
+
+def split_modules(modules):
+    # Modules of the control, logging and display processes
+    control={}
+    outputs={'logging':{},'display':{}}
+    for name, settings in modules.items():
+        if settings['Type']=='datalogger':
+            control[name]={'Type':'remote_datalogger','kwargs':settings['kwargs']}
+
+            logging=copy.deepcopy(settings)
+            logging['kwargs']['printing']=False
+            outputs['logging'][name]=logging
+
+            showing=copy.deepcopy(settings)
+            showing['kwargs']['saving']=False
+            outputs['display'][name]=showing
+        elif settings['Type'] in OUTPUT_TYPES:
+            outputs[OUTPUT_TYPES[settings['Type']]][name]=copy.deepcopy(settings)
+        else:
+            control[name]=settings
+    return control, outputs
+
+class deployment(object):
+    def __init__(self, configurator, capacity=1000):
+        self.name=getattr(configurator,'name','run')
+        self.hardware=configurator.hardware
+        self.modules, self.outputs=split_modules(configurator.modules)
+
+        loggers=[settings for settings in configurator.modules.values() if settings['Type']=='datalogger']
+        if len(loggers)==0:
+            raise ValueError(f'{self.name} has no datalogger, so there is nothing to run in other processes')
+
+        self.commands=multiprocessing.Queue()
+        self.events={role:multiprocessing.Queue() for role in self.outputs}
+
+        for settings in self.outputs['display'].values():
+            if settings['Type']=='keylogger':
+                settings.setdefault('kwargs',{})
+                settings['kwargs']['commands']=self.commands
+
+        # Added last, so that every other object is there to be published
+        self.modules['ring']={'Type':'ring_publisher',
+                              'kwargs':{'SS_target':loggers[0]['kwargs']['SS_target'],
+                                        'outputs':list(self.events.values()),
+                                        'commands':self.commands,
+                                        'capacity':capacity}}
+        self.publisher=None
+        self.processes=[]
+
+    def start(self, manager):
+        # Once the control process's objects are built
+        self.publisher=manager.publisher
+        layout=self.publisher.layout()
+        for role, modules in self.outputs.items():
+            process=multiprocessing.Process(target=output_process,args=(role,modules,layout,self.events[role]),
+                                            name=f'{self.name} {role}')
+            process.start()
+            self.processes.append(process)
+        print(f'{self.name}: logging and display running in processes '
+              +', '.join(str(process.pid) for process in self.processes))
+
+    def join(self, timeout=30):
+        # Once the control process has stopped. The other processes finish what is left in the ring first.
+        end=time.time()+timeout
+        for process in self.processes:
+            process.join(max(0,end-time.time()))
+            if process.is_alive():
+                print(f'{process.name} did not stop in {timeout} s, terminating it')
+                process.terminate()
+                process.join()
+        if self.publisher is not None:
+            self.publisher.ring.close()
+
+def output_process(role, modules, layout, events):
+    # Entry point of the logging and display processes. Ctrl+C is dealt with by the control process, which then
+    # tells this one to stop.
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+    asyncio.run(follow(role,modules,layout,events))
+
+async def follow(role, modules, layout, events):
+    man=module_manager()
+    man.name=role
+    man.checkpoint.enabled=False
+
+    follower={'Type':'ring_follower','kwargs':{'layout':layout,'events':events,'latest_only':role=='display'}}
+    modules={'ring':follower,**modules}
+    # The follower's mirrors stand in for everything of the control process which isn't built here
+    follower['kwargs']['objects']=[name for name in layout['objects'] if name not in modules]
+    hardwares, built=await build(man,SimpleNamespace(hardware={},modules=modules))
+
+    await run_experiment(man,hardwares,built)
+    man.find('ring').ring.close()
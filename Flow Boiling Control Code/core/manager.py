@@ -3,7 +3,10 @@
 Created on Tue Sep 14 13:54:35 2021
 
 Manager module, which collects status updates from all modules and restarts them if for some reason they break.
-Also waits for commands to be passed from the keyboard logger and distributes them to the right devices
+Status changes are passed to the manager as they happen, and the supervisor restarts anything which reports an error
+or whose task stops (see core/supervisor.py).
+Also carries out commands from the keyboard logger and command server (see core/commands.py) and distributes them
+to the right devices
 
 Status codes:
     0: has begun
@@ -16,8 +19,16 @@ import asyncio
 import time
 import numpy as np
 
+from core.tracer import stage_tracer
+from core.watchdog import loop_watchdog
+from core.supervisor import supervisor
+from core.checkpoint import checkpointer
+from core.safe_state import safe_state
+from core.commands import command_error
+from core.runtime import task_group
+
 class module_manager(object):
-    def __init__(self):
+    def __init__(self, **kwargs):
         self.name='man'
         self.module_dict={}
         self.hardware_dict={}
@@ -28,9 +39,36 @@ class module_manager(object):
         self.startup_time=time.time()
         
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         
         self.recorded_variables={}
+        self.tasks=[]
+        
+        # Time taken to create each hardware object [s] (see core/builder.py)
+        self.connect_times={}
+        
+        # Timing histograms for each stage of the acquisition loop
+        self.tracer=stage_tracer()
+        
+        # Watches for anything blocking the event loop for longer than lag_threshold [s]
+        self.watchdog=loop_watchdog(self,threshold=kwargs.get('lag_threshold',0.25))
+        
+        # Restarts broken modules. Gives up (and raises restart_action) after max_restarts within restart_window [s]
+        self.supervisor=supervisor(self,
+                                   max_restarts=kwargs.get('max_restarts',5),
+                                   window=kwargs.get('restart_window',300),
+                                   exhausted_action=kwargs.get('restart_action','Alert'))
+        
+        # Saves the step, SS windows and file numbers every checkpoint_interval [s], so an interrupted run can be resumed
+        self.checkpoint=checkpointer(self,
+                                     interval=kwargs.get('checkpoint_interval',30),
+                                     warmup=kwargs.get('resume_warmup',10))
+        
+        # On shutdown, drives the devices with a safe position to it, power first, each given safe_state_timeout [s]
+        self.safe_state=safe_state(self,
+                                   deadline=kwargs.get('safe_state_deadline',10),
+                                   timeout=kwargs.get('safe_state_timeout',5))
+        self.shutdown_task=None
         
     def alarm(self,target,alarm_type,action):
         # If alarm is triggered, it is sent to the manager. Manager decides what needs to be done.
@@ -47,6 +85,9 @@ class module_manager(object):
                     except:
                         pass
         
+        if 'telemetry' in dir(self):
+            self.telemetry.event([np.round((time.time()-self.startup_time),2),action,target.name,alarm_type])
+        
         if action =='Alert':
             pass
         elif action == 'Stop':
@@ -54,26 +95,37 @@ class module_manager(object):
             # self.safety_procedure()
             self.shutdown()
         
-    async def check_status(self):
-        # Collects status of each module
-        checkdict={**self.module_dict,**self.hardware_dict}
-        for name, item in checkdict.items():
-            status=item[0].status
-            checkdict[name][1]=status
-            # print('\n.')
-            if status[-1] == '2':
-                # If a module reports any problems, restart it and report error to logger
-                c1= '\x1b[1;37;41m'
-                c2 = '\x1b[0m'
-                
-                print(c1+ f'Error detected in {name}. \nStatus: {status}' + c2)
-                await self.perform_restart(item[0])
-                print('Restart initiated')
-                # And transmit error code to logger
-                for module in self.module_dict.values():
-                    if 'datalogger' in module[0].__class__.__name__:
-                        message=[np.round((time.time()-self.startup_time),2),'error',name,status]
-                        module[0].log_error(message)
+    def find(self, name):
+        # Look up a module or hardware object by the name given in the configuration
+        for records in (self.module_dict,self.hardware_dict):
+            if name in records:
+                return records[name][0]
+        raise KeyError(f'No object named {name}. Objects can only refer to those set up before them in the configuration.')
+        
+    def status_changed(self, obj, status):
+        # Called by each module/hardware object whenever its status changes
+        for records in (self.module_dict,self.hardware_dict):
+            if obj.name in records:
+                records[obj.name][1]=status
+        
+        if status[-1] == '2':
+            # If a module reports any problems, the supervisor restarts it and reports error to logger
+            self.supervisor.report(obj,status)
+    
+    def launch(self, obj):
+        # Start the object's process() task under supervision
+        return self.supervisor.launch(obj)
+
+    def dump_trace(self):
+        # Print the stage timings collected so far and save them with the data
+        print('\n'+self.tracer.report())
+        lag=self.watchdog.statistics()
+        if lag['count']>0:
+            print(f"\nLoop lag p50: {lag['p50_ms']:.2f} ms, p99: {lag['p99_ms']:.2f} ms, "
+                  f"max: {lag['max_ms']:.2f} ms, stalls: {lag['stalls']}")
+        for module in self.module_dict.values():
+            if 'datalogger' in module[0].__class__.__name__:
+                module[0].save_trace(self.tracer)
 
     def manual_trigger(self):
         # If timer is periodic, can skip minimum waiting time before SS is detected and tell DAQ that SS has been detected.
@@ -88,27 +140,40 @@ class module_manager(object):
                 for device, value in module[0].SS_bin.items():
                     module[0].SS_bin[device]='SS'
                 
+    def log_error(self,message):
+        # Pass error message on to the datalogger, which saves it in the error log, and to telemetry subscribers
+        for module in self.module_dict.values():
+            if 'datalogger' in module[0].__class__.__name__:
+                module[0].log_error(message)
+        
+        if 'telemetry' in dir(self):
+            self.telemetry.event(message)
+                
+    def next_point(self):
+        # Operator is ready for the campaign to carry on
+        if 'campaign' not in dir(self):
+            print('No campaign running.')
+        else:
+            self.campaign.next_point()
+                
     def manual_input(self,value):
         target=None
         for objectname in self.hardware_dict:
             if 'INP' in objectname.upper():
-                importstring='from __main__ import ' + objectname
-                exec(importstring)
-                
-                target=eval(objectname)
+                target=self.find(objectname)
                 
         if target!=None:
             target.alter(value)
 
-    async def perform_restart(self, module):
-        print(f'Restarting {module}')
-        self.loop.create_task(module.restart())
-        
     async def process(self):
-        # Check status of all modules every 0.5 seconds.
-        while not self._shutdown.is_set():
-            await self.check_status()
-            await asyncio.sleep(0.5)
+        # Supervisor waits for errors and crashes until shutdown. Meanwhile, the watchdog measures the event loop lag
+        # and checkpoints are saved.
+        # Cancelling the manager cancels these too
+        async with task_group() as tasks:
+            tasks.create_task(self.watchdog.process())
+            tasks.create_task(self.checkpoint.process())
+            
+            await self.supervisor.process()
     
     def safety_procedure(self):
          # Moves controlled devices back to safe setpoint.
@@ -117,34 +182,81 @@ class module_manager(object):
              device.set_actual(device.safe_pos)
          
     def set_param(self,parameter, value):
+        try:
+            self.set_params({parameter:value})
+        except command_error as error:
+            print(error)
+    
+    def set_params(self, changes):
+        # Changes several setpoints at once: {'PSU':20, 'PUMP.SP':50}. Every change is checked before any is made,
+        # and all are made before the controller runs again, so they always take effect in the same scan.
         if 'controller' not in dir(self):
-            print('No controller instantiated.')
-            
-        else:
-            # can be in format 'set_P1_1' or 'set_P1.SP_1'. Attribute is optional.
+            raise command_error('No controller instantiated.')
+        
+        checked=[]
+        for parameter, value in changes.items():
+            # can be in format 'P1' or 'P1.SP'. Attribute is optional.
+            parameter=str(parameter)
             device=parameter.split('.')[0].upper()
-            if device in self.hardware_dict.keys():
-                if len(parameter.split('.'))>1:
-                    attribute=parameter.split('.')[-1].upper()
-                    
-                elif device in self.control_dict.keys():
-                    attribute='SP'
-                            
-                elif device in self.sensor_dict.keys():
-                    attribute='SP' 
-                else:
-                    attribute=None
-                    
-                self.controller.change_attribute(device, attribute, value)
-                # trigger controller to run through again.
-                for sensor in self.sensor_dict.values():
-                    sensor.new_values.set()
+            if device not in self.hardware_dict.keys():
+                raise command_error(f'No device named {device} in records. Check device names are in ALL CAPS')
                 
+            if len(parameter.split('.'))>1:
+                attribute=parameter.split('.')[-1].upper()
+            elif device in self.control_dict.keys() or device in self.sensor_dict.keys():
+                attribute='SP'
             else:
-                print(f'No device named {device} in records. Check device names are in ALL CAPS')     
+                raise command_error(f'{device} has no setpoint. Give the attribute, i.e. {device}.SP')
+            
+            try:
+                value=float(value)
+            except (TypeError,ValueError):
+                raise command_error(f'{value} is not a number')
+            checked.append((device,attribute,value))
+        
+        for device, attribute, value in checked:
+            self.controller.change_attribute(device, attribute, value)
+            
+        # trigger controller to run through again.
+        for sensor in self.sensor_dict.values():
+            sensor.new_values.set()
+        
+        return {device+'.'+attribute:value for device, attribute, value in checked}
             
     def shutdown(self):
-        # Performs shutdown procedure. This requires commanding each device to stop in turn, then cancelling the asynchronous tasks
+        # Performs shutdown procedure. Devices are made safe first, all at once (see core/safe_state.py), then
+        # each module and device is stopped in turn (so the logger saves what it has), then the asynchronous tasks are cancelled
+        # Nothing is restarted from here on
+        # On the event loop, making devices safe (blocking writes, waiting for their threads) is done in a worker
+        # thread and the rest follows once it is finished. The task doing this is returned, for anything which has
+        # to wait for the shutdown to be over (i.e. run_experiment in core/runtime.py).
+        self._shutdown.set()
+        
+        try:
+            loop=asyncio.get_running_loop()
+        except RuntimeError:
+            self.safe_state.run()
+            self.stop_all()
+            return None
+        
+        if self.shutdown_task is None:
+            self.shutdown_task=loop.create_task(self.shut_down())
+        return self.shutdown_task
+    
+    async def shut_down(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None,self.safe_state.run)
+        finally:
+            self.stop_all()
+    
+    def stop_all(self):
+        # Save a last checkpoint, before anything is stopped (making devices safe doesn't change their setpoints).
+        # A checkpoint which can't be written mustn't get in the way of the shutdown.
+        try:
+            self.checkpoint.write()
+        except Exception as error:
+            print(f'Checkpoint not saved: {error!r}')
+        
         for name, module in self.module_dict.items():
             module[0].stop()
             status=module[0].status
@@ -170,6 +282,8 @@ class module_manager(object):
         # shuts self down
         print(f'{self.name}: shutting down')
         self._shutdown.set()
+        self.watchdog.stop()
+        self.supervisor.stop()
             
     def toggle_fine(self):
         # changes step size for psu to 1/2 of previous step size
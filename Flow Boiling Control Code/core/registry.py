@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:33:56 2026
+
+Driver registry. Turns the 'Type' names used in the configuration files into classes.
+
+Each Type is registered as 'module:class', and the module is only imported the first time that Type is used.
+A run therefore only loads the libraries its own hardware needs: a manual run with no PSU never imports
+ea_psu_controller, and a dummy run never needs pyvisa for the Agilent.
+
+Drivers kept outside this folder can be added without editing this file, by installing them as a package with
+an entry point in the 'flowboiling.drivers' group, i.e. in its pyproject.toml:
+
+    [project.entry-points."flowboiling.drivers"]
+    camera = "my_camera.driver:camera"
+
+The entry point name is then usable as a 'Type' in the configuration.
+
+The time taken to import each module is kept in import_times, so slow imports show up in the startup time.
+"""
+import importlib
+import time
+
+ENTRY_POINT_GROUP='flowboiling.drivers'
+
+# Type name: 'module:class'
+DRIVERS={
+    # Modules
+    'timer':'core.timer:timer',
+    'controller':'hardware.control_unit:controller',
+    'datalogger':'interface.logger:datalogger',
+    'keylogger':'interface.keylogger:keylogger',
+    'display':'interface.display:display',
+    'telemetry':'interface.telemetry:telemetry',
+    'command_server':'interface.command_server:command_server',
+    'activator':'hardware.activation:activator',
+    'campaign':'core.campaign:campaign',
+    'tcr_fit':'core.tcr_fit:tcr_fit',
+    'ring_publisher':'interface.ring_publisher:ring_publisher',
+    'remote_datalogger':'interface.ring_publisher:remote_datalogger',
+    'ring_follower':'interface.ring_follower:ring_follower',
+
+    # DAQs
+    'DAQ6510':'hardware.DAQ.Keithley_DAQ6510:DAQ6510',
+    'Agilent34970A':'hardware.DAQ.Agilent_34970A:Agilent34970A',
+
+    # Physical sensors
+    'VDC':'hardware.DAQ.phys_sensors:VDC',
+    'VAC':'hardware.DAQ.phys_sensors:VAC',
+    'TC':'hardware.DAQ.phys_sensors:TC',
+    'PT100':'hardware.DAQ.phys_sensors:PT100',
+    'Res':'hardware.DAQ.phys_sensors:Res',
+    'P_sensor':'hardware.DAQ.phys_sensors:P_sensor',
+    'RTD':'hardware.DAQ.phys_sensors:RTD',
+    'DC_heater':'hardware.DAQ.phys_sensors:DC_heater',
+    'AC_heater':'hardware.DAQ.phys_sensors:AC_heater',
+    'DC_shunt':'hardware.DAQ.phys_sensors:DC_shunt',
+    'AC_shunt':'hardware.DAQ.phys_sensors:AC_shunt',
+
+    # Virtual sensors
+    'combined_Q':'hardware.DAQ.virt_sensors:combined_Q',
+    'man_input':'hardware.DAQ.virt_sensors:man_input',
+
+    # Controlled devices
+    'stepper':'hardware.microcontroller.stepper:stepper',
+    'inverter':'hardware.microcontroller.inverter:inverter',
+    'HP33120A':'hardware.power_supply.HP_33120A:HP33120A',
+    'EAPS2384':'hardware.power_supply.EA_PS2384:EAPS2384',
+    'HNPM':'hardware.pump.hnpm_mzr_2921X1:HNPM',
+    }
+
+_loaded={}
+_plugins=None
+import_times={}
+
+def register_driver(type_name, target):
+    # Add or replace a Type. target is 'module:class', or the class itself.
+    if isinstance(target,str):
+        DRIVERS[type_name]=target
+        _loaded.pop(type_name,None)
+    else:
+        _loaded[type_name]=target
+
+def plugin_drivers():
+    # Entry points from installed packages. Only looked up once, and only if a Type isn't found in DRIVERS.
+    global _plugins
+    if _plugins is None:
+        _plugins={}
+        try:
+            from importlib.metadata import entry_points
+            points=entry_points()
+            if hasattr(points,'select'):
+                points=points.select(group=ENTRY_POINT_GROUP)
+            else:
+                points=points.get(ENTRY_POINT_GROUP,[])
+            for point in points:
+                _plugins[point.name]=point.value
+        except ImportError:
+            pass
+    return _plugins
+
+def driver_names():
+    return sorted({**plugin_drivers(),**DRIVERS})
+
+def load_driver(type_name):
+    # Returns the class for a configuration 'Type', importing its module if this is the first use.
+    if type_name in _loaded:
+        return _loaded[type_name]
+
+    if type_name in DRIVERS:
+        target=DRIVERS[type_name]
+    elif type_name in plugin_drivers():
+        target=plugin_drivers()[type_name]
+    else:
+        raise KeyError(f'No driver registered for Type {type_name}. Known types: {", ".join(driver_names())}')
+
+    module_name, _, attribute=target.partition(':')
+    start=time.perf_counter()
+    module=importlib.import_module(module_name)
+    if module_name not in import_times:
+        import_times[module_name]=time.perf_counter()-start
+
+    driver=module
+    for part in attribute.split('.'):
+        driver=getattr(driver,part)
+
+    _loaded[type_name]=driver
+    return driver
+
+def package_attribute(package, name):
+    # Module-level __getattr__ for the hardware and interface packages, i.e. 'hardware.DAQ6510' still works,
+    # but only imports the driver when asked for.
+    for type_name, target in DRIVERS.items():
+        if target.startswith(package+'.') and target.partition(':')[2]==name:
+            return load_driver(type_name)
+    raise AttributeError(f'module {package!r} has no attribute {name!r}')
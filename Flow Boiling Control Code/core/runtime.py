@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:58:29 2026
+
+Runtime. Runs one experiment inside asyncio.run, with every task belonging to a task group, so that a run
+no longer depends on an event loop left lying around by the console (old Spyder/IPython setups).
+
+    async def main():
+        man=module_manager()
+        hardwares, modules=await build(man,configurator)
+        await run_experiment(man,hardwares,modules)
+
+    start_run(main())
+
+    - Objects must be created inside the coroutine, so that they pick up the loop the run is on.
+    - The manager, hardware and module tasks (and any restarts by the supervisor) are all started in one task
+      group. The run only ends once every one of them has finished, and nothing is left running afterwards.
+    - An exception inside an object's task is handled by the supervisor (restart), not passed to the group.
+    - However the run ends (shutdown, duration, an exception, Ctrl+C), devices are made safe on the way out.
+
+On Python 3.11+ asyncio.TaskGroup is used. Older versions get a small stand-in with the same interface.
+"""
+import asyncio
+
+from core.builder import launch
+
+class _task_group(object):
+    # Stand-in for asyncio.TaskGroup (Python < 3.11). Leaving the block waits for every task, including any
+    # added while waiting. An exception in the block cancels the tasks.
+    def __init__(self):
+        self.tasks=set()
+
+    def create_task(self, coroutine):
+        task=asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        return task
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            for task in self.tasks:
+                task.cancel()
+        while True:
+            pending=[task for task in self.tasks if not task.done()]
+            if len(pending)==0:
+                break
+            await asyncio.wait(pending)
+        return False
+
+task_group=getattr(asyncio,'TaskGroup',_task_group)
+
+async def run_experiment(manager, hardwares, modules, duration=None):
+    # Runs until the manager is shut down, or for duration [s]
+    try:
+        async with task_group() as tasks:
+            manager.supervisor.spawn=tasks.create_task
+            launch(manager,hardwares,modules)
+
+            try:
+                await asyncio.wait_for(manager._shutdown.wait(),duration)
+            except asyncio.TimeoutError:
+                print(f'{duration} s elapsed')
+                manager.shutdown()
+    finally:
+        if not manager._shutdown.is_set():
+            manager.shutdown()
+        # Devices are made safe in a worker thread. The run isn't over until they are.
+        if manager.shutdown_task is not None:
+            await asyncio.shield(manager.shutdown_task)
+
+def start_run(coroutine):
+    # In a console which is already running an event loop (i.e. IPython), the run goes on that loop in the
+    # background so the console can still be used. Otherwise the run gets a loop of its own.
+    try:
+        loop=asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    return loop.create_task(coroutine)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:56:28 2026
+
+Safe-state shutdown. Drives every device with a 'safe_position' (the manager's safety dict) to its safe position
+and switches it off, as fast as possible, before anything else is stopped.
+
+Devices used to be stopped one after another, so on an overheating alarm the PSU could be waiting behind the pump's
+serial writes. Now:
+    - devices are taken in order of their 'safety_priority' (power supplies 0, everything else 1 unless the
+      configuration says otherwise). Lower numbers go first.
+    - devices with the same priority are made safe at the same time, each in its own thread, since the drivers
+      block on serial/visa writes and sleeps.
+    - each device is given 'safety_timeout' [s] (default: the manager's safe_state_timeout). A device which takes
+      longer is reported as timed out, and the next priority goes ahead without it.
+    - if the whole shutdown takes longer than the manager's safe_state_deadline [s], the remaining devices are all
+      started at once and not waited for.
+The time taken to reach safe state, and any device which failed or timed out, is printed and sent to the error log
+before the logger is stopped, so it is saved with the data.
+
+On the event loop, run() as a whole goes to a worker thread (see manager.shutdown), so waiting for the devices
+doesn't hold up the loop. Controlled devices stop responding to the controller as soon as the shutdown begins.
+"""
+import threading
+import time
+
+import numpy as np
+
+class safe_state(object):
+    def __init__(self, manager, deadline=10, timeout=5):
+        self.manager=manager
+        self.deadline=deadline
+        self.timeout=timeout
+
+        self.results={}
+        self.elapsed=None
+
+    def groups(self):
+        # Devices in the safety dict, grouped by priority, lowest first
+        priorities={}
+        for device in self.manager.safety.values():
+            priorities.setdefault(device.safety_priority,[]).append(device)
+        return [priorities[priority] for priority in sorted(priorities)]
+
+    def make_safe(self, device):
+        start=time.perf_counter()
+        try:
+            device.make_safe()
+            self.results[device.name]=('safe',time.perf_counter()-start)
+        except Exception as error:
+            self.results[device.name]=(f'failed: {error!r}',time.perf_counter()-start)
+
+    def run(self):
+        self.results={}
+        start=time.perf_counter()
+        end=start+self.deadline
+
+        for devices in self.groups():
+            group_start=time.perf_counter()
+            threads=[]
+            for device in devices:
+                thread=threading.Thread(target=self.make_safe,args=(device,),name=f'safe state: {device.name}',
+                                        daemon=True)
+                thread.start()
+                threads.append((device,thread))
+
+            if time.perf_counter()>end:
+                # Out of time: don't wait for anything else
+                for device, thread in threads:
+                    self.results.setdefault(device.name,('not confirmed (deadline passed)',None))
+                continue
+
+            for device, thread in threads:
+                timeout=device.safety_timeout if device.safety_timeout is not None else self.timeout
+                thread.join(max(0,min(group_start+timeout,end)-time.perf_counter()))
+                if thread.is_alive():
+                    self.results.setdefault(device.name,('timed out',time.perf_counter()-group_start))
+
+        self.elapsed=time.perf_counter()-start
+        self.report()
+        return self.results
+
+    def report(self):
+        if len(self.results)==0:
+            return
+        problems=[f'{name} {result}' for name, (result, _) in self.results.items() if result!='safe']
+
+        c1='\33[42m' if len(problems)==0 else '\33[41m'
+        c2='\33[0m'
+        if len(problems)==0:
+            print(c1+f'Safe state reached in {self.elapsed:.2f} s'+c2)
+        else:
+            print(c1+f'Safe state NOT confirmed for every device after {self.elapsed:.2f} s. Check the rig!'+c2)
+        for name, (result, elapsed) in self.results.items():
+            print(f'    {name}: {result}'+(f' ({elapsed:.2f} s)' if elapsed is not None else ''))
+
+        message=f'Safe state in {self.elapsed:.2f} s'
+        if len(problems)>0:
+            message+='. '+', '.join(problems)
+        self.manager.log_error([np.round((time.time()-self.manager.startup_time),2),'Shutdown',self.manager.name,message])
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:50 2026
+
+Scan ring. A ring buffer of scans in shared memory (multiprocessing.shared_memory), which other processes on the
+same computer can follow live: the logging and display processes of a multi-process run (see core/deployment.py),
+and anything else which wants the data of a DAQ as it comes in (see 'scan_ring' in hardware/DAQ/general_DAQ.py),
+i.e. a notebook, a dashboard or a second logger.
+
+The memory holds a NumPy structured array, one slot per scan, so readers can use the data where it is without
+copying it. One process writes; any number of others read, and nobody waits for anybody:
+    - every slot has a sequence counter. The writer makes it odd (2n-1) before it starts writing scan n into the
+      slot, and even (2n) once it has finished.
+    - a reader checks the counter is 2n before using scan n and again afterwards. If it has changed, the writer
+      has gone round the ring and reused the slot in the meantime, and the scan is counted as lost.
+    - the writer never waits for readers. A reader which falls more than 'capacity' scans behind loses the
+      oldest scans rather than holding the writer up.
+
+This only works with a single writer: two processes writing the same ring would reuse each other's slots and
+sequence counters. There are no locks or memory fences either. The counter and the data are plain stores into
+shared memory, and readers rely on seeing them in the order they were made, which x86/x86-64 processors guarantee
+(stores are never reordered with other stores, nor loads with other loads). On a weakly ordered processor (ARM,
+i.e. Apple silicon or a Raspberry Pi) a reader could see the new counter before the data, so the check above
+would not be enough there.
+
+Layout of the shared memory:
+    header     int64 x 8: latest scan, capacity, length of the layout
+    layout     JSON: names of the columns of each block, and the rows each slot has room for
+    slots      capacity x slot dtype (see slot_dtype)
+
+Each slot holds the scan number, its number of rows (sweeps), state (1: SS, 0: USS), controller step, times of
+the first and last readings, and one rows x columns block of float64 values per entry in the layout, i.e. 'raw'
+(readings from the DAQ) and 'values' (converted by the sensors). Only the first 'rows' rows of a block are used.
+A scan with more rows than a slot has room for (i.e. several blocks of sweeps drained at once by a hardware-timed
+DAQ) is written to as many slots as it needs, one after the other, with the times spread evenly between its first
+and last readings. Nothing is cut off.
+
+To follow a ring from a notebook or console:
+    ring=scan_ring('flowboiling_DAQ')
+    for scan in ring.follow():
+        print(scan['t'], scan['values'][:scan['rows']].mean(axis=0))
+
+    python -m core.scan_ring flowboiling_DAQ
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+HEADER_BYTES=64
+LATEST, CAPACITY, LAYOUT=range(3)
+
+def slot_dtype(blocks, max_rows):
+    # blocks: {name: [column names]}
+    fields=[('sequence','<i8'),('scan','<i8'),('rows','<i8'),('state','<i8'),('step','<i8'),('t','<f8',(2,))]
+    fields+=[(block,'<f8',(max_rows,len(columns))) for block, columns in blocks.items()]
+    return np.dtype(fields,align=True)
+
+def stack_columns(columns):
+    # One rows x columns block from values of different lengths. Columns with fewer values (i.e. setpoints) have
+    # their last value repeated, as the logger does. Columns with none are NaN.
+    columns=[np.atleast_1d(np.asarray(values,dtype=float)) for values in columns]
+    rows=max([len(values) for values in columns]+[1])
+    block=np.full((rows,len(columns)),np.nan)
+    for number, values in enumerate(columns):
+        if len(values)>0:
+            block[:len(values),number]=values
+            block[len(values):,number]=values[-1]
+    return block
+
+def data_offset(layout_length):
+    # Slots start on a 64-byte boundary after the layout
+    return HEADER_BYTES+64*((layout_length+63)//64)
+
+class scan_ring(object):
+    def __init__(self, name=None, blocks=None, max_rows=1, capacity=1000):
+        # Creates a new ring if the blocks are given, otherwise opens the existing ring called 'name'
+        self.owner=blocks is not None
+        if self.owner:
+            layout=json.dumps({'blocks':blocks,'max_rows':max_rows}).encode()
+            dtype=slot_dtype(blocks,max_rows)
+            self.memory=shared_memory.SharedMemory(name=name,create=True,
+                                                   size=data_offset(len(layout))+capacity*dtype.itemsize)
+            self.memory.buf[HEADER_BYTES:HEADER_BYTES+len(layout)]=layout
+            header=np.ndarray((8,),dtype=np.int64,buffer=self.memory.buf)
+            header[:]=[0,capacity,len(layout),0,0,0,0,0]
+        else:
+            self.memory=shared_memory.SharedMemory(name=name)
+            if multiprocessing.parent_process() is None:
+                # Opened by a separate program (not one of our own processes, which share the tracker of the
+                # process which made the ring). Otherwise Python would delete the ring when this program exits.
+                resource_tracker.unregister(self.memory._name,'shared_memory')
+
+        self.name=self.memory.name
+        self.header=np.ndarray((8,),dtype=np.int64,buffer=self.memory.buf)
+        self.capacity=int(self.header[CAPACITY])
+        layout_length=int(self.header[LAYOUT])
+        layout=json.loads(bytes(self.memory.buf[HEADER_BYTES:HEADER_BYTES+layout_length]))
+        self.blocks=layout['blocks']
+        self.max_rows=layout['max_rows']
+        self.slots=np.ndarray((self.capacity,),dtype=slot_dtype(self.blocks,self.max_rows),buffer=self.memory.buf,
+                              offset=data_offset(layout_length))
+        self.sequence=self.slots['sequence']
+
+        # Readers start from the oldest scan still in the ring
+        self.position=max(0,self.latest()-self.capacity)
+        self.lost=0
+
+    def latest(self):
+        # Number of the last scan written
+        return int(self.header[LATEST])
+
+    def write(self, state=0, step=0, t=(0,0), **blocks):
+        # One scan. blocks: {name: rows x columns}. Only the writer calls this. Returns the number of the last slot
+        # written, as a scan with more than max_rows rows takes up several.
+        blocks={block:np.asarray(values,dtype=np.float64) for block, values in blocks.items()}
+        rows=max([len(values) for values in blocks.values()]+[1])
+        if rows<=self.max_rows:
+            return self.write_slot(state,step,t,blocks)
+
+        first, last=t
+        for start in range(0,rows,self.max_rows):
+            stop=min(start+self.max_rows,rows)
+            # A block with fewer rows than the others keeps its last row
+            part={block:values[start:stop] if len(values)>start else values[-1:] for block, values in blocks.items()}
+            times=(first+(last-first)*start/(rows-1),first+(last-first)*(stop-1)/(rows-1))
+            scan=self.write_slot(state,step,times,part)
+        return scan
+
+    def write_slot(self, state, step, t, blocks):
+        scan=self.latest()+1
+        index=(scan-1)%self.capacity
+        self.sequence[index]=2*scan-1
+
+        rows=0
+        for block, values in blocks.items():
+            self.slots[block][index,:len(values)]=values
+            rows=max(rows,len(values))
+        self.slots['scan'][index]=scan
+        self.slots['rows'][index]=rows
+        self.slots['state'][index]=state
+        self.slots['step'][index]=step
+        self.slots['t'][index]=t
+
+        self.sequence[index]=2*scan
+        self.header[LATEST]=scan
+        return scan
+
+    def get(self, scan):
+        # Scan number 'scan', where it lies in shared memory (no copy), or None if it has been overwritten.
+        # The writer may reuse the slot at any time after, so check valid(scan) once finished with it.
+        index=(scan-1)%self.capacity
+        if self.sequence[index]!=2*scan:
+            return None
+        return self.slots[index]
+
+    def valid(self, scan):
+        return self.sequence[(scan-1)%self.capacity]==2*scan
+
+    def copy(self, scan):
+        # Scan number 'scan', copied out of shared memory, or None if it has been overwritten
+        record=self.get(scan)
+        if record is None:
+            return None
+        record=record.copy()
+        return record if self.valid(scan) else None
+
+    def read(self):
+        # Copies of every scan written since the last read, oldest first
+        latest=self.latest()
+        first=max(self.position+1,latest-self.capacity+1)
+        self.lost+=first-self.position-1
+
+        scans=[]
+        for scan in range(first,latest+1):
+            record=self.copy(scan)
+            if record is None:
+                self.lost+=1
+            else:
+                scans.append(record)
+        self.position=latest
+        return scans
+
+    def follow(self, poll=0.01, max_poll=0.2):
+        # Yields every new scan, without copying it, as it is written. Anything overwritten while the caller was
+        # still using it is counted in 'lost'. While there is nothing new, the time between checks doubles from
+        # poll up to max_poll [s], and goes back to poll once a scan comes in.
+        wait=poll
+        while True:
+            latest=self.latest()
+            if latest==self.position:
+                time.sleep(wait)
+                wait=min(wait*2,max_poll)
+                continue
+            wait=poll
+            first=max(self.position+1,latest-self.capacity+1)
+            self.lost+=first-self.position-1
+            for scan in range(first,latest+1):
+                record=self.get(scan)
+                if record is not None:
+                    yield record
+                if record is None or not self.valid(scan):
+                    self.lost+=1
+            self.position=latest
+
+    def close(self):
+        # The process which made the ring deletes it
+        del self.header, self.slots, self.sequence
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Print the scans of a scan ring as they are written.')
+    parser.add_argument('name',help='name of the ring, as given in the configuration')
+    args=parser.parse_args()
+
+    ring=scan_ring(args.name)
+    print(', '.join(f'{block}: {len(columns)} columns' for block, columns in ring.blocks.items()))
+    for record in ring.follow():
+        rows=record['rows']
+        latest={column:record[block][rows-1,number] for block, columns in ring.blocks.items()
+                for number, column in enumerate(columns)}
+        print(f"#{record['scan']} t={record['t'][1]:.2f} {'SS' if record['state']==1 else 'USS'} "
+              f"step {record['step']}, {rows} rows: "+', '.join(f'{column}={value:.3g}' for column, value in latest.items())
+              +(f' ({ring.lost} lost)' if ring.lost>0 else ''))
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:32:42 2026
+
+Supervisor. Watches every module and hardware task and restarts them if they break.
+
+Rather than polling each status string every 0.5 s, problems are reported as they happen:
+    - Every object's 'status' is a reported_status. Each change is passed straight to the manager, and a
+      status ending in '2' (error) is put on the supervisor's queue.
+    - Every process() task is run through guarded(). A task which raises, or finishes while its object has not
+      been told to shut down, has crashed, and is put on the queue too. The exception goes no further, so it
+      doesn't bring down the task group the run is in (see core/runtime.py).
+
+The supervisor waits on the queue (so costs nothing while all is well), logs the problem and restarts the
+object after a back-off delay, which doubles with each restart in the restart window. If an object needs more
+than max_restarts restarts within the window, the supervisor gives up on it and raises an alarm instead.
+
+Status codes:
+    0: has begun
+    1: has ended
+    2: error
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+class reported_status(object):
+    # Data descriptor used for the 'status' attribute. Passes each change of status on to the manager.
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.__dict__.get('_status','')
+
+    def __set__(self, obj, value):
+        previous=obj.__dict__.get('_status')
+        obj.__dict__['_status']=value
+
+        manager=obj.__dict__.get('manager')
+        if manager is not None and value!=previous and isinstance(value,str):
+            manager.status_changed(obj,value)
+
+class supervisor(object):
+    def __init__(self, manager, max_restarts=5, window=300, base_delay=0.5, max_delay=30, exhausted_action='Alert'):
+        self.manager=manager
+
+        self.max_restarts=max_restarts
+        self.window=window
+        self.base_delay=base_delay
+        self.max_delay=max_delay
+        self.exhausted_action=exhausted_action
+
+        self.queue=asyncio.Queue()
+        self.loop=None
+        self.loop_thread=None
+        
+        # Starts tasks. The runtime replaces this with its task group's create_task.
+        self.spawn=asyncio.ensure_future
+
+        self.tasks={}
+        self.history={}
+        self.restarting=set()
+        self.abandoned=set()
+
+    def put(self, item):
+        # Status can change from other threads (i.e. the keyboard listener), so hand over to the loop safely
+        if self.loop is not None and threading.get_ident()!=self.loop_thread:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait,item)
+        else:
+            self.queue.put_nowait(item)
+
+    def ignoring(self, obj):
+        # Nothing needs doing for objects which are shutting down, being restarted, or have been given up on
+        shutdown=getattr(obj,'_shutdown',None)
+        return (self.manager._shutdown.is_set() or (shutdown is not None and shutdown.is_set())
+                or obj.name in self.restarting or obj.name in self.abandoned)
+
+    def report(self, obj, status):
+        if not self.ignoring(obj):
+            self.put((obj,'error',status))
+
+    def launch(self, obj, coroutine=None):
+        # Run obj.process() as a task, and find out as soon as it ends.
+        # An object which broke during setup may already have been restarted, so don't start it twice.
+        running=self.tasks.get(obj.name)
+        if coroutine is None and running is not None and not running.done():
+            return running
+        if coroutine is None:
+            coroutine=obj.process()
+
+        task=self.spawn(self.guarded(obj,coroutine))
+
+        self.tasks[obj.name]=task
+        self.manager.tasks.append(task)
+        return task
+
+    async def guarded(self, obj, coroutine):
+        try:
+            await coroutine
+        except Exception as error:
+            detail=f'crashed: {error!r}'
+        else:
+            detail=f"stopped unexpectedly. Status: {getattr(obj,'status','')}"
+
+        # Objects without a shutdown event (i.e. activator) are allowed to finish.
+        if getattr(obj,'_shutdown',None) is None or self.ignoring(obj):
+            return
+        self.put((obj,'crash',detail))
+
+    async def process(self):
+        self.loop=asyncio.get_running_loop()
+        self.loop_thread=threading.get_ident()
+
+        while not self.manager._shutdown.is_set():
+            item=await self.queue.get()
+            if item is None:
+                break
+
+            obj, event, detail=item
+            if self.ignoring(obj):
+                continue
+
+            c1= '\x1b[1;37;41m'
+            c2 = '\x1b[0m'
+            print(c1+ f'Error detected in {obj.name}. \nStatus: {detail}' + c2)
+
+            message=[np.round((time.time()-self.manager.startup_time),2),event,obj.name,detail]
+            self.manager.log_error(message)
+
+            self.schedule_restart(obj)
+
+    def schedule_restart(self, obj):
+        # Keep track of recent restarts. Back off exponentially, and give up once the budget is used.
+        now=time.monotonic()
+        history=self.history.setdefault(obj.name,deque())
+        while len(history)>0 and now-history[0]>self.window:
+            history.popleft()
+
+        if len(history)>=self.max_restarts:
+            self.abandoned.add(obj.name)
+            print(f'{obj.name} restarted {len(history)} times in {self.window} s. No more restarts.')
+            self.manager.alarm(obj,'restart budget',self.exhausted_action)
+            return
+
+        delay=min(self.base_delay*2**len(history),self.max_delay)
+        history.append(now)
+
+        self.restarting.add(obj.name)
+        self.manager.tasks.append(self.spawn(self.restart(obj,delay)))
+
+    async def restart(self, obj, delay):
+        try:
+            # If the task is still running with a bad status, stop it first so we don't end up with two
+            task=self.tasks.get(obj.name)
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.wait([task])
+
+            print(f'Restarting {obj.name} in {delay:.1f} s')
+            await asyncio.sleep(delay)
+
+            if self.manager._shutdown.is_set():
+                return
+
+            # Objects with their own restart procedure use it. Otherwise just start process() again.
+            try:
+                result=obj.restart() if hasattr(obj,'restart') else None
+            except Exception as error:
+                result=error
+        finally:
+            self.restarting.discard(obj.name)
+
+        if isinstance(result,Exception):
+            self.put((obj,'crash',f'restart failed: {result!r}'))
+            return
+
+        if asyncio.iscoroutine(result):
+            self.launch(obj,result)
+        else:
+            self.launch(obj)
+        print('Restart initiated')
+
+    def stop(self):
+        self.put(None)
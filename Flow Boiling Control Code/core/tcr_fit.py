@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:45:07 2026
+
+TCR fit. Fits the calibration line of each heater (reference temperature against heater resistance) while the
+calibration run is still going, instead of afterwards with Calibration_calculator.py.
+
+Every scan taken at SS is added to the current block of a running least-squares fit per heater (x: heater R,
+y: reference T). The readings of one block are all at the same oven temperature and far from independent, so each
+block gives the fit a single point: its mean R against its mean T, weighted by the inverse variance of the mean T.
+The fit only keeps the sums of w, x, y, xy, x^2 and y^2 over the blocks, and its standard errors come from the
+scatter of the blocks about the line, i.e. they shrink with the number of temperatures, not readings.
+At the end of each SS block the slope (b) and intercept (c) of every heater are printed with their standard errors,
+and written to TCR_coefficients.json in the logger's data folder.
+
+Once at least min_blocks temperatures have been recorded and the slope of every heater is known to within
+target_uncertainty [%], the calibration is complete: the file is marked complete and (if shutdown_when_done) the
+run is shut down. The oven doesn't need to be taken through any more temperatures.
+
+The hot-run configuration reads the file through its 'calibration_file' option. A complete calibration is also
+added to the calibration store (core/calibration_store.py), from which the heaters of later runs on the same chip
+take their coefficients.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+from modules.module import *
+from core.calibration_store import calibration_store, chip_name
+
+COEFFICIENT_NAME='TCR_coefficients.json'
+
+class running_fit(object):
+    # Weighted least-squares line y=m*x+c through one point per block, from running sums. x and y are kept
+    # relative to the first point, so the sums don't lose precision over a long run.
+    # resolution: smallest standard error a block mean is given, so a block of identical readings doesn't get an
+    # infinite weight.
+    def __init__(self, resolution=1e-3):
+        self.resolution=resolution
+        self.x0=None
+        self.y0=None
+        self.n=0
+        self.w=0.
+        self.x=0.
+        self.y=0.
+        self.xx=0.
+        self.xy=0.
+        self.yy=0.
+
+        # Current block. y is kept relative to its first reading.
+        self.block_nx=0
+        self.block_x=0.
+        self.block_ny=0
+        self.block_y0=None
+        self.block_y=0.
+        self.block_yy=0.
+
+    def add(self, x, y):
+        # Readings of the current block. x and y don't need to line up (i.e. different numbers of sweeps).
+        x=np.atleast_1d(np.asarray(x,dtype=float))
+        y=np.atleast_1d(np.asarray(y,dtype=float))
+        x=x[~np.isnan(x)]
+        y=y[~np.isnan(y)]
+        if len(y)>0 and self.block_y0 is None:
+            self.block_y0=float(y[0])
+
+        self.block_nx+=len(x)
+        self.block_x+=float(np.sum(x))
+        self.block_ny+=len(y)
+        self.block_y+=float(np.sum(y-self.block_y0)) if len(y)>0 else 0.
+        self.block_yy+=float(np.sum(np.square(y-self.block_y0))) if len(y)>0 else 0.
+
+    def end_block(self):
+        # The block so far becomes one point of the fit
+        if self.block_nx>0 and self.block_ny>0:
+            x=self.block_x/self.block_nx
+            d=self.block_y/self.block_ny
+            y=self.block_y0+d
+            if self.block_ny>1:
+                variance=max(self.block_yy-self.block_ny*d*d,0)/(self.block_ny-1)/self.block_ny
+            else:
+                variance=0.
+            self.add_point(x,y,1/max(variance,self.resolution**2))
+
+        self.block_nx=0
+        self.block_x=0.
+        self.block_ny=0
+        self.block_y0=None
+        self.block_y=0.
+        self.block_yy=0.
+
+    def add_point(self, x, y, weight=1.):
+        if self.x0 is None:
+            self.x0=float(x)
+            self.y0=float(y)
+        x=x-self.x0
+        y=y-self.y0
+
+        self.n+=1
+        self.w+=weight
+        self.x+=weight*x
+        self.y+=weight*y
+        self.xx+=weight*x*x
+        self.xy+=weight*x*y
+        self.yy+=weight*y*y
+
+    def fit(self):
+        # Returns slope, intercept and their standard errors (nan until there are enough points)
+        if self.n<3:
+            return np.nan, np.nan, np.nan, np.nan
+        x_mean=self.x/self.w
+        y_mean=self.y/self.w
+        sxx=self.xx-self.x*x_mean
+        sxy=self.xy-self.x*y_mean
+        syy=self.yy-self.y*y_mean
+        if sxx<=0:
+            return np.nan, np.nan, np.nan, np.nan
+
+        m=sxy/sxx
+        c=y_mean-m*x_mean
+        # Weights only count relative to each other: the size of the errors comes from the scatter about the line
+        s2=max(syy-m*sxy,0)/(self.n-2)
+        se_m=np.sqrt(s2/sxx)
+
+        # Back to absolute x and y
+        intercept=c+self.y0-m*self.x0
+        se_c=np.sqrt(s2*(1/self.w+(x_mean+self.x0)**2/sxx))
+        return m, intercept, se_m, se_c
+
+    def state(self):
+        return dict(self.__dict__)
+
+    def restore(self, state):
+        self.__dict__.update(state)
+
+class tcr_fit(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.tcr_fit=self
+
+        self.controller=self.manager.find(kwargs['controller'])
+        self.logger=self.manager.find(kwargs['logger'])
+        self.reference=self.manager.find(kwargs.get('reference','TC1'))
+        self.reference_attr=kwargs.get('reference_attr','T')
+        self.heater_attr=kwargs.get('heater_attr','R')
+
+        # Heaters being calibrated. By default every RTD.
+        names=kwargs.get('heaters',None)
+        if names is None:
+            names=[sensor for sensor, obj in self.manager.sensor_dict.items() if obj.__class__.__name__=='RTD']
+        self.heaters={heater:self.manager.find(heater) for heater in names}
+
+        self.target_uncertainty=kwargs.get('target_uncertainty',0.5) # [%] on the slope
+        self.min_blocks=kwargs.get('min_blocks',3)
+        self.shutdown_when_done=kwargs.get('shutdown_when_done',True)
+        self.store=kwargs.get('calibration_store',None)
+        self.resolution=kwargs.get('resolution',1e-3) # [degC] smallest standard error of a block's mean temperature
+
+        self.fits={heater:running_fit(self.resolution) for heater in self.heaters}
+        self.blocks=0
+        self.complete=False
+
+        self.status='Startup 1'
+
+    def add_scan(self):
+        y=getattr(self.reference,self.reference_attr)
+        for heater, obj in self.heaters.items():
+            self.fits[heater].add(getattr(obj,self.heater_attr),y)
+
+    def results(self):
+        results={}
+        for heater, fit in self.fits.items():
+            m, c, se_m, se_c=fit.fit()
+            results[heater]={'a':0,'b':m,'c':c,'offset':0,
+                             'U_b [%]':100*se_m/abs(m) if m else np.nan,
+                             'U_c [%]':100*se_c/abs(c) if c else np.nan,
+                             'points':fit.n}
+        return results
+
+    def converged(self, results):
+        if self.blocks<self.min_blocks:
+            return False
+        return all(result['U_b [%]']<=self.target_uncertainty for result in results.values())
+
+    def report(self, results):
+        print(f'\nTCR fit after {self.blocks} SS blocks (target {self.target_uncertainty} % on b):')
+        for heater, result in results.items():
+            print(f"  {heater}: b: {np.round(result['b'],4)} "+u"\u00B1"+f" {np.round(result['U_b [%]'],4)} %, "
+                  f"c: {np.round(result['c'],4)} "+u"\u00B1"+f" {np.round(result['U_c [%]'],4)} %")
+
+    def write(self, results):
+        if self.logger.saving!=True:
+            return
+        path=os.path.join(self.logger.save_path,self.logger.folder_name,COEFFICIENT_NAME)
+
+        # Same format as the summary string written by Calibration_calculator.py
+        summary=''.join(f"{heater}_b:{result['b']},{heater}_c:{result['c']}," for heater, result in results.items())
+        contents={'time':time.time(),
+                  'folder':self.logger.folder_name,
+                  'reference':self.reference.name+'.'+self.reference_attr,
+                  'blocks':self.blocks,
+                  'complete':self.complete,
+                  'heaters':{heater:{key:(None if np.isnan(value) else float(value)) for key, value in result.items()}
+                             for heater, result in results.items()},
+                  'summary':summary}
+
+        temporary=path+'.tmp'
+        with open(temporary,'w') as file:
+            json.dump(contents,file,indent=1)
+        os.replace(temporary,path)
+
+    def end_of_block(self):
+        self.blocks+=1
+        for fit in self.fits.values():
+            fit.end_block()
+        results=self.results()
+        self.complete=self.converged(results)
+        self.report(results)
+        try:
+            self.write(results)
+        except OSError as error:
+            print(f'TCR coefficients not saved: {error}')
+
+        if self.complete:
+            c1= '\33[42m'
+            c2='\33[0m'
+            print(c1+f'Calibration complete after {self.blocks} temperatures.'+c2)
+            if self.store is not None and self.logger.saving==True:
+                try:
+                    calibration_store(self.store).write(chip_name(self.logger.folder_name),results,source=self.name)
+                except sqlite3.Error as error:
+                    print(f'TCR coefficients not added to the calibration store: {error}')
+            if self.shutdown_when_done:
+                self.manager.shutdown()
+
+    async def process(self):
+        try:
+            state=self.controller.state
+            while not self._shutdown.is_set() and not self.complete:
+                self.status='waiting 0'
+                await self.controller.processed.wait()
+
+                self.status='fitting 0'
+                if self.controller.state=='SS':
+                    self.add_scan()
+                elif state=='SS':
+                    # SS block has just ended
+                    self.end_of_block()
+                state=self.controller.state
+
+            self.status='finished 1'
+            await self._shutdown.wait()
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+def read_coefficients(path):
+    # Heater TCR settings from a coefficient file, as {'H1':{'a':..,'b':..,'c':..,'offset':..}, ...}
+    with open(path) as file:
+        contents=json.load(file)
+    if not contents.get('complete',False):
+        print(f'Warning: calibration in {path} was not complete')
+    return {heater:{setting:result[setting] for setting in ('a','b','c','offset')}
+            for heater, result in contents['heaters'].items()}
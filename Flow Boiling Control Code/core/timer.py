@@ -10,11 +10,30 @@ of pulses.
 
 Can also configure timer to send trigger when manual command sent.
 
+In periodic mode, triggers are sent on a fixed grid of deadlines (loop.time(), which is monotonic), so the time
+taken by the DAQ, sensors and logger doesn't add to the period: SS_period=1 gives one trigger per second.
+How late each trigger is sent is kept in the tracer as '<name>.jitter' (see 'trace' in the keylogger).
+
+A deadline is overrun if the timer wakes up more than a whole period late (i.e. the event loop was blocked), or
+if the DAQ hasn't finished with the previous trigger by the time the next one is due. What happens to the
+triggers which were missed by a late wake-up depends on overrun_policy:
+    'skip'      they are dropped and the timer carries on from the next deadline on the grid
+    'catch_up'  up to max_catch_up of them are sent as soon as the DAQ is free, one after the other. Any more
+                are dropped as for 'skip'.
+With 'skip', a trigger due while the DAQ is still busy with the last one is dropped too (it would be lost anyway).
+With 'catch_up', the timer waits for the DAQ, for up to one period.
+Overruns are counted, and written to the error log at most once every report_interval [s].
+
+An interval of 0 means free-running: the next trigger is sent as soon as the DAQ has finished with the last one.
+There is no grid in that case, so nothing can overrun. Negative intervals are refused.
+
 @author: Chris
 """
 import asyncio
 import importlib
+import math
 import re
+import time
 
 from modules.module import *
 
@@ -22,16 +41,30 @@ class timer(core_module):
     def __init__(self, name,manager,**kwargs):
         super().__init__(name,manager,**kwargs)
         
-        importstring='from __main__ import ' + kwargs['target']
-        exec(importstring)
-        self.target=eval(kwargs['target'])
+        self.target=self.manager.find(kwargs['target'])
         
         self.mode= kwargs['mode']
         
         if self.mode =='periodic':
-            self.SS_target=eval(kwargs['SS_target'])
+            self.SS_target=self.manager.find(kwargs['SS_target'])
             
             self.intervals=kwargs['intervals']
+            for state, interval in self.intervals.items():
+                if interval<0:
+                    raise ValueError(f'{self.name}: {state} interval must be 0 (free-running) or more, not {interval}')
+            
+            self.overrun_policy=kwargs.get('overrun_policy','skip')
+            if self.overrun_policy not in ('skip','catch_up'):
+                raise ValueError(f"{self.name}: overrun_policy must be 'skip' or 'catch_up', not {self.overrun_policy}")
+            self.max_catch_up=kwargs.get('max_catch_up',3)
+            self.report_interval=kwargs.get('report_interval',60)
+            
+            self.jitter=self.manager.tracer.histogram(self.name+'.jitter')
+            self.deadline=None
+            self.overruns=0
+            self.skipped=0
+            self._reported_overruns=0
+            self._last_report=0
     
         elif self.mode =='triggered':
             self.triggered=asyncio.Event()
@@ -42,6 +75,69 @@ class timer(core_module):
         self.interval=self.intervals[self.SS_target.state]
         self.target.triggered.set()
 
+    def fire(self, deadline):
+        # Send one trigger, due at deadline
+        self.jitter.record(max(self.loop.time()-deadline,0))
+        if self.target.triggered.is_set():
+            # DAQ is still busy with the last trigger
+            self.overruns+=1
+            self.skipped+=1
+            self.interval=self.intervals[self.SS_target.state]
+        else:
+            self.determine_interval()
+    
+    def next_deadline(self):
+        # Deadline after the one just met. If it has already passed, the timer has overrun.
+        if self.interval<=0:
+            # Free-running, so no grid to keep to
+            return self.loop.time()
+        deadline=self.deadline+self.interval
+        now=self.loop.time()
+        if now-deadline<self.interval:
+            return deadline
+        
+        missed=math.floor((now-deadline)/self.interval)
+        self.overruns+=1
+        if self.overrun_policy=='catch_up':
+            # The last few missed deadlines are kept, and sent without waiting
+            kept=min(missed,self.max_catch_up)
+            self.skipped+=missed-kept
+            return deadline+(missed-kept)*self.interval
+        
+        self.skipped+=missed
+        # Back onto the grid
+        return deadline+missed*self.interval
+    
+    async def wait_for_clear(self, timeout):
+        # Wait (at most timeout [s]) for the DAQ to clear its trigger. Nothing runs between checking the trigger and
+        # clearing the event, so the DAQ can't be missed.
+        self.target.trigger_cleared.clear()
+        try:
+            await asyncio.wait_for(self.target.trigger_cleared.wait(),timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def wait_until_free(self):
+        # Free-running: wait for the DAQ to finish with the last trigger, however long it takes. The timeout is only
+        # so that a shutdown is noticed.
+        while self.target.triggered.is_set() and not self._shutdown.is_set():
+            await self.wait_for_clear(1)
+    
+    async def wait_for_target(self):
+        # Wait (at most one period) for the DAQ to finish with the last trigger
+        if self.target.triggered.is_set():
+            await self.wait_for_clear(self.intervals[self.SS_target.state])
+    
+    def report_overruns(self):
+        now=time.time()
+        if self.overruns>self._reported_overruns and now-self._last_report>=self.report_interval:
+            message=(f'{self.overruns-self._reported_overruns} overruns, {self.skipped} triggers skipped so far. '
+                     f'Jitter p99 {1e3*self.jitter.percentile(99):.1f} ms')
+            print(f'{self.name}: {message}')
+            self.manager.log_error([round(now-self.manager.startup_time,2),'Overrun',self.name,message])
+            self._reported_overruns=self.overruns
+            self._last_report=now
+    
     def manual_trigger(self):
         print('tim triggred')
         self.target.triggered.set()
@@ -49,11 +145,30 @@ class timer(core_module):
     async def process(self):
         try:
             while not self._shutdown.is_set():
-                if self.mode == 'periodic':
+                if self.mode == 'periodic' and self.intervals[self.SS_target.state]<=0:
+                    self.status="Waiting 0"
+                    await self.wait_until_free()
+                    if self._shutdown.is_set():
+                        break
                     self.determine_interval()
+                    # Back onto a grid from now if the interval changes
+                    self.deadline=None
+                    await asyncio.sleep(0)
+                    
+                    self.status="Waiting 1"
+                    
+                elif self.mode == 'periodic':
+                    if self.deadline is None:
+                        self.deadline=self.loop.time()
+                    if self.overrun_policy=='catch_up':
+                        await self.wait_for_target()
+                    self.fire(self.deadline)
+                    self.deadline=self.next_deadline()
+                    self.report_overruns()
                     self.status="Waiting 0"
                     
-                    await asyncio.sleep(self.interval)
+                    # Sleep until the deadline, however long this pass took
+                    await asyncio.sleep(max(self.deadline-self.loop.time(),0))
                     
                     self.status="Waiting 1"
                     
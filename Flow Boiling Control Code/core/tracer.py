@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:28:54 2026
+
+Stage tracer. Records how long each stage of the acquisition loop takes (DAQ trigger, sensor conversion,
+alarms, SS detection, controller, logger), so we can see which one limits the scan rate.
+
+Each timed stage feeds a histogram with fixed, logarithmically spaced buckets (1 us to ~100 s, 2 buckets
+per octave). Recording a duration is just a clock read, a bisection and an increment, so the tracer can be
+left switched on during experiments.
+
+The manager owns one tracer. Stages are timed either with a span around the call:
+
+    with self.manager.tracer.span(self.name+'.trigger'):
+        await self.trigger()
+
+or with the 'traced' decorator on the method. Stage names are '<object name>.<method>'.
+
+Type 'trace' in the keylogger to print the histograms (and save them to the data folder if saving).
+"""
+import asyncio
+import functools
+import json
+import time
+from bisect import bisect_left
+
+# Upper edge of each bucket [s]. Anything beyond the last edge goes in an overflow bucket.
+BUCKET_EDGES=tuple(1e-6*2**(i/2) for i in range(54))
+
+class stage_histogram(object):
+    __slots__=('counts','count','total','max')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts=[0]*(len(BUCKET_EDGES)+1)
+        self.count=0
+        self.total=0.0
+        self.max=0.0
+
+    def record(self, duration):
+        self.counts[bisect_left(BUCKET_EDGES,duration)]+=1
+        self.count+=1
+        self.total+=duration
+        if duration>self.max:
+            self.max=duration
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i]+=n
+        self.count+=other.count
+        self.total+=other.total
+        self.max=max(self.max,other.max)
+
+    def percentile(self, q):
+        # Returns the upper edge of the bucket containing the q-th percentile, so is accurate to within one bucket (~40%).
+        # Never more than the largest duration seen.
+        if self.count==0:
+            return 0.0
+        target=q/100*self.count
+        running=0
+        for i, n in enumerate(self.counts):
+            running+=n
+            if running>=target and n>0:
+                return min(BUCKET_EDGES[i],self.max) if i<len(BUCKET_EDGES) else self.max
+        return self.max
+
+    def summary(self):
+        # Summary in milliseconds
+        if self.count==0:
+            return {'count':0}
+        return {'count':self.count,
+                'mean_ms':1e3*self.total/self.count,
+                'p50_ms':1e3*self.percentile(50),
+                'p99_ms':1e3*self.percentile(99),
+                'max_ms':1e3*self.max,
+                'total_ms':1e3*self.total}
+
+class stage_span(object):
+    # Context manager which times one pass through a stage
+    __slots__=('histogram','start')
+
+    def __init__(self, histogram):
+        self.histogram=histogram
+
+    def __enter__(self):
+        self.start=time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter()-self.start)
+        return False
+
+class stage_tracer(object):
+    def __init__(self):
+        self.histograms={}
+        self.started=time.time()
+
+    def histogram(self, stage):
+        if stage not in self.histograms:
+            self.histograms[stage]=stage_histogram()
+        return self.histograms[stage]
+
+    def span(self, stage):
+        return stage_span(self.histogram(stage))
+
+    def record(self, stage, duration):
+        self.histogram(stage).record(duration)
+
+    def reset(self):
+        # Histograms are emptied rather than replaced, since objects may keep hold of theirs (i.e. the timer's jitter)
+        for histogram in self.histograms.values():
+            histogram.clear()
+        self.started=time.time()
+
+    def combined(self, suffix):
+        # Merge the histograms of all stages ending in suffix, i.e. '.process_data' for all sensors.
+        total=stage_histogram()
+        for stage, histogram in self.histograms.items():
+            if stage.endswith(suffix):
+                total.merge(histogram)
+        return total
+
+    def report(self):
+        # Table of all stages, slowest (by total time spent) first
+        lines=[f"{'stage':<32}{'count':>8}{'mean [ms]':>12}{'p50 [ms]':>12}{'p99 [ms]':>12}{'max [ms]':>12}"]
+        ordered=sorted(self.histograms.items(),key=lambda item: item[1].total,reverse=True)
+        for stage, histogram in ordered:
+            s=histogram.summary()
+            if s['count']>0:
+                lines.append(f"{stage:<32}{s['count']:>8}{s['mean_ms']:>12.3f}{s['p50_ms']:>12.3f}"
+                             f"{s['p99_ms']:>12.3f}{s['max_ms']:>12.3f}")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        # Write summaries and raw bucket counts, so histograms can be re-plotted later
+        contents={'started':self.started,
+                  'dumped':time.time(),
+                  'bucket_edges_s':list(BUCKET_EDGES),
+                  'stages':{stage:{'summary':histogram.summary(),'counts':histogram.counts}
+                            for stage, histogram in self.histograms.items()}}
+        with open(path,'w') as file:
+            json.dump(contents,file,indent=1)
+
+def traced(method):
+    # Decorator version of tracer.span, for methods called from several places. Stage is named after the object and method.
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self,*args,**kwargs):
+            with self.manager.tracer.span(self.name+'.'+method.__name__):
+                return await method(self,*args,**kwargs)
+    else:
+        @functools.wraps(method)
+        def wrapper(self,*args,**kwargs):
+            with self.manager.tracer.span(self.name+'.'+method.__name__):
+                return method(self,*args,**kwargs)
+    return wrapper
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:29:53 2026
+
+Event loop watchdog. Everything runs on one asyncio loop, so any blocking call (pyvisa reads, to_csv,
+printing tables, time.sleep in the PSU code) freezes every other module until it returns.
+
+The watchdog has two halves:
+    - A heartbeat coroutine on the loop. It sleeps for a short interval and measures how late it wakes up
+      (the loop lag). Lags are kept in a rolling window for p50/p99 figures, and fed to the manager's tracer
+      as stage 'loop.lag'.
+    - A sidecar thread, which checks that the heartbeat is still beating. If the loop has not come back for
+      longer than the threshold, the thread grabs the stack of the loop thread, i.e. the code which is blocking.
+
+When the loop comes back, the stall is reported through the logger's error channel with its duration and the
+blocking code, and printed to the console.
+
+Started by the manager. Type 'trace' in the keylogger to see the lag figures.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+
+# Frames from inside asyncio itself don't tell us anything about who is blocking
+ASYNCIO_DIR=os.path.dirname(asyncio.__file__)
+
+class loop_watchdog(object):
+    def __init__(self, manager, interval=0.1, threshold=0.25, window=600):
+        self.manager=manager
+        self.interval=interval
+        self.threshold=threshold
+
+        # Rolling window of lags [s]. At 100 ms intervals, 600 lags covers the last minute or so.
+        self.lags=deque(maxlen=window)
+
+        self.heartbeat=time.monotonic()
+        self.loop_thread=None
+        self.captured=None
+        self.stall_count=0
+
+        self._stop=threading.Event()
+
+    def capture(self, stalled_for):
+        # Called from the sidecar thread while the loop is blocked. Take the loop thread's stack.
+        frame=sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return
+
+        stack=traceback.extract_stack(frame)
+
+        # The blocking code is whatever the loop called into last: skip past the asyncio machinery.
+        culprit=stack[-1]
+        for number, entry in enumerate(stack):
+            if entry.filename.startswith(ASYNCIO_DIR) and number+1<len(stack):
+                if not stack[number+1].filename.startswith(ASYNCIO_DIR):
+                    culprit=stack[number+1]
+
+        self.captured={'heartbeat':self.heartbeat,
+                       'stalled_for':stalled_for,
+                       'culprit':f'{os.path.basename(culprit.filename)}:{culprit.lineno} {culprit.name}',
+                       'stack':' | '.join(f'{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}'
+                                          for entry in stack if not entry.filename.startswith(ASYNCIO_DIR))}
+
+    def monitor(self):
+        # Sidecar thread. Only reads the heartbeat; never touches the loop. Wakes straight away when stopped.
+        while not self._stop.wait(self.interval):
+            heartbeat=self.heartbeat
+            stalled_for=time.monotonic()-heartbeat
+
+            # Capture once per stall
+            if stalled_for>self.threshold:
+                if self.captured is None or self.captured['heartbeat']!=heartbeat:
+                    self.capture(stalled_for)
+
+    async def process(self):
+        self.loop_thread=threading.get_ident()
+        self._stop.clear()
+        thread=threading.Thread(target=self.monitor,name='loop watchdog',daemon=True)
+        thread.start()
+
+        try:
+            while not self.manager._shutdown.is_set():
+                start=time.perf_counter()
+                self.heartbeat=time.monotonic()
+
+                await asyncio.sleep(self.interval)
+
+                lag=max(time.perf_counter()-start-self.interval,0)
+                self.lags.append(lag)
+                self.manager.tracer.record('loop.lag',lag)
+
+                if self.captured is not None and lag>self.threshold:
+                    self.report(lag)
+        finally:
+            self._stop.set()
+
+    def report(self, lag):
+        # Back on the loop thread, so it is safe to talk to the logger
+        self.stall_count+=1
+        stall=self.captured
+        self.captured=None
+
+        c1= '\x1b[1;30;43m'
+        c2='\x1b[0m'
+        print(c1+f'Event loop blocked for {lag:.3f} s by {stall["culprit"]}'+c2)
+
+        message=[np.round((time.time()-self.manager.startup_time),2),'stall',stall['culprit'],
+                 f'{lag:.3f} s: {stall["stack"]}']
+        self.manager.log_error(message)
+
+    def statistics(self):
+        # Rolling lag figures in milliseconds
+        if len(self.lags)==0:
+            return {'count':0}
+        lags=np.array(self.lags)*1e3
+        return {'count':len(lags),
+                'p50_ms':float(np.percentile(lags,50)),
+                'p99_ms':float(np.percentile(lags,99)),
+                'max_ms':float(np.max(lags)),
+                'stalls':self.stall_count}
+
+    def stop(self):
+        self._stop.set()
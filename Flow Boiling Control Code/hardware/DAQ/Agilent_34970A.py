@@ -12,11 +12,12 @@ Mode of operation for this DAQ:
     - Wait for DAQ to finish, then collect the data. Send to devices.
     
     - Need to reconfigure for high-speed measurement when doing burst measurements
+    - The 34970A's input buffer is small, so configuration is sent in batches of up to 'max_message' (255)
+      bytes, waiting for each batch to be carried out (*OPC?) before sending the next.
     
 @author: Chris Salmean
 """
 import asyncio
-import pyvisa as visa
 import time
 from collections import defaultdict
 
@@ -25,6 +26,7 @@ from hardware.DAQ.general_DAQ import *
 
 class Agilent34970A (DAU):
     def __init__(self,name,manager,**kwargs):
+        kwargs.setdefault('max_message',255)
         super().__init__(name,manager,**kwargs)
         
         self.status= 'checking 0'
@@ -38,22 +40,18 @@ class Agilent34970A (DAU):
         except:
             pass
         
-        self.ser.write('*RST') # reset DAQ
-        
         idn=self.ser.query("*IDN?")
         print(f"Connected to: {idn}\n")
         
-        cmd_list = ['*RST',
-                    "*OPC?"]
-        
         if self.dummy==False:
-            for cmd in cmd_list:
-                self.ser.write(cmd)
-            
-            self.status='checking '+str(self.ser.read())          
+            self.status='checking 1'
         else:
             print('Dummy DAU connected')
     
+    def scan_size(self):
+        # Channels in the instrument's scan. 0 after a reset or power cycle.
+        return int(self.ser.query('ROUT:SCAN:SIZE?'))
+    
     def activate(self):
         self.status='activating 0'
         
@@ -68,16 +66,18 @@ class Agilent34970A (DAU):
                 "ZERO:AUTO ONCE,("+self.scanlist+')', # auto-zero at beginning of each burst
                 'ROUT:SCAN ('+self.scanlist+')' # tell DAQ which channels to look at
             ]
+            cmd_list+=[cmd for commands in self.configuration_strings.values() for cmd in commands]
             
-            for cmd in cmd_list:
-                self.ser.write(cmd)
-            
-            for channel, commands in self.configuration_strings.items():      
-                for cmd in commands:
-                    time.sleep(0.05)
-                    self.ser.write(cmd)
-                
-            self.status='activating '+str(self.ser.query('*OPC?')) 
+            if self.configuration_matches(cmd_list):
+                print(f'{self.name}: already configured, reset skipped')
+                self.status='activating 1'
+            else:
+                self.remember_configuration(None)
+                self.ser.write('*RST') # reset DAQ
+                self.ser.query('*OPC?')
+                self.send_commands(cmd_list)
+                self.status='activating '+str(self.ser.query('*OPC?'))
+                self.remember_configuration(cmd_list)
         
         else:
             self.status='activating 1'          
@@ -136,13 +136,24 @@ class Agilent34970A (DAU):
         self.last_reading_time=time.time()-self.start_time
         
         # Now take raw data from DAQ and assign to the correct sensor channel
+        raw=self.ser.query('FETC?')
+        with self.manager.tracer.span(self.name+'.parse_data'):
+            self.parse_data(raw)
+        self.status='triggering 1'
+
+    def send_commands(self, cmd_list):
+        # Wait for each batch to be carried out, so the input buffer doesn't overflow
+        for message in batch_commands(cmd_list,self.max_message):
+            self.ser.write(message)
+            self.ser.query('*OPC?')
+
+    def parse_data(self,raw):
+        # Readings are returned as 'reading, channel, reading, channel...'. Sort the readings into a list for each channel.
         self.data={}
-        self.data['raw']=(self.ser.query('FETC?')).replace("\r", "").split(',')
+        self.data['raw']=raw.replace("\r", "").split(',')
         self.data['channels']=[self.data['raw'][i] for i in range(len(self.data['raw'])) if (i % 2)-1 == 0]
         self.data['readings']=[self.data['raw'][i] for i in range(len(self.data['raw'])) if (i % 2) == 0]
         self.data['zipped']=defaultdict(list)
 
         for number, channel in enumerate(self.data['channels']):
             self.data['zipped'][channel].append(self.data['readings'][number])
-        
-        self.status='triggering 1'
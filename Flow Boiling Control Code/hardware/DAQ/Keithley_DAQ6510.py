@@ -10,11 +10,31 @@ Mode of operation for this DAQ:
     - After devices are all set up, activate DAQ (configure channels and trigger model)
     - Wait for trigger signal from timer. When received, run scan for specified number of sweeps.
     - Wait for DAQ to finish, then collect the data. Send to sensor objects and allow them to update themselves.
+
+Hardware-timed mode ('hardware_timed':True, with 'intervals' as given to the timer):
+    - On activation the DAQ is set to scan continuously on its own scan timer, n_sweeps[state] sweeps per
+      interval[state], into a circular buffer. The timer module isn't needed (leave it 'triggered').
+    - The host only drains the buffer: once a whole block of sweeps is in, it is read (with the instrument's own
+      time stamps), then SS/USS is determined and the readings are sent to the sensors as usual. If the host has
+      fallen behind, every complete sweep waiting in the buffer is read at once.
+    - If the host falls a whole buffer behind (buffer_points readings), unread readings have been overwritten. This
+      is worked out from the time since the scan started, since the buffer indices alone can't show it. It is
+      reported as an overrun (and sent to the error log), and scanning is started again on an empty buffer.
+    - When the state changes between SS and USS, the scan is aborted, given the new interval and started again.
+The instrument refuses a scan interval shorter than one sweep of the scanlist takes.
+
+Double-buffered mode ('double_buffered':True):
+    - Scans alternate between defbuffer1 and defbuffer2. When triggered, the DAQ waits for the scan already
+      running to finish, starts the next one into the other buffer, and only then reads the finished buffer.
+      Transferring and parsing the readings overlaps with the next scan, instead of the instrument waiting idle.
+    - The readings sent to the sensors are therefore from the scan started at the previous trigger (the first
+      trigger starts a scan and waits for it). Reading times are recorded for the scan the readings came from.
+    - Most useful when the DAQ is triggered as often as possible: a timer interval of 0 (free-running, triggered
+      again as soon as the DAQ is free, see core/timer.py) or shorter than a scan.
     
 @author: Chris Salmean
 """
 import asyncio
-import pyvisa as visa
 import random
 from collections import defaultdict
 
@@ -36,44 +56,162 @@ class DAQ6510(DAU):
         except:
             pass
         
-        self.ser.write('*RST')
-        
         idn=self.ser.query("*IDN?")
         print(f"Connected to: {idn}\n")
         
-        self.status='setting buffer 0'
-        cmd_list = [
+        self.hardware_timed=kwargs.get('hardware_timed',False)
+        if self.hardware_timed:
+            self.intervals=kwargs['intervals']
+            self.scan_state=None
+            self.overruns=0
+        self.buffer_points=kwargs.get('buffer_points',10000)
+        
+        self.double_buffered=kwargs.get('double_buffered',False)
+        self.buffers=['defbuffer1','defbuffer2']
+        self.armed=None # buffer which the scan in progress is going into
+        self.time_per_reading=None # measured from the scans so far, to know when the next buffer will be full
+        
+        # Buffer settings. Sent after the reset, when the DAQ is activated.
+        self.buffer_list = [
                     ":TRAC:CLE",
-                    ":TRAC:POIN 10000"]
+                    ":TRAC:POIN "+str(self.buffer_points)]
+        if self.double_buffered:
+            self.buffer_list+=[':TRAC:CLE "defbuffer2"',
+                               ':TRAC:POIN '+str(self.buffer_points)+', "defbuffer2"']
         
-        if self.dummy==False:
-            for cmd in cmd_list:
-                self.ser.write(cmd)
-            
-        else:
+        if self.dummy==True:
             print('Dummy DAU connected')
     
+    def scan_size(self):
+        # Channels in the instrument's scan. 0 after a reset or power cycle.
+        return int(self.ser.query('ROUT:SCAN:COUN:STEP?'))
+    
     def activate(self):
         self.status='activating 0'
         
         if self.dummy==False:
             for channel, commands in self.configuration_strings.items():
-                for cmd in commands:
-                    self.ser.write(cmd)
-            
                 self.scanlist+=str(channel)+str(', ')
             
-            cmd_list=[
-               "ROUT:SCAN:CRE ("+self.scanlist+")",
-               "FORM:ASC:PREC 6",
-               "AZER:ONCE",
-           ]             
+            cmd_list=(self.buffer_list+
+                      [cmd for commands in self.configuration_strings.values() for cmd in commands]+
+                      ["ROUT:SCAN:CRE ("+self.scanlist+")",
+                       "FORM:ASC:PREC 6"])
+            
+            if self.configuration_matches(cmd_list):
+                print(f'{self.name}: already configured, reset skipped')
+                # Stop any scan left running by the last run
+                self.ser.write('ABOR')
+            else:
+                self.remember_configuration(None)
+                self.ser.write('*RST')
+                self.send_commands(cmd_list)
+                self.ser.query('*OPC?')
+                self.remember_configuration(cmd_list)
             
-            for cmd in cmd_list:
-               self.ser.write(cmd)
+            self.ser.write('AZER:ONCE')
+            
+            if self.hardware_timed:
+                self.start_scan()
                
         else:
             self.status='activating 1'
+    
+    def start_scan(self):
+        # (Re)start continuous scanning on the instrument's scan timer, spacing sweeps to suit the current state
+        self.scan_state=self.state
+        sweep_interval=self.intervals[self.state]/self.n_sweeps[self.state]
+        cmd_list=[
+            'ABOR',
+            'TRAC:CLE',
+            'TRAC:FILL:MODE CONT, "defbuffer1"', # circular buffer
+            'ROUT:SCAN:COUN:SCAN 0', # scan until aborted
+            'ROUT:SCAN:INT '+str(sweep_interval), # from the start of one sweep to the start of the next
+            'INIT']
+        for cmd in cmd_list:
+            self.ser.write(cmd)
+        
+        self.scan_start=time.time()-self.start_time
+        self.sweep_interval=sweep_interval
+        self.next_index=1
+        self.read_count=0
+        print(f'{self.name}: scanning every {sweep_interval:.3f} s on the instrument ({self.state})')
+    
+    async def drain(self):
+        # Wait for the next block of sweeps to be in the buffer, then read it
+        self.status='draining 0'
+        n_channels=len(self.channel_dict)
+        block=n_channels*int(self.n_sweeps[self.state])
+        
+        await asyncio.sleep(self.intervals[self.state])
+        while True:
+            # Readings taken since the scan started (over- rather than underestimated, by up to one sweep)
+            taken=(int((time.time()-self.start_time-self.scan_start)/self.sweep_interval)+1)*n_channels
+            if taken-self.read_count>=self.buffer_points-n_channels:
+                self.buffer_overrun(taken-self.read_count)
+                await asyncio.sleep(self.intervals[self.state])
+                continue
+            
+            end=int(self.ser.query('TRAC:ACT:END?'))
+            # Readings waiting, allowing for the buffer having wrapped around
+            waiting=(end-self.next_index+1)%self.buffer_points if end>0 else 0
+            if waiting>=block:
+                break
+            await asyncio.sleep(0.02)
+        
+        # Whole sweeps only, so the next block starts on the first channel again
+        count=waiting-waiting%n_channels
+        start=self.next_index
+        stop=start+count-1
+        if stop<=self.buffer_points:
+            raw=self.ser.query(f'TRAC:DATA? {start}, {stop}, "defbuffer1", REL, CHAN, READ')
+        else:
+            raw=(self.ser.query(f'TRAC:DATA? {start}, {self.buffer_points}, "defbuffer1", REL, CHAN, READ')+','+
+                 self.ser.query(f'TRAC:DATA? 1, {stop-self.buffer_points}, "defbuffer1", REL, CHAN, READ'))
+        self.next_index=(stop%self.buffer_points)+1
+        self.read_count+=count
+        
+        with self.manager.tracer.span(self.name+'.parse_data'):
+            self.parse_timed_data(raw)
+        self.status='draining 1'
+    
+    def buffer_overrun(self, behind):
+        # The buffer has gone all the way round since it was last read, so what is left of the unread readings no
+        # longer lines up with the channels and sweeps. Nothing is read: scanning starts again on an empty buffer.
+        self.overruns+=1
+        message=f'buffer overrun ({behind} readings behind, buffer holds {self.buffer_points}). Unread readings lost, scan restarted'
+        c1='\x1b[1;37;41m'
+        c2='\x1b[0m'
+        print(c1+f'{self.name}: {message}'+c2)
+        self.manager.log_error([round(time.time()-self.manager.startup_time,2),'Overrun',self.name,message])
+        self.start_scan()
+    
+    async def process(self):
+        if not self.hardware_timed or self.dummy==True:
+            await super().process()
+            return
+        
+        # Hardware-timed: the instrument decides when to scan. The host only collects the results.
+        try:
+            while not self._shutdown.is_set():
+                with self.manager.tracer.span(self.name+'.drain'):
+                    await self.drain()
+                
+                self.status='determining state 0'
+                self.determine_state()
+                if self.state!=self.scan_state and self.intervals[self.state]/self.n_sweeps[self.state]!=(
+                        self.intervals[self.scan_state]/self.n_sweeps[self.scan_state]):
+                    self.status='rescheduling 0'
+                    self.start_scan()
+                self.scan_state=self.state
+                
+                self.status='distributing 0'
+                self.new_scan()
+                with self.manager.tracer.span(self.name+'.send_to_sensors'):
+                    await self.send_to_sensors()
+                
+        except:
+            self.status=re.sub('\d','2',self.status)
 
     async def send_to_sensors(self):
         self.status='transmitting 0'        
@@ -105,6 +243,10 @@ class DAQ6510(DAU):
         self.status= 'transmitting 1'
 
     async def trigger(self):
+        if self.double_buffered:
+            await self.swap_buffers()
+            return
+        
         self.status="triggering 0"
         try:
             self.ser.query('FETC?') 
@@ -136,12 +278,80 @@ class DAQ6510(DAU):
         buffer_length=self.ser.query('TRAC:ACT?')
 
         # Load readings and process by matching each value to a sensor channel.
+        raw=self.ser.query('TRAC:DATA? 1, '+str(buffer_length)+', "defbuffer1", CHAN, READ')
+        with self.manager.tracer.span(self.name+'.parse_data'):
+            self.parse_data(raw)
+        self.status='triggering 1'
+
+    def arm(self):
+        # Start the next scan, into whichever buffer isn't about to be read
+        if self.armed is None:
+            buffer=self.buffers[0]
+        else:
+            buffer=self.buffers[1-self.buffers.index(self.armed)]
+        
+        cmd_list=[
+            'TRAC:CLE "'+buffer+'"',
+            'ROUT:SCAN:BUFF "'+buffer+'"',
+            "ROUT:SCAN:COUN:SCAN "+str(self.n_sweeps[self.state]),
+            ":INIT"]
+        
+        self.armed=buffer
+        self.armed_count=int(self.n_sweeps[self.state])*len(self.channel_dict)
+        self.armed_time=time.time()-self.start_time
+        
+        for cmd in cmd_list:
+            self.ser.write(cmd)
+    
+    async def swap_buffers(self):
+        self.status="triggering 0"
+        if self.armed is None:
+            self.arm()
+        
+        # Wait for the scan in progress to fill its buffer. A part-filled buffer gives the rate readings are coming
+        # in, so the loop sleeps until the rest should be there rather than asking the DAQ over and over.
+        while True:
+            elapsed=time.time()-self.start_time-self.armed_time
+            taken=int(self.ser.query('TRAC:ACT? "'+self.armed+'"'))
+            if taken>=self.armed_count:
+                break
+            if taken>0:
+                self.time_per_reading=elapsed/taken
+            if self.time_per_reading is None:
+                await asyncio.sleep(0.01)
+            else:
+                await asyncio.sleep(max((self.armed_count-taken)*self.time_per_reading,0.001))
+        
+        finished, count=self.armed, self.armed_count
+        self.first_reading_time=self.armed_time
+        self.last_reading_time=time.time()-self.start_time
+        
+        # Next scan runs while this one is read out
+        self.arm()
+        
+        raw=self.ser.query('TRAC:DATA? 1, '+str(count)+', "'+finished+'", CHAN, READ')
+        with self.manager.tracer.span(self.name+'.parse_data'):
+            self.parse_data(raw)
+        self.status='triggering 1'
+    
+    def parse_timed_data(self,raw):
+        # Buffer is returned as 'relative time, channel, reading, ...'. Times are from the start of the scan.
+        values=raw.split(',')
+        times=[float(value) for value in values[0::3]]
+        self.first_reading_time=self.scan_start+times[0]
+        self.last_reading_time=self.scan_start+times[-1]
+        
         self.data={}
-        self.data['raw']=(self.ser.query('TRAC:DATA? 1, '+str(buffer_length)+
-                                  ', "defbuffer1", CHAN, READ')).split(',')
+        self.data['zipped']=defaultdict(list)
+        for channel, reading in zip(values[1::3],values[2::3]):
+            self.data['zipped'][channel.strip()].append(reading)
+    
+    def parse_data(self,raw):
+        # Buffer is returned as 'channel, reading, channel, reading...'. Sort the readings into a list for each channel.
+        self.data={}
+        self.data['raw']=raw.split(',')
         self.data['channels']=[self.data['raw'][i] for i in range(len(self.data['raw'])) if i % 2 == 0]
         self.data['readings']=[self.data['raw'][i] for i in range(len(self.data['raw'])) if (i % 2)-1 == 0]
         self.data['zipped']=defaultdict(list)
         for number, channel in enumerate(self.data['channels']):
             self.data['zipped'][channel].append(self.data['readings'][number])
-        self.status='triggering 1'
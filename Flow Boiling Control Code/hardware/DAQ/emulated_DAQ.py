@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:27:33 2026
+
+Emulated data acquisition unit. Stands in for the pyvisa session of a DAQ6510 or Agilent 34970A, so that the
+whole control code can be run (and timed) without the rig attached.
+
+Only the commands used by the DAQ classes are understood:
+    - ROUT:SCAN:CRE / ROUT:SCAN set the scanlist
+    - ROUT:SCAN:COUN:SCAN / TRIG:COUN set the number of sweeps
+    - INIT fills the buffer with readings for every channel in the scanlist (each channel scatters by +/-0.5%
+      around its own random level, so steady state is still detected)
+    - *OPC? only answers once the emulated scan time has passed
+    - TRAC:ACT?, TRAC:DATA? (DAQ6510) and FETC? (Agilent) return the buffer in the instrument's own format
+    - DAQ6510 continuous scanning (ROUT:SCAN:COUN:SCAN 0 with ROUT:SCAN:INT, until ABOR) fills a circular buffer
+      of TRAC:POIN readings in real time, one sweep per scan interval. TRAC:ACT:END? gives the position of the
+      latest reading and TRAC:DATA? with REL gives time stamps.
+    - DAQ6510 named buffers ("defbuffer1", "defbuffer2"): ROUT:SCAN:BUFF chooses the buffer a scan goes into, and
+      TRAC:CLE, TRAC:ACT? and TRAC:DATA? act on the buffer named in the command. TRAC:ACT? counts only the
+      readings the emulated scan would have taken so far, so the next scan can run while the last is read.
+    - ROUT:SCAN:COUN:STEP? (DAQ6510) and ROUT:SCAN:SIZE? (Agilent) give the number of channels in the scan
+Compound messages (commands joined by ';') are split up, and a new message throws away any unread reply, as on
+the real instruments. Anything else (channel configuration etc.) is accepted and ignored.
+
+Set 'reading_time' in the DAQ kwargs to emulate the time the instrument takes per reading. Left at 0, the
+emulated instrument answers immediately, so only the time spent by the control code is measured.
+Set 'transfer_time' to emulate the time taken to send each reading back over the bus. The read blocks for this
+long, as a pyvisa read would.
+"""
+import random
+import re
+import time
+from collections import deque
+
+class emulated_timeout(Exception):
+    # Raised when reading from the emulated instrument while it has nothing to say (pyvisa would time out here)
+    pass
+
+class emulated_DAQ(object):
+    def __init__(self, address, **kwargs):
+        self.address=address
+        self.read_termination='\n'
+        self.write_termination='\n'
+
+        self.reading_time=kwargs.get('reading_time',0)
+        self.transfer_time=kwargs.get('transfer_time',0)
+
+        self.channels=[]
+        self.levels={}
+        self.scan_count=1
+        # Readings in each buffer, and when the scan into it started
+        self.buffers={'DEFBUFFER1':[]}
+        self.scan_started={'DEFBUFFER1':0}
+        self.scan_buffer='DEFBUFFER1'
+        self.output=deque()
+        self.busy_until=0
+        
+        # Continuous (hardware-timed) scanning
+        self.capacity=10000
+        self.scan_interval=1
+        self.continuous=False
+        self.started=0
+        self.sweeps=0
+        self.circular={}
+        self.end=0
+
+        # DAQ6510 reports 'channel, reading'. Agilent reports 'reading, channel'.
+        self.channel_first=True
+
+    def close(self):
+        pass
+
+    def open(self):
+        pass
+
+    def query(self, cmd):
+        self.write(cmd)
+        return self.read()
+
+    def read(self):
+        if len(self.output)==0:
+            raise emulated_timeout('Nothing to read from emulated DAQ')
+
+        message=self.output.popleft()
+        if message=='*OPC?':
+            # Only report 'finished' once the emulated scan would have completed
+            if time.monotonic()<self.busy_until:
+                self.output.appendleft(message)
+                raise emulated_timeout('Emulated DAQ still scanning')
+            message='1'
+        return message
+
+    def write(self, cmd):
+        # A new message discards any reply which hasn't been read (IEEE 488.2 'query interrupted')
+        self.output.clear()
+        # Compound commands are separated by semicolons, as on the real instruments
+        for part in cmd.split(';'):
+            part=part.strip().lstrip(':').upper()
+            if part!='':
+                self.handle(part)
+
+    def handle(self, cmd):
+        if cmd=='*IDN?':
+            self.output.append('EMULATED,DAQ,'+self.address+',1.0')
+
+        elif cmd=='*RST':
+            self.output.clear()
+            self.channels=[]
+            self.buffers={'DEFBUFFER1':[]}
+            self.scan_buffer='DEFBUFFER1'
+            self.scan_count=1
+
+        elif cmd=='*OPC?':
+            self.output.append('*OPC?')
+
+        elif cmd.startswith('ROUT:SCAN:CRE') or cmd.startswith('ROUT:SCAN ('):
+            self.channels=[int(channel) for channel in re.findall(r'\d+',cmd)]
+            self.levels={channel:random.uniform(1,10) for channel in self.channels}
+            self.channel_first=cmd.startswith('ROUT:SCAN:CRE')
+
+        elif cmd in ('ROUT:SCAN:COUN:STEP?','ROUT:SCAN:SIZE?'):
+            self.output.append(str(len(self.channels)))
+
+        elif cmd.startswith('ROUT:SCAN:COUN:SCAN') or cmd.startswith('TRIG:COUN'):
+            self.scan_count=int(cmd.split(' ')[-1])
+
+        elif cmd.startswith('ROUT:SCAN:INT'):
+            self.scan_interval=float(cmd.split(' ')[-1])
+
+        elif cmd.startswith('TRAC:POIN'):
+            self.capacity=int(re.findall(r'\d+',cmd)[0])
+
+        elif cmd.startswith('ROUT:SCAN:BUFF'):
+            self.scan_buffer=self.buffer_name(cmd)
+
+        elif cmd=='ABOR':
+            self.update()
+            self.continuous=False
+
+        elif cmd=='INIT' and self.scan_count==0:
+            self.continuous=True
+            self.started=time.monotonic()
+            self.sweeps=0
+            self.circular={}
+            self.end=0
+
+        elif cmd=='TRAC:ACT:END?':
+            self.update()
+            self.output.append(str(self.end))
+
+        elif cmd.startswith('TRAC:DATA?') and 'REL' in cmd:
+            self.update()
+            start, stop=[int(number) for number in re.findall(r'\d+',cmd)[:2]]
+            readings=[self.circular[position] for position in range(start,stop+1)]
+            self.output.append(','.join('{:.6f},{},{:+.6E}'.format(t,channel,reading) for t, channel, reading in readings))
+
+        elif cmd=='INIT':
+            buffer=[(channel,self.levels[channel]*random.uniform(0.995,1.005))
+                    for _ in range(self.scan_count) for channel in self.channels]
+            self.buffers[self.scan_buffer]=buffer
+            self.scan_started[self.scan_buffer]=time.monotonic()
+            self.busy_until=time.monotonic()+self.reading_time*len(buffer)
+
+        elif cmd.startswith('TRAC:CLE'):
+            self.buffers[self.buffer_name(cmd)]=[]
+            self.circular={}
+            self.end=0
+
+        elif cmd.startswith('TRAC:ACT?'):
+            self.output.append(str(self.readings_taken(self.buffer_name(cmd))))
+
+        elif cmd.startswith('TRAC:DATA?'):
+            self.output.append(self.format_buffer(self.buffers.get(self.buffer_name(cmd),[])))
+
+        elif cmd=='FETC?':
+            if len(self.buffers['DEFBUFFER1'])>0:
+                self.output.append(self.format_buffer(self.buffers['DEFBUFFER1']))
+
+    def buffer_name(self, cmd):
+        # Buffer named in a command, i.e. TRAC:ACT? "defbuffer2". defbuffer1 if none is named.
+        names=re.findall(r'"(.*?)"',cmd)
+        return names[0] if len(names)>0 else 'DEFBUFFER1'
+
+    def readings_taken(self, name):
+        # Readings made so far by the scan into this buffer
+        buffer=self.buffers.get(name,[])
+        if self.reading_time==0:
+            return len(buffer)
+        done=int((time.monotonic()-self.scan_started.get(name,0))/self.reading_time)
+        return min(done,len(buffer))
+
+    def update(self):
+        # Add the sweeps which the instrument would have made since the last look
+        if not self.continuous:
+            return
+        due=int((time.monotonic()-self.started)/self.scan_interval)+1
+        for sweep in range(self.sweeps,due):
+            t=sweep*self.scan_interval
+            for channel in self.channels:
+                self.end=self.end%self.capacity+1
+                self.circular[self.end]=(t,channel,self.levels[channel]*random.uniform(0.995,1.005))
+        self.sweeps=max(due,self.sweeps)
+
+    def format_buffer(self, buffer):
+        # Sending the readings back takes time, during which the host is blocked
+        if self.transfer_time>0:
+            time.sleep(self.transfer_time*len(buffer))
+
+        if self.channel_first:
+            pairs=[str(channel)+','+'{:+.6E}'.format(reading) for channel, reading in buffer]
+        else:
+            pairs=['{:+.6E}'.format(reading)+','+str(channel) for channel, reading in buffer]
+        return ','.join(pairs)
@@ -4,15 +4,52 @@ Created on Wed Oct 13 14:10:57 2021
 
 Contains class variables for generic data acquisition unit superclass. Agnostic of manufacturer etc.
 
+Configuration commands are sent in batches: as many as fit in the instrument's input buffer ('max_message' bytes)
+are joined into one compound SCPI message, separated by semicolons.
+
+If 'config_cache' (a json file) is given, a hash of everything the DAQ is about to be configured with is kept there
+once configuration has finished. On the next start, if the hash is the same and the instrument still has the
+expected number of channels in its scan, the reset and configuration are skipped.
+
+If 'scan_ring' (a name) is given, every scan is published to a ring buffer of that name in shared memory (see
+core/scan_ring.py), once all of this DAQ's sensors have converted it: the raw readings of each channel ('raw',
+one column per sensor) and every recorded value of its sensors ('values', i.e. 'H1.T'). Notebooks, dashboards or
+a second logger can then follow the run live, without slowing it down. The ring holds the last 'ring_capacity'
+scans of up to 'ring_rows' sweeps each (default: the most sweeps the DAQ takes in a scan). A scan with more sweeps
+(several blocks drained at once in hardware-timed mode) takes up several slots.
+Scans are numbered as they are sent to the sensors, and one is published once every sensor has converted it. A scan
+which a sensor fails on is left out, and the ones after it are published as usual. Publishing never stops the DAQ
+or its sensors: anything which goes wrong is sent to the error log instead. If the ring can't be made (i.e. one of
+the same name is still open elsewhere), publishing is switched off.
+
 @author: Chris Salmean
 """
 import asyncio
-import pyvisa as visa
+import hashlib
+import json
+import os
 import random
 from hardware.hardware import *
+from core.scan_ring import scan_ring, stack_columns
 import time
 import re
 
+def batch_commands(cmd_list, max_message):
+    # Join commands into compound messages of at most max_message bytes. Each command is started from the root
+    # of the command tree (leading ':'), otherwise the instrument reads it relative to the command before it.
+    messages=[]
+    message=''
+    for cmd in cmd_list:
+        if not cmd.startswith((':','*')):
+            cmd=':'+cmd
+        if message!='' and len(message)+1+len(cmd)>max_message:
+            messages.append(message)
+            message=''
+        message=cmd if message=='' else message+';'+cmd
+    if message!='':
+        messages.append(message)
+    return messages
+
 class DAU(serial_hardware):
     def __init__(self,name,manager,**kwargs):
         super().__init__(name,manager,**kwargs)
@@ -32,6 +69,121 @@ class DAU(serial_hardware):
         
         self.start_time=time.time()
         
+        self.max_message=kwargs.get('max_message',1024)
+        self.config_cache=kwargs.get('config_cache',None)
+        
+        # The ring is made at the first scan, once all the sensors are set up
+        self.ring_name=kwargs.get('scan_ring',None)
+        self.ring_capacity=kwargs.get('ring_capacity',1000)
+        self.ring_rows=kwargs.get('ring_rows',max(int(sweeps) for sweeps in self.n_sweeps.values()))
+        self.ring=None
+        self.scan_number=0
+        self.converted_sensors={} # {scan number: names of the sensors which have converted it}
+        self.ring_dropped=0
+        
+        # Set each time the DAQ is done with a trigger, for the timer to wait on (see core/timer.py)
+        self.trigger_cleared=asyncio.Event()
+        
+    def new_scan(self):
+        # Before a scan is sent to the sensors. Their 'processed' is cleared first, so sensors which wait for another
+        # (heaters for their shunt, thermocouples for their reference) get its reading of the same scan.
+        self.scan_number+=1
+        for sensor in self.channel_dict.values():
+            sensor.processed.clear()
+    
+    def send_commands(self, cmd_list):
+        for message in batch_commands(cmd_list,self.max_message):
+            self.ser.write(message)
+    
+    def configuration_hash(self, cmd_list):
+        return hashlib.sha1(json.dumps([self.address,cmd_list]).encode()).hexdigest()
+    
+    def read_cache(self):
+        try:
+            with open(self.config_cache) as file:
+                return json.load(file)
+        except (OSError,ValueError):
+            return {}
+    
+    def configuration_matches(self, cmd_list):
+        # True if the instrument was last configured with exactly these commands, and hasn't been reset since
+        if self.config_cache is None:
+            return False
+        if self.read_cache().get(self.address)!=self.configuration_hash(cmd_list):
+            return False
+        try:
+            return self.scan_size()==len(self.configuration_strings)
+        except:
+            return False
+    
+    def remember_configuration(self, cmd_list):
+        # Forget the old configuration first, so a start which fails part way through isn't taken as configured
+        if self.config_cache is None:
+            return
+        cache=self.read_cache()
+        if cmd_list is None:
+            cache.pop(self.address,None)
+        else:
+            cache[self.address]=self.configuration_hash(cmd_list)
+        try:
+            with open(self.config_cache,'w') as file:
+                json.dump(cache,file,indent=1)
+        except OSError as error:
+            print(f'{self.name}: configuration cache not saved: {error}')
+        
+    def open_ring(self):
+        self.ring_sensors=[self.channel_dict[channel] for channel in sorted(self.channel_dict)]
+        self.ring_values=[]
+        for sensor in self.ring_sensors:
+            for attrlist in self.manager.recorded_variables.get(sensor.name,{}).values():
+                self.ring_values.extend([(sensor,attr) for attr in attrlist])
+        self.ring_values=list(dict.fromkeys(self.ring_values))
+        
+        self.ring=scan_ring(self.ring_name,
+                            blocks={'raw':[sensor.name for sensor in self.ring_sensors],
+                                    'values':[sensor.name+'.'+attr for sensor, attr in self.ring_values]},
+                            max_rows=self.ring_rows,capacity=self.ring_capacity)
+        print(f'{self.name}: publishing scans to scan ring {self.ring.name}')
+    
+    def converted(self, sensor, scan):
+        # Called by each sensor once it has dealt with its readings of scan number 'scan'. The scan is published
+        # once all of them have. Scans still incomplete two scans later are given up on.
+        if self.ring_name is None:
+            return
+        done=self.converted_sensors.setdefault(scan,set())
+        done.add(sensor.name)
+        for number in [number for number in self.converted_sensors if number<scan-2]:
+            del self.converted_sensors[number]
+            self.ring_dropped+=1
+        if len(done)<len(self.channel_dict):
+            return
+        del self.converted_sensors[scan]
+        
+        try:
+            with self.manager.tracer.span(self.name+'.publish'):
+                self.publish()
+        except Exception as error:
+            self.ring_error(error)
+    
+    def publish(self):
+        if self.ring is None:
+            self.open_ring()
+        self.ring.write(state=1 if self.state=='SS' else 0,
+                        step=self.manager.controller.step_count if 'controller' in dir(self.manager) else 0,
+                        t=(getattr(self,'first_reading_time',0),getattr(self,'last_reading_time',0)),
+                        raw=stack_columns([sensor.signal for sensor in self.ring_sensors]),
+                        values=stack_columns([getattr(sensor,attr) for sensor, attr in self.ring_values]))
+    
+    def ring_error(self, error):
+        message=f'scan not published to scan ring {self.ring_name}: {error!r}'
+        if self.ring is None:
+            message+='. Publishing switched off'
+            self.ring_name=None
+        c1='\x1b[1;30;43m'
+        c2='\x1b[0m'
+        print(c1+f'{self.name}: {message}'+c2)
+        self.manager.log_error([round(time.time()-self.manager.startup_time,2),'Scan ring',self.name,message])
+    
     def determine_state(self):
       # check self to see if unsteady state (USS) or steady state (SS).
       # If SS has been activated, we need to lock this state for a number of counts.
@@ -74,11 +226,15 @@ class DAU(serial_hardware):
                 self.determine_state()
                 if self.dummy==False:
                     self.status='triggering 0'
-                    await self.trigger()
+                    with self.manager.tracer.span(self.name+'.trigger'):
+                        await self.trigger()
                     
                 self.status='distributing 0'
-                await self.send_to_sensors()
+                self.new_scan()
+                with self.manager.tracer.span(self.name+'.send_to_sensors'):
+                    await self.send_to_sensors()
                 self.triggered.clear()
+                self.trigger_cleared.set()
                 
         except:
             self.status=re.sub('\d','2',self.status)
@@ -88,5 +244,11 @@ class DAU(serial_hardware):
         print(f'{self.name}: shutting down')
         self._shutdown.set()
         
+        if self.ring is not None:
+            if self.ring_dropped>0:
+                print(f'{self.name}: {self.ring_dropped} scans not published (a sensor failed to convert them)')
+            self.ring.close()
+            self.ring=None
+        
         if self.dummy==False:
             self.ser.close()
\ No newline at end of file
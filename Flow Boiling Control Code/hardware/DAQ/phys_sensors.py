@@ -11,10 +11,17 @@ import numpy as np
 import random
 import re
 
+from core.supervisor import reported_status
+from core.calibration_store import heater_coefficients
+from hardware.DAQ import thermocouples
+
 class Sensor (object):
     """ All sensors have certain attributes in common; for example:
         name, channel number, signal, reading, high/low values. Set these in the 'sensor' object"""
     
+    # Status changes are passed straight to the manager
+    status=reported_status()
+    
     def __init__(self, name, manager, **kwargs):
         self.name=name
         
@@ -23,11 +30,8 @@ class Sensor (object):
         self.manager.hardware_dict[self.name]=[self,self.status]
         self.manager.sensor_dict[self.name]=self
                 
-        importstring='from __main__ import ' + kwargs['DAQ']
-        exec(importstring)
-        
         self.DAQ_type=kwargs['DAQ_type']
-        self.DAQ=eval(kwargs['DAQ'])
+        self.DAQ=self.manager.find(kwargs['DAQ'])
         self.channel=kwargs['channel']
         self.channel_identifier='(@'+str(self.channel)+')'
 
@@ -51,7 +55,7 @@ class Sensor (object):
         
         # Start asynchronous loops
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         
         self.signal=[]
         self.alarm_history=[]
@@ -137,9 +141,11 @@ class Sensor (object):
             while not self._shutdown.is_set():
                 self.status= 'waiting 0'
                 await self.updated.wait()
+                scan=self.DAQ.scan_number
                 
                 self.status= 'processing 0'
-                await self.process_data()
+                with self.manager.tracer.span(self.name+'.process_data'):
+                    await self.process_data()
                 
                 for name in dir(self):
                     if 'virt_trig' in name:
@@ -147,13 +153,16 @@ class Sensor (object):
                         eval(triggerstring).set()                    
                 
                 self.status='checking 0'
-                self.check_alarms()
+                with self.manager.tracer.span(self.name+'.check_alarms'):
+                    self.check_alarms()
                 
                 self.status='SS_calc 0'
-                self.determine_SS()
+                with self.manager.tracer.span(self.name+'.determine_SS'):
+                    self.determine_SS()
                 
                 self.status= 'transmitting 0'
                 self.transmit()
+                self.DAQ.converted(self,scan)
                 
                 self.updated.clear()
     
@@ -258,37 +267,76 @@ class VAC (Sensor):
         self.primary='V'
 
 class TC (Sensor):
-    # Measure temperature using thermocouple. In this case, we use a type-T thermocouple.
+    """
+    Measure temperature using thermocouple. In this case, we use a type-T thermocouple (tc_type for others).
+    
+    mode 'instrument' (default): the DAQ measures temperature, doing the reference-junction compensation and conversion itself for every reading.
+    mode 'voltage': the DAQ only measures the thermocouple voltage, which is quicker per channel. Temperature is worked out here, for the whole
+    scan at once, using the NIST polynomials (see thermocouples.py). The reference junction is at the DAQ terminals, so its temperature is
+    needed: either 'reference', the name of a PT100 at the terminals, or a fixed 'reference_T' [degC]. Each scan is converted with the
+    reference's reading from the same scan (the DAQ clears 'processed' before sending a scan to its sensors).
+    """
     def __init__ (self, name, manager, **kwargs):
         super().__init__(name,manager,**kwargs)
         
 
         self.nplc=kwargs['nplc']
         self.settling_time=kwargs['settling_time']
+        self.tc_type=kwargs.get('tc_type','T')
+        self.mode=kwargs.get('mode','instrument')
+        
+        if self.mode=='voltage':
+            thermocouples.check_type(self.tc_type)
+            self.reference=self.manager.find(kwargs['reference']) if kwargs.get('reference') is not None else None
+            self.reference_T=kwargs.get('reference_T')
+            if self.reference is None and self.reference_T is None:
+                raise ValueError(f'{self.name}: a thermocouple in voltage mode needs a reference (PT100 at the DAQ terminals) or a reference_T')
+        
         # populate command list.
         # want two different groups of settings, for regular and burst use
         
-        if self.DAQ_type == 'DAQ6510':
-            self.cmd_list=[
-                "FUNC 'TEMP', "+self.channel_identifier,
-                "TEMP:TRAN TC, "+self.channel_identifier,
-                "TEMP:TC:TYPE T, "+self.channel_identifier, # Type T thermocouple. Might need to change for other experiments.
-                "DISP:TEMP:DIG 5, "+self.channel_identifier,
-                # "TEMP:AZER OFF, "+self.channel_identifier,
-                "TEMP:DEL:AUTO OFF, "+self.channel_identifier,
-                ]
-            spacer=', '
+        if self.mode=='voltage':
+            # Thermocouple voltages are tens of mV at most, so use the lowest range. Automatic zeroing is left on, since offsets of a few uV matter here.
+            if self.DAQ_type == 'DAQ6510':
+                self.cmd_list=[
+                    "FUNC 'VOLT:DC', "+self.channel_identifier,
+                    "DISP:VOLT:DC:DIG 6, "+self.channel_identifier,
+                    ]
+                spacer=', '
+                
+            elif self.DAQ_type == 'Agilent34970A':
+                self.cmd_list=[
+                    "CONF:VOLT:DC "+self.channel_identifier,
+                    ]
+                spacer=','
             
-        elif self.DAQ_type == 'Agilent34970A':
-            self.cmd_list=[
-                "CONF:TEMP TC,T ,"+self.channel_identifier,
-                "ZERO:AUTO OFF,"+self.channel_identifier
-                ]
-            spacer=','
+            self.cmd_list.extend([
+                "VOLT:DC:NPLC "+str(self.nplc)+spacer+self.channel_identifier,
+                "VOLT:DC:RANG 0.1"+spacer+self.channel_identifier,
+                "ROUT:CHAN:DEL "+str(self.settling_time)+spacer+self.channel_identifier])
         
-        self.cmd_list.extend([
-            "TEMP:NPLC "+str(self.nplc)+spacer+self.channel_identifier,
-            "ROUT:CHAN:DEL "+str(self.settling_time)+spacer+self.channel_identifier])
+        else:
+            if self.DAQ_type == 'DAQ6510':
+                self.cmd_list=[
+                    "FUNC 'TEMP', "+self.channel_identifier,
+                    "TEMP:TRAN TC, "+self.channel_identifier,
+                    "TEMP:TC:TYPE "+self.tc_type+", "+self.channel_identifier,
+                    "DISP:TEMP:DIG 5, "+self.channel_identifier,
+                    # "TEMP:AZER OFF, "+self.channel_identifier,
+                    "TEMP:DEL:AUTO OFF, "+self.channel_identifier,
+                    ]
+                spacer=', '
+                
+            elif self.DAQ_type == 'Agilent34970A':
+                self.cmd_list=[
+                    "CONF:TEMP TC,"+self.tc_type+" ,"+self.channel_identifier,
+                    "ZERO:AUTO OFF,"+self.channel_identifier
+                    ]
+                spacer=','
+            
+            self.cmd_list.extend([
+                "TEMP:NPLC "+str(self.nplc)+spacer+self.channel_identifier,
+                "ROUT:CHAN:DEL "+str(self.settling_time)+spacer+self.channel_identifier])
             
         for command in self.cmd_list:
             self.DAQ.configuration_strings[self.channel]=self.cmd_list
@@ -303,6 +351,26 @@ class TC (Sensor):
         for attrlist in self.manager.recorded_variables[self.name].values():
             for attribute in attrlist:
                 setattr(self,attribute,0)
+    
+    async def process_data(self):
+        if self.mode!='voltage':
+            await super().process_data()
+            return
+        
+        # print(f'{self.name} converting signal into readings')
+        if self.reference is not None:
+            await self.reference.processed.wait()
+            T_ref=np.mean(self.reference.T)
+        else:
+            T_ref=self.reference_T
+        
+        # Measured voltage is relative to the reference junction, so add the voltage a junction at T_ref would give (relative to 0 degC)
+        self.E=np.add(np.multiply(self.signal,1e3),thermocouples.emf(self.tc_type,T_ref))
+        self.T=thermocouples.temperature(self.tc_type,self.E)
+        
+        self.processed.set()
+        self.new_values.set()
+        await asyncio.sleep(0.00001)
                               
 class PT100 (Sensor):
     # Measure temperature using RTD temperature sensor.
@@ -444,11 +512,12 @@ class RTD(Res):
     def __init__ (self, name, manager, **kwargs):
         super().__init__(name,manager,**kwargs)
     
-        # Take calibrated TCR parameters
-        self.a = kwargs['a']
-        self.b = kwargs['b']
-        self.c = kwargs['c']
-        self.offset=kwargs['offset']
+        # Take calibrated TCR parameters (from the calibration store, if the chip is in it)
+        coefficients=heater_coefficients(self.name,kwargs)
+        self.a = coefficients['a']
+        self.b = coefficients['b']
+        self.c = coefficients['c']
+        self.offset=coefficients['offset']
         
         self.manager.recorded_variables[self.name]={'SS':['R','T'],
                                                     'USS':['R','T'],
@@ -483,18 +552,16 @@ class DC_heater(VDC):
     """
     def __init__ (self, name, manager, **kwargs):
         super().__init__(name,manager,**kwargs)
-        importstring='from __main__ import ' + kwargs['shunt']
-        exec(importstring)
-        
         # Point program towards the right shunt so that it can calculate the heater's resistance etc.
-        self.shunt=eval(kwargs['shunt'])
+        self.shunt=self.manager.find(kwargs['shunt'])
         
         # Same as in the RTD object above, we need to know the pre-calibrated TCR of the heater to determine its temperature
         if kwargs['T_sensing']==True:
-            self.a=kwargs['a']
-            self.b=kwargs['b']
-            self.c=kwargs['c']
-            self.offset=kwargs['offset']
+            coefficients=heater_coefficients(self.name,kwargs)
+            self.a=coefficients['a']
+            self.b=coefficients['b']
+            self.c=coefficients['c']
+            self.offset=coefficients['offset']
     
         # For each heater, we wish to record and display several parameters.
         self.manager.recorded_variables[self.name]={'SS':['V','R','Q','T'],
@@ -531,16 +598,14 @@ class AC_heater(VAC):
     """
     def __init__ (self, name, manager, **kwargs):
         super().__init__(name,manager,**kwargs)
-        importstring='from __main__ import ' + kwargs['shunt']
-        exec(importstring)
-        
-        self.shunt=eval(kwargs['shunt'])
+        self.shunt=self.manager.find(kwargs['shunt'])
 
         if kwargs['T_sensing']==True:
-            self.a=kwargs['a']
-            self.b=kwargs['b']
-            self.c=kwargs['c']
-            self.offset=kwargs['offset']
+            coefficients=heater_coefficients(self.name,kwargs)
+            self.a=coefficients['a']
+            self.b=coefficients['b']
+            self.c=coefficients['c']
+            self.offset=coefficients['offset']
             
             self.manager.recorded_variables[self.name]={'SS':['V','R','Q','T'],
                                                         'USS':['V','R','Q','T'],
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:12:00 2026
+
+Thermocouple conversion on the host, for TC sensors in 'voltage' mode (see TC in phys_sensors.py).
+
+The NIST ITS-90 thermocouple polynomials (NIST Monograph 175):
+    emf(tc_type, T)          thermoelectric voltage [mV] of a junction at T [degC], reference junction at 0 degC
+    temperature(tc_type, E)  temperature [degC] from a thermoelectric voltage [mV], reference junction at 0 degC
+Both take whole arrays at once. Values outside the range of the polynomials come back as NaN.
+
+With the reference (cold) junction at T_ref rather than 0 degC, the measured voltage is topped up with the voltage of
+a junction at T_ref before converting:
+    T = temperature(tc_type, E_measured + emf(tc_type, T_ref))
+
+The inverse polynomials agree with the tables to within 0.03-0.06 degC, depending on type and range.
+Types T, J, K and E are included.
+"""
+import numpy as np
+
+# Type: [(lowest T [degC], highest T [degC], coefficients c0, c1, ...)], E in mV
+EMF={
+    'T':[(-270,0,[0.000000000000E+00,0.387481063640E-01,0.441944343470E-04,0.118443231050E-06,
+                  0.200329735540E-07,0.901380195590E-09,0.226511565930E-10,0.360711542050E-12,
+                  0.384939398830E-14,0.282135219250E-16,0.142515947790E-18,0.487686622860E-21,
+                  0.107955392700E-23,0.139450270620E-26,0.797951539270E-30]),
+         (0,400,[0.000000000000E+00,0.387481063640E-01,0.332922278800E-04,0.206182434040E-06,
+                 -0.218822568460E-08,0.109968809280E-10,-0.308157587720E-13,0.454791352900E-16,
+                 -0.275129016730E-19])],
+
+    'J':[(-210,760,[0.000000000000E+00,0.503811878150E-01,0.304758369300E-04,-0.856810657200E-07,
+                    0.132281952950E-09,-0.170529583370E-12,0.209480906970E-15,-0.125383953360E-18,
+                    0.156317256970E-22]),
+         (760,1200,[0.296456256810E+03,-0.149761277860E+01,0.317871039240E-02,-0.318476867010E-05,
+                    0.157208190040E-08,-0.306913690560E-12])],
+
+    'K':[(-270,0,[0.000000000000E+00,0.394501280250E-01,0.236223735980E-04,-0.328589067840E-06,
+                  -0.499048287770E-08,-0.675090591730E-10,-0.574103274280E-12,-0.310888728940E-14,
+                  -0.104516093650E-16,-0.198892668780E-19,-0.163226974860E-22]),
+         (0,1372,[-0.176004136860E-01,0.389212049750E-01,0.185587700320E-04,-0.994575928740E-07,
+                  0.318409457190E-09,-0.560728448890E-12,0.560750590590E-15,-0.320207200030E-18,
+                  0.971511471520E-22,-0.121047212750E-25])],
+
+    'E':[(-270,0,[0.000000000000E+00,0.586655087080E-01,0.454109771240E-04,-0.779980486860E-06,
+                  -0.258001608430E-07,-0.594525830570E-09,-0.932140586670E-11,-0.102876055340E-12,
+                  -0.803701236210E-15,-0.439794973910E-17,-0.164147763550E-19,-0.396736195160E-22,
+                  -0.558273287210E-25,-0.346578420130E-28]),
+         (0,1000,[0.000000000000E+00,0.586655087100E-01,0.450322755820E-04,0.289084072120E-07,
+                  -0.330568966520E-09,0.650244032700E-12,-0.191974955040E-15,-0.125366004970E-17,
+                  0.214892175690E-20,-0.143880417820E-23,0.359608994810E-27])],
+    }
+
+# Type K has an extra term above 0 degC: a0*exp(a1*(T-a2)^2)
+EMF_EXPONENTIAL={'K':(0.118597600000E+00,-0.118343200000E-03,0.126968600000E+03)}
+
+# Type: [(lowest E [mV], highest E [mV], coefficients d0, d1, ...)], T in degC
+TEMPERATURE={
+    'T':[(-5.603,0,[0.0000000E+00,2.5949192E+01,-2.1316967E-01,7.9018692E-01,4.2527777E-01,1.3304473E-01,
+                    2.0241446E-02,1.2668171E-03]),
+         (0,20.872,[0.000000E+00,2.592800E+01,-7.602961E-01,4.637791E-02,-2.165394E-03,6.048144E-05,
+                    -7.293422E-07])],
+
+    'J':[(-8.095,0,[0.0000000E+00,1.9528268E+01,-1.2286185E+00,-1.0752178E+00,-5.9086933E-01,-1.7256713E-01,
+                    -2.8131513E-02,-2.3963370E-03,-8.3823321E-05]),
+         (0,42.919,[0.000000E+00,1.978425E+01,-2.001204E-01,1.036969E-02,-2.549687E-04,3.585153E-06,
+                    -5.344285E-08,5.099890E-10]),
+         (42.919,69.553,[-3.11358187E+03,3.00543684E+02,-9.94773230E+00,1.70276630E-01,-1.43033468E-03,
+                         4.73886084E-06])],
+
+    'K':[(-5.891,0,[0.0000000E+00,2.5173462E+01,-1.1662878E+00,-1.0833638E+00,-8.9773540E-01,-3.7342377E-01,
+                    -8.6632643E-02,-1.0450598E-02,-5.1920577E-04]),
+         (0,20.644,[0.000000E+00,2.508355E+01,7.860106E-02,-2.503131E-01,8.315270E-02,-1.228034E-02,
+                    9.804036E-04,-4.413030E-05,1.057734E-06,-1.052755E-08]),
+         (20.644,54.886,[-1.318058E+02,4.830222E+01,-1.646031E+00,5.464731E-02,-9.650715E-04,8.802193E-06,
+                         -3.110810E-08])],
+
+    'E':[(-8.825,0,[0.0000000E+00,1.6977288E+01,-4.3514970E-01,-1.5859697E-01,-9.2502871E-02,-2.6084314E-02,
+                    -4.1360199E-03,-3.4034030E-04,-1.1564890E-05]),
+         (0,76.373,[0.0000000E+00,1.7057035E+01,-2.3301759E-01,6.5435585E-03,-7.3562749E-05,-1.7896001E-06,
+                    8.4036165E-08,-1.3735879E-09,1.0629823E-11,-3.2447087E-14])],
+    }
+
+TYPES=sorted(TEMPERATURE)
+
+def polynomial(coefficients, x):
+    # c0 + c1*x + c2*x^2 + ..., by Horner's method
+    result=np.zeros_like(x)
+    for coefficient in reversed(coefficients):
+        result=result*x+coefficient
+    return result
+
+def piecewise(ranges, x, tolerance=0):
+    # Each value is worked out with the polynomial of the range it falls in. The first range found wins at the
+    # boundaries (where neighbouring polynomials agree anyway). Ranges are widened by tolerance.
+    x=np.asarray(x,dtype=float)
+    result=np.full(x.shape,np.nan)
+    for low, high, coefficients in ranges:
+        inside=(x>=low-tolerance)&(x<=high+tolerance)&np.isnan(result)
+        result[inside]=polynomial(coefficients,x[inside])
+    return result
+
+def check_type(tc_type):
+    if tc_type not in TEMPERATURE:
+        raise ValueError(f'No conversion for type {tc_type} thermocouples. Known types: {", ".join(TYPES)}')
+
+def emf(tc_type, T):
+    check_type(tc_type)
+    T=np.asarray(T,dtype=float)
+    E=piecewise(EMF[tc_type],T)
+    if tc_type in EMF_EXPONENTIAL:
+        a0, a1, a2=EMF_EXPONENTIAL[tc_type]
+        E=np.where(T>=0,E+a0*np.exp(a1*np.square(T-a2)),E)
+    return E
+
+def temperature(tc_type, E):
+    check_type(tc_type)
+    # The limits in mV are rounded to the table's 3 decimals, so the ends of the range are allowed half a digit more
+    return piecewise(TEMPERATURE[tc_type],E,tolerance=5e-4)
@@ -16,7 +16,12 @@ import random
 import numpy as np
 import re
 
+from core.supervisor import reported_status
+
 class Virtual_Sensor(object):
+    # Status changes are passed straight to the manager
+    status=reported_status()
+    
     def __init__(self, name, manager, **kwargs):
         self.name=name
         
@@ -42,7 +47,7 @@ class Virtual_Sensor(object):
         self.alarms = kwargs['alarms']
         
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         self.processed=asyncio.Event()
         self.new_values=asyncio.Event()
         
@@ -114,11 +119,14 @@ class Virtual_Sensor(object):
                 for input_trigger in self.inputlist:
                     await input_trigger.wait()
                 self.status= 'processing 0'
-                self.process_data()
+                with self.manager.tracer.span(self.name+'.process_data'):
+                    self.process_data()
                 self.status='checking 0'
-                self.check_alarms()
+                with self.manager.tracer.span(self.name+'.check_alarms'):
+                    self.check_alarms()
                 self.status='SS_calc 0'
-                self.determine_SS()
+                with self.manager.tracer.span(self.name+'.determine_SS'):
+                    self.determine_SS()
                 self.status= 'transmitting 0'
                 self.transmit()
                    
@@ -145,16 +153,14 @@ class combined_Q(Virtual_Sensor):
         
         for pair in kwargs['inputlist']:
             for item in pair:
-                importstring='from __main__ import ' + item
-                exec(importstring)
+                source=self.manager.find(item)
                 
                 trigger_name='virt_trig'+self.name
-                if trigger_name not in dir(eval(item)):
-                    setattr(eval(item),trigger_name,asyncio.Event())
-                    trigger_name=eval(item).name + '.' + trigger_name
-                    self.inputlist.append(eval(trigger_name))
+                if trigger_name not in dir(source):
+                    setattr(source,trigger_name,asyncio.Event())
+                    self.inputlist.append(getattr(source,trigger_name))
                 
-            self.heaterlist.append((eval(pair[0]),eval(pair[1])))
+            self.heaterlist.append((self.manager.find(pair[0]),self.manager.find(pair[1])))
         
         self.manager.recorded_variables[self.name]={'SS':kwargs['output'],
                                                     'USS':kwargs['output'],
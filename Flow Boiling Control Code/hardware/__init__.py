@@ -2,24 +2,12 @@
 """
 Created on Wed Sep 15 12:15:58 2021
 
+Drivers are not imported here. Each one is imported the first time it is used, through the registry in
+core/registry.py, so that pyvisa, pyserial and ea_psu_controller are only loaded by runs which need them.
+
 @author: Chris
 """
-from .hardware import *
-from .activation import *
-from .control_unit import *
-
-from .DAQ.general_DAQ import *
-from .DAQ.Keithley_DAQ6510 import *
-from .DAQ.Agilent_34970A import *
-from .DAQ.phys_sensors import *
-from .DAQ.virt_sensors import *
-
-from .microcontroller.stepper import *
-from .microcontroller.inverter import *
-
-from .power_supply.HP_33120A import *
-from .power_supply.EA_PS2384 import *
-
-from .pump.hnpm_mzr_2921X1 import *
+from core.registry import package_attribute
 
-from .camera.mv_sua33gm import *
\ No newline at end of file
+def __getattr__(name):
+    return package_attribute(__name__,name)
\ No newline at end of file
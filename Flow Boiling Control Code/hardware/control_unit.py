@@ -22,9 +22,7 @@ class controller (core_module):
         super().__init__(name,manager,**kwargs)
         self.manager.controller=self
         
-        importstring='from __main__ import ' + kwargs['SS_target']
-        exec(importstring)
-        self.SS_target=eval(kwargs['SS_target'])
+        self.SS_target=self.manager.find(kwargs['SS_target'])
 
         # Get list of all sensors
         self.sensors=manager.sensor_dict
@@ -69,21 +67,21 @@ class controller (core_module):
                 
                 self.status= 'gathering 0'
                 
-
-                if self.state!= self.SS_target.state:
-                    if self.SS_target.state=='USS':
-                        self.step(1)
-                        
-                self.state=self.SS_target.state
-                
-                if self.state == 'SS':
-                    self.processed.set()
-                    self.processed.clear()
-                else:
-                    self.status= 'distributing 0'
-                    self.update_sensors()
-                    self.processed.set()    
-                    self.processed.clear()
+                with self.manager.tracer.span(self.name+'.process'):
+                    if self.state!= self.SS_target.state:
+                        if self.SS_target.state=='USS':
+                            self.step(1)
+                            
+                    self.state=self.SS_target.state
+                    
+                    if self.state == 'SS':
+                        self.processed.set()
+                        self.processed.clear()
+                    else:
+                        self.status= 'distributing 0'
+                        self.update_sensors()
+                        self.processed.set()    
+                        self.processed.clear()
                 
                 for device in self.devices.values():
                     self.status='waiting for devices 0'
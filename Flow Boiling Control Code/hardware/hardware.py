@@ -15,12 +15,38 @@ All controllable hardware (pump, PSUs, DAQs, Arduinos) have some things in commo
 """
 import asyncio
 
-import pyvisa as visa
-import serial
 import numpy as np
 import re
 
+from hardware.DAQ.emulated_DAQ import emulated_DAQ
+from core.supervisor import reported_status
+
+def connect(**kwargs):
+    # Opens the connection to an instrument, depending if visa or serial connection is used.
+    # Connection libraries are only imported when a device actually uses them
+    if kwargs['method']=='visa':
+        import pyvisa as visa
+        rm=visa.ResourceManager()
+        return rm.open_resource(kwargs['address'])
+    
+    elif kwargs['method']=='serial':
+        import serial
+        COMport='COM'+(''.join(filter(str.isdigit, kwargs['address'])))
+        return serial.Serial(
+            port=COMport,
+            baudrate=9600,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            bytesize=serial.EIGHTBITS)
+    
+    elif kwargs['method']=='emulated':
+        # No instrument attached. Software stand-in answers the same commands (used for benchmarking)
+        return emulated_DAQ(**kwargs)
+
 class serial_hardware(object):
+    # Status changes are passed straight to the manager
+    status=reported_status()
+    
     def __init__(self, name, manager, **kwargs):
         self.name=name
         self.address=kwargs['address']
@@ -34,37 +60,31 @@ class serial_hardware(object):
         self.triggered = asyncio.Event()
         
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         
         if self.dummy==False:
             self.status='Connecting 0'
             
             try:
-                # Perform connection step, depending if visa or serial connection is used.
-                if kwargs['method']=='visa':
-                    rm=visa.ResourceManager()
-                    self.ser=rm.open_resource(self.address)
-                    
-                    self.status='Connecting 1'
-                    
-                elif kwargs['method']=='serial':
-                    COMport='COM'+(''.join(filter(str.isdigit, self.address)))
-                    self.ser=serial.Serial(
-                        port=COMport,
-                        baudrate=9600,
-                        parity=serial.PARITY_NONE,
-                        stopbits=serial.STOPBITS_ONE,
-                        bytesize=serial.EIGHTBITS)
-                    
+                # The builder may have opened the connection already, in a worker thread (see core/builder.py).
+                # It passes None if that failed.
+                self.ser=kwargs['connection'] if 'connection' in kwargs else connect(**kwargs)
+                
+                if kwargs['method']=='serial':
                     self.write_terminator='\r'
                     self.read_terminator='\r\n'
-                    
-                    self.status='Connecting 1'
-                    
+                
+                self.status='Connecting 1' if self.ser is not None else 'Connecting 2'
+
             except:
                 self.status='Connecting 2'
     
 class controlled_device(object):
+    status=reported_status()
+    
+    # Order in which devices are made safe on shutdown. Lowest first (see core/safe_state.py)
+    safety_priority=1
+    
     def __init__(self, name, manager, **kwargs):
         self.name=name
         self.manager=manager
@@ -73,9 +93,7 @@ class controlled_device(object):
         self.manager.hardware_dict[self.name]=[self,self.status]
         self.manager.control_dict[self.name]=[self]
         
-        importstring='from __main__ import ' + kwargs['controller']
-        exec(importstring)
-        self.controller=eval(kwargs['controller'])
+        self.controller=self.manager.find(kwargs['controller'])
         
         self.controller.devices[self.name]=self
         
@@ -92,6 +110,9 @@ class controlled_device(object):
         if 'safe_position' in kwargs.keys():
             self.manager.safety[name]=self
             self.safe_pos= kwargs['safe_position']
+            self.safety_priority=kwargs.get('safety_priority',self.safety_priority)
+            self.safety_timeout=kwargs.get('safety_timeout',None)
+        self.made_safe=False
         
         self.PID=kwargs['PID']
         self.active=False
@@ -110,9 +131,7 @@ class controlled_device(object):
                 self.manager.recorded_variables[self.name][mode].append('CV')
             
             # set target object from within device
-            importstring='from __main__ import '+kwargs['target_sensor']
-            exec(importstring)
-            self.target=eval(kwargs['target_sensor'])
+            self.target=self.manager.find(kwargs['target_sensor'])
             self.target_attr=kwargs['target_attr']
             
             self.kP=kwargs['kP']
@@ -132,7 +151,7 @@ class controlled_device(object):
                 self.min= kwargs['limits']['L']
                 
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         self.processed=asyncio.Event()
         self.new_values=asyncio.Event()
         
@@ -228,8 +247,12 @@ class controlled_device(object):
                 self.status= 'waiting 0'
                 await self.controller.processed.wait()
                 await asyncio.sleep(0.1)
+                if self.manager._shutdown.is_set():
+                    # Being made safe from another thread (see core/safe_state.py), so nothing more is sent
+                    break
                 self.status='responding 0'
-                self.calculate_response()
+                with self.manager.tracer.span(self.name+'.calculate_response'):
+                    self.calculate_response()
                 self.processed.set()
                 self.new_values.set()
                 
@@ -240,13 +263,20 @@ class controlled_device(object):
         # Move to the next step (i.e. for PSU, increase power) after SS has been recorded.
         self.SP=np.array([step * self.step_size])
     
-    def stop(self):
+    def make_safe(self):
+        # Go to the safe position and switch off. On shutdown this is done from a thread of its own.
         try:
             self.set_actual(self.safe_pos)
         except:
             pass
         
         self.deactivate()
+        self.made_safe=True
+    
+    def stop(self):
+        # Not tried again if it has already failed or timed out on shutdown
+        if not self.made_safe and self.name not in self.manager.safe_state.results:
+            self.make_safe()
         
         self._shutdown.set()
         
@@ -25,6 +25,9 @@ import math
 class EAPS2384(controlled_device):
     """ Hardware module for power supply Elektro-Automatik EA PS 2384 3B
     """
+    # Power is switched off first on shutdown
+    safety_priority=0
+    
     def __init__(self, name,manager, **kwargs):
         super().__init__(name,manager, **kwargs)
         
@@ -54,9 +57,7 @@ class EAPS2384(controlled_device):
         # Establish connection to inverter if it exists
         if 'inverter' in kwargs.keys():
             self.inverted=True
-            importstring='from __main__ import ' + kwargs['inverter']
-            exec(importstring)
-            self.inverter=eval(kwargs['inverter'])
+            self.inverter=self.manager.find(kwargs['inverter'])
             self.inverter.set_actual(0)
             
     def calculate_step_count(self,value):
@@ -103,8 +104,6 @@ class EAPS2384(controlled_device):
             except:
                 pass
             
-            task=asyncio.create_task(self.process())
-            self.manager.tasks.append(task)
             self.ser.output_on(output_num=0)
             await asyncio.sleep(0.1)
             self.ser.close(remote=True,output=True,output_num=0)
@@ -126,6 +125,10 @@ class EAPS2384(controlled_device):
             self.processed.clear()
         except:
             pass
+        
+        # The supervisor runs the restart as the new task, so carry on as normal once reconnected
+        if not self._shutdown.is_set():
+            await self.process()
 
     def set_actual(self, value):
         self.status='setting 0'
@@ -11,13 +11,15 @@ Use high-frequency amplifier to generate sufficient power.
 """
 from hardware.hardware import *
 
-import pyvisa as visa
 import time
 import numpy as np
 import asyncio
 import math
 
 class HP33120A(controlled_device,serial_hardware):
+    # Power is switched off first on shutdown
+    safety_priority=0
+    
     def __init__(self, name,manager, **kwargs):
         
         controlled_device.__init__(self,name,manager, **kwargs)
@@ -11,7 +11,6 @@ Pump is on COM15 in my experiments
 @author: Chris Salmean
 """
 import time
-import serial
 import asyncio
 
 from hardware.hardware import *
@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
-from .keylogger import *
-from .logger import *
\ No newline at end of file
+# keylogger (pynput) and datalogger (pandas, tabulate) are imported when first used. See core/registry.py
+from core.registry import package_attribute
+
+def __getattr__(name):
+    return package_attribute(__name__,name)
\ No newline at end of file
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:42:54 2026
+
+Command server. Lets other programs (scripts, automation, a remote console) control a run without a desktop
+session or the keylogger, and tells them whether each command worked.
+
+Listens on a local TCP port (or a Unix socket, if 'path' is given). Each request is one line of JSON, and is
+answered with one line of JSON as soon as it has been carried out:
+    -> {"id": 1, "cmd": "set", "parameter": "PSU", "value": 20}
+    <- {"id": 1, "ok": true, "result": {"PSU.SP": 20.0}}
+    -> {"id": 2, "cmd": "batch", "set": {"PSU": 20, "PUMP": 50}}
+    -> {"id": 3, "cmd": "get", "parameters": ["PSU.SP", "P1.P"]}
+    -> {"id": 4, "cmd": "flow"}
+    <- {"id": 4, "ok": false, "error": "flow not a command."}
+The commands are the keylogger's (see core/commands.py), carried out by the same code, plus:
+    subscribe    {"parameters": [...]}. After every scan the controller deals with, the server sends
+                 {"event": "update", "t": .., "step": .., "state": .., "values": {...}}
+    unsubscribe
+
+Requests are carried out on the event loop, between scans, so a batch is always applied as a whole.
+Updates are not queued up for a subscriber which doesn't read them; they are skipped (and counted) instead.
+
+To send commands from a console:
+    python -m interface.command_server skip
+    python -m interface.command_server '{"cmd":"batch","set":{"PSU":20,"PUMP":50}}'
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import time
+
+from modules.module import *
+from core.commands import command_error, run_command, read_values
+
+class connection(object):
+    # One connected client and the values it has subscribed to
+    def __init__(self, writer):
+        self.writer=writer
+        self.subscriptions=[]
+        self.skipped=0
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode()+b'\n')
+
+class command_server(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.command_server=self
+
+        self.controller=self.manager.find(kwargs['controller'])
+        self.host=kwargs.get('host','127.0.0.1')
+        self.port=kwargs.get('port',5556)
+        self.path=kwargs.get('path',None)
+        # Subscribers with more than this many bytes still to be sent miss updates until they catch up
+        self.max_backlog=kwargs.get('max_backlog',1000000)
+
+        self.connections=set()
+        self.server=None
+
+        self.status='Startup 1'
+
+    def handle(self, client, line):
+        # Carry out one request and build the reply
+        try:
+            request=json.loads(line)
+        except ValueError:
+            return {'id':None,'ok':False,'error':'Requests must be one line of JSON'}
+        if not isinstance(request,dict):
+            return {'id':None,'ok':False,'error':'Requests must be JSON objects, i.e. {"cmd": "skip"}'}
+
+        reply={'id':request.get('id')}
+        try:
+            if request.get('cmd') == 'subscribe':
+                parameters=request.get('parameters',[])
+                # Fails now, rather than on every scan, if a name is wrong
+                values={}
+                for parameter in parameters:
+                    values.update(read_values(self.manager,parameter))
+                client.subscriptions=parameters
+                result=values
+
+            elif request.get('cmd') == 'unsubscribe':
+                client.subscriptions=[]
+                result=None
+
+            elif request.get('cmd') == 'quit':
+                # Answer first. Shutting down cancels this task.
+                self.loop.call_soon(self.manager.shutdown)
+                result=None
+
+            else:
+                result=run_command(self.manager,request)
+
+            reply.update({'ok':True,'result':result})
+
+        except command_error as error:
+            reply.update({'ok':False,'error':str(error)})
+        except Exception as error:
+            reply.update({'ok':False,'error':f'{error.__class__.__name__}: {error}'})
+            self.manager.log_error([round(time.time()-self.manager.startup_time,2),'Command',self.name,
+                                    f'{request.get("cmd")} failed: {error}'])
+        return reply
+
+    async def connected(self, reader, writer):
+        client=connection(writer)
+        self.connections.add(client)
+        try:
+            while not self._shutdown.is_set():
+                line=await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    client.send(self.handle(client,line))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(client)
+            writer.close()
+
+    def publish(self):
+        t=round(time.time()-self.manager.startup_time,3)
+        for client in self.connections:
+            if len(client.subscriptions)==0:
+                continue
+            if client.writer.transport.get_write_buffer_size()>self.max_backlog:
+                client.skipped+=1
+                continue
+
+            values={}
+            for parameter in client.subscriptions:
+                try:
+                    values.update(read_values(self.manager,parameter))
+                except command_error:
+                    values[parameter]=None
+            client.send({'event':'update','t':t,'step':self.controller.step_count,'state':self.controller.state,
+                         'values':values,'skipped':client.skipped})
+
+    async def process(self):
+        try:
+            self.status='starting server 0'
+            if self.server is None:
+                if self.path is not None:
+                    self.server=await asyncio.start_unix_server(self.connected,self.path)
+                    print(f'Command server on {self.path}')
+                else:
+                    self.server=await asyncio.start_server(self.connected,self.host,self.port)
+                    print(f'Command server on {self.host}:{self.port}')
+
+            while not self._shutdown.is_set():
+                self.status='waiting 0'
+                await self.controller.processed.wait()
+
+                self.status='publishing 0'
+                self.publish()
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        print(f'{self.name}: shutting down')
+        self._shutdown.set()
+        if self.server is not None:
+            self.server.close()
+        for client in self.connections:
+            client.writer.close()
+
+class command_client(object):
+    # Simple blocking client for scripts:
+    #     with command_client() as client:
+    #         client.request('batch',set={'PSU':20,'PUMP':50})
+    def __init__(self, host='127.0.0.1', port=5556, path=None, timeout=5):
+        if path is not None:
+            self.socket=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        else:
+            self.socket=socket.create_connection((host,port),timeout=timeout)
+        self.stream=self.socket.makefile('rb')
+        self.number=0
+
+    def request(self, cmd, **arguments):
+        # Returns the command's result, or raises command_error with the reason it failed
+        self.number+=1
+        self.socket.sendall(json.dumps(dict(arguments,cmd=cmd,id=self.number)).encode()+b'\n')
+        while True:
+            reply=json.loads(self.stream.readline())
+            # Skip any subscription updates which arrived first
+            if reply.get('id')==self.number:
+                break
+        if not reply['ok']:
+            raise command_error(reply['error'])
+        return reply['result']
+
+    def updates(self):
+        # Subscription updates, as they arrive
+        for line in self.stream:
+            message=json.loads(line)
+            if message.get('event')=='update':
+                yield message
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Send a command to a running experiment.')
+    parser.add_argument('command',help='command name (i.e. skip), or a full JSON request')
+    parser.add_argument('--host',default='127.0.0.1')
+    parser.add_argument('--port',type=int,default=5556)
+    parser.add_argument('--path',default=None,help='Unix socket, if the server uses one')
+    args=parser.parse_args()
+
+    request=json.loads(args.command) if args.command.lstrip().startswith('{') else {'cmd':args.command}
+    with command_client(args.host,args.port,args.path) as client:
+        try:
+            result=client.request(request.pop('cmd'),**request)
+            print(result if isinstance(result,str) else json.dumps(result,indent=1))
+        except command_error as error:
+            print(f'Failed: {error}')
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:39:20 2026
+
+Display. Draws the logger's sensing and control tables in its own thread, so that a slow console can't hold up
+the acquisition loop.
+
+Printing the tables (with tabulate, after converting and rounding every column) took tens of milliseconds per
+scan on Windows consoles, all of it on the event loop. With a display module in the configuration:
+    - the logger still builds its display tables on every scan, but no longer prints them
+    - the display thread picks up the latest tables at most refresh_rate times per second (2 unless given in the
+      kwargs). Any tables which arrived in between are skipped, so a slow console drops frames rather than
+      falling behind.
+    - the keylogger shows typed input in the display's footer instead of printing it itself
+
+Uses rich (live view) if it is installed, otherwise plain fixed-width text.
+"""
+import asyncio
+import re
+import sys
+import threading
+import time
+
+from modules.module import *
+
+try:
+    from rich.console import Console, Group
+    from rich.live import Live
+    from rich.table import Table
+    from rich.text import Text
+except ImportError:
+    Live=None
+
+COLUMN_WIDTH=12
+REFRESH_RATE=2 # tables drawn per second
+
+class display(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.display=self
+
+        # Logger stops printing. Its tables are read from here instead.
+        self.source=self.manager.find(kwargs['source'])
+        self.source.printing=False
+
+        self.period=1/kwargs.get('refresh_rate',REFRESH_RATE)
+        self.use_rich=kwargs.get('rich',True) and Live is not None
+
+        self.prompt=''
+        self.rendered_frame=0
+        self.frames_drawn=0
+        self.frames_skipped=0
+
+        self._stop=threading.Event()
+        self.thread=None
+
+        self.status='Startup 1'
+
+    def latest(self):
+        # The logger replaces its tables rather than changing them, so holding on to them here is safe.
+        return (self.source.frame_number,
+                self.source.dfs['disp_sensing'],
+                self.source.dfs['disp_cont'],
+                self.source.state_counter)
+
+    def format_table(self, df, decimals):
+        # Fixed-width text table. Non-numeric entries are left as they are.
+        columns=list(df.columns)
+        lines=[''.join(f'{str(column)[:COLUMN_WIDTH-1]:>{COLUMN_WIDTH}}' for column in columns)]
+        for row in df.itertuples(index=False):
+            cells=[]
+            for value in row:
+                try:
+                    cells.append(f'{float(value):>{COLUMN_WIDTH}.{decimals}f}')
+                except (TypeError,ValueError):
+                    cells.append(f'{str(value)[:COLUMN_WIDTH-1]:>{COLUMN_WIDTH}}')
+            lines.append(''.join(cells))
+        return '\n'.join(lines)
+
+    def rich_table(self, df, decimals):
+        table=Table(expand=False)
+        for column in df.columns:
+            table.add_column(str(column),justify='right',no_wrap=True)
+        for row in df.itertuples(index=False):
+            cells=[]
+            for value in row:
+                try:
+                    cells.append(f'{float(value):.{decimals}f}')
+                except (TypeError,ValueError):
+                    cells.append(str(value))
+            table.add_row(*cells)
+        return table
+
+    def footer(self, state_counter):
+        return (f' State counter: {state_counter}    Frames drawn: {self.frames_drawn}, skipped: {self.frames_skipped}'
+                f'\n > {self.prompt}')
+
+    def render_plain(self, frame):
+        _, sensing, control, state_counter=frame
+        text='\n'.join(['',self.format_table(sensing,3),'',self.format_table(control,2),'',self.footer(state_counter)])
+        # One write per frame, so the tables don't get split up by other output
+        sys.stdout.write(text+'\n')
+        sys.stdout.flush()
+
+    def render_rich(self, frame, live):
+        _, sensing, control, state_counter=frame
+        live.update(Group(self.rich_table(sensing,3),self.rich_table(control,2),Text(self.footer(state_counter))))
+
+    def run(self):
+        # Display thread. Never touches the event loop; only reads the logger's latest tables.
+        live=None
+        if self.use_rich:
+            live=Live(console=Console(),auto_refresh=False,transient=False)
+            live.start()
+
+        try:
+            while not self._stop.is_set():
+                start=time.perf_counter()
+                frame=self.latest()
+
+                if frame[0]!=self.rendered_frame:
+                    if self.rendered_frame>0:
+                        self.frames_skipped+=max(frame[0]-self.rendered_frame-1,0)
+                    self.rendered_frame=frame[0]
+
+                    if live is not None:
+                        self.render_rich(frame,live)
+                        live.refresh()
+                    else:
+                        self.render_plain(frame)
+                    self.frames_drawn+=1
+                    self.manager.tracer.record(self.name+'.render',time.perf_counter()-start)
+
+                # Refresh rate is capped. If drawing took longer than the period, wait at least one more period.
+                elapsed=time.perf_counter()-start
+                self._stop.wait(self.period-elapsed if elapsed<self.period else self.period)
+        finally:
+            if live is not None:
+                live.stop()
+
+    async def process(self):
+        try:
+            self.status='running 0'
+            if self.thread is None or not self.thread.is_alive():
+                self._stop.clear()
+                self.thread=threading.Thread(target=self.run,name='display',daemon=True)
+                self.thread.start()
+
+            # Report if the display thread dies, so the supervisor can restart it
+            while not self._shutdown.is_set() and self.thread.is_alive():
+                await asyncio.sleep(1)
+            if not self._shutdown.is_set():
+                self.status='running 2'
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        print(f'{self.name}: shutting down')
+        self._shutdown.set()
+        self._stop.set()
@@ -19,6 +19,7 @@ import re
 
 from pynput import keyboard as kb
 from modules.module import *
+from core.commands import command_error, run_command, parse_text
 
 
 class keylogger(core_module):
@@ -28,6 +29,9 @@ class keylogger(core_module):
         # Begin keyboard listener
         self.listener=kb.Listener(on_press=self.on_press)
         self.listener.start()
+        
+        # In a multi-process run, commands are sent to the control process to be carried out (see core/deployment.py)
+        self.commands=kwargs.get('commands')
 
         self.input=""
         self.old_input=""
@@ -53,10 +57,14 @@ class keylogger(core_module):
                 await asyncio.sleep(0.2)
                 
                 if self.input != self.old_input:
-                    c1='\33[45m'
-                    c2='\33[0m'
-                    print(c1+f"\r {self.input}"+c2,end="")
-                    sys.stdout.flush()
+                    if 'display' in dir(self.manager):
+                        # Shown in the display's footer, next time it draws
+                        self.manager.display.prompt=self.input
+                    else:
+                        c1='\33[45m'
+                        c2='\33[0m'
+                        print(c1+f"\r {self.input}"+c2,end="")
+                        sys.stdout.flush()
                     self.old_input=self.input
         
         except:
@@ -76,46 +84,18 @@ class keylogger(core_module):
                 c2='\33[0m'
                 self.status='processing input 0'
                 
-                # If anything has been typed which matches a predefined command, tell the manager that the command has been requested
-                if self.input == 'quit':
-                    self.manager.shutdown()
-                
-                elif self.input == 'trig':
-                    self.manager.manual_trigger()
-                    
-                elif self.input[0:3] == 'inp':
-                    value=float(self.input.split('_')[-1])
-                    self.manager.manual_input(value)
-                
-                elif self.input[0:3] == 'set':
-                    parameter=(self.input.split('_')[1])
-                    value = (self.input.split('_')[-1])
-                    self.manager.set_param(parameter, value)
-                
-                elif self.input== 'skip':
-                    self.manager.step(1)
-                    
-                elif self.input== 'fine':
-                    self.manager.toggle_fine()
-                
-                elif self.input== 'back':
-                    self.manager.step(-1)
-                
-                elif self.input == 'help':
-                    print('Welcome to the control code for flow-boiling experiments.'+
-                          ' To set controllable variables, use the format, "set_device.parameter_value".'+
-                          ' Device names can be found in the configuration dictionary or on the output table.\n'+' Can also type "trig" to trigger DAQ even if not at steady state. \n'+
-                          ' To skip ahead to the next power increment or go back, use '+
-                          'the "skip" and "back" commands.\n To safely exit the program use "quit".\n'+
-        
-                          ' The right arrow key serves in place of the enter key.\n\n'+
-                          ' Code written by Chris Salmean- open for anyone to use but '
-                          'please provide credit, share any improvements you make and '
-                          'do not use for profit.')
-                else:
+                # If anything has been typed which matches a predefined command, the manager carries it out (see core/commands.py)
+                try:
+                    if self.commands is not None:
+                        self.commands.put(parse_text(self.input))
+                    else:
+                        result=run_command(self.manager,parse_text(self.input))
+                        if self.input in ('help','status'):
+                            print(result)
+                except command_error as error:
                     c1= '\x1b[1;30;43m'
                     c2='\x1b[0m'
-                    print (c1+f'----{self.input} not a command.'+c2)
+                    print (c1+f'----{error}'+c2)
                 
                 self.input=""
                 
@@ -10,11 +10,13 @@ File logger. This module takes the experimental measurements and any errors, and
     - Unsteady state measurements
     - Configuration file
 
-- outputs table containing recent data history, for realtime monitoring in console
+- outputs table containing recent data history, for realtime monitoring in console (or, if there is a display
+  module, leaves the tables for it to draw in its own thread. See interface/display.py)
 
 @author: Chris Salmean
 """
 from modules.module import *
+from core.tracer import traced
 import pandas as pd
 import numpy as np
 import time
@@ -27,13 +29,8 @@ class datalogger(core_module):
     def __init__(self, name, manager, **kwargs):
         super().__init__(name,manager,**kwargs)
         
-        importstring='from __main__ import ' + kwargs['SS_target']
-        exec(importstring)
-        self.SS_target=eval(kwargs['SS_target'])
-        
-        importstring='from __main__ import ' + kwargs['control_target']
-        exec(importstring)
-        self.control_target=eval(kwargs['control_target'])
+        self.SS_target=self.manager.find(kwargs['SS_target'])
+        self.control_target=self.manager.find(kwargs['control_target'])
         
         self.observed_objects={}
         
@@ -49,10 +46,7 @@ class datalogger(core_module):
             df_columns[df]=[]
         
         for device,details in manager.recorded_variables.items():
-            importstring='from __main__ import '+device
-            exec(importstring)
-            
-            self.observed_objects[device]=(eval(device))
+            self.observed_objects[device]=self.manager.find(device)
             
             for mode in self.df_titles:
                 if mode in details.keys():
@@ -82,6 +76,10 @@ class datalogger(core_module):
         
         self.display_length=kwargs['display_length']
         
+        # Tables are printed here unless a display module takes over. frame_number counts new tables.
+        self.printing=kwargs.get('printing',True)
+        self.frame_number=0
+        
         self.state=self.SS_target.state
         self.state_counter=0
         self.start_time=time.time()
@@ -177,6 +175,10 @@ class datalogger(core_module):
     
             else:
                 self.dfs[title]=self.dfs['internal_memory'][self.dfs[title].columns].copy()
+        self.frame_number+=1
+        
+        if self.printing==False:
+            return
         
         # Now we print tables of the data we wish to display.
         print('\n')
@@ -264,9 +266,11 @@ class datalogger(core_module):
                 self.status= 'determining state 0'
                 self.determine_state()       
                 self.status= 'gathering 0'
-                self.gather_data()
+                with self.manager.tracer.span(self.name+'.gather_data'):
+                    self.gather_data()
                 self.status= 'extraction/display 0'
-                self.extract_dfs()
+                with self.manager.tracer.span(self.name+'.extract_dfs'):
+                    self.extract_dfs()
                 for device in self.observed_objects.values():
                     device.new_values.clear()
                 
@@ -274,7 +278,8 @@ class datalogger(core_module):
                 
         except:
             self.status=re.sub('\d','2',self.status)
-            
+    
+    @traced
     def save_to_file(self,state):
         # When set to save, this function will append the most recent batch of data to the relevant CSV
         if self.saving==True:
@@ -312,6 +317,29 @@ class datalogger(core_module):
         else:
             print('Saving disabled. Skipping')
     
+    def change_folder(self,folder_name):
+        # Save what is held so far, then carry on in a new folder (i.e. for the next point of a campaign)
+        self.save_to_file(self.state)
+        self.dfs['internal_memory']=pd.DataFrame(columns=self.dfs[
+            'internal_memory'].columns)
+        
+        self.folder_name=folder_name
+        self.filenumber=1
+        self.startup=True
+        self.create_directories()
+        print(f'Now saving to {folder_name}')
+    
+    def save_trace(self,tracer):
+        # Write stage timing histograms to the data folder, alongside the error logs
+        if self.saving==True:
+            dir_name=os.path.join(self.save_path,self.folder_name,'trace_logs')
+            if not os.path.exists(dir_name):
+                os.makedirs(dir_name)
+            
+            file_name=''.join(['trace_',time.strftime('%Y%m%d_%H%M%S'),'.json'])
+            tracer.dump(os.path.join(dir_name,file_name))
+            print(f'Saving {file_name}')
+    
     def stop(self):
         self.status= 'Stopping 0'
         print(f'{self.state} saved')
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:50 2026
+
+Ring follower. The logging and display processes' end of a multi-process run (see core/deployment.py).
+
+There are no instruments in these processes. Instead, each device of the control process has a mirror: an object
+with the same name, which holds the values of the latest scan. The follower reads new scans from the scan ring
+(see core/scan_ring.py), fills in the mirrors and sets their new_values, exactly as the sensors would, and waits
+for the logger to take them. The logger, display and keylogger therefore run unchanged.
+
+Scans are passed on one at a time, so the logging process saves every row. With latest_only (the display
+process), only the newest scan is passed on, so the tables skip ahead rather than falling behind.
+
+Messages from the control process (errors, saves, folder changes, stop) are read from the event queue in a thread
+and carried out on the event loop. When told to stop, the follower passes on any scans still in the ring, then
+shuts its own process down. It does the same if the control process disappears.
+"""
+import asyncio
+import multiprocessing
+import re
+import threading
+
+
+from modules.module import *
+from core.scan_ring import scan_ring
+
+class mirror(object):
+    # Stand-in for a device of the control process
+    def __init__(self, name, manager):
+        self.name=name
+        self.manager=manager
+        self.status='mirror 1'
+        self.manager.hardware_dict[self.name]=[self,self.status]
+
+        self.new_values=asyncio.Event()
+        self.state='USS'
+        self.first_reading_time=0
+        self.last_reading_time=0
+
+    def stop(self):
+        pass
+
+class ring_follower(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        layout=kwargs['layout']
+        self.events=kwargs['events']
+        self.latest_only=kwargs.get('latest_only',False)
+        self.poll=kwargs.get('poll',0.05)
+
+        self.ring=scan_ring(layout['ring'])
+        self.manager.recorded_variables=layout['recorded_variables']
+
+        self.mirrors={name:mirror(name,self.manager) for name in kwargs['objects']}
+        self.SS_target=self.mirrors[layout['SS_target']]
+        self.observed=[self.mirrors[device] for device in layout['recorded_variables']]
+
+        # (mirror, attribute, column in the ring)
+        self.columns=[]
+        for number, channel in enumerate(self.ring.blocks['values']):
+            device, attr=channel.split('.',1)
+            self.columns.append((self.mirrors[device],attr,number))
+
+        self.stopping=False
+        self.listener=None
+
+        self.status='Startup 1'
+
+    def listen(self):
+        # Runs in its own thread
+        while True:
+            message=self.events.get()
+            if message is None:
+                break
+            self.loop.call_soon_threadsafe(self.event,*message)
+
+    def loggers(self):
+        return [module[0] for module in self.manager.module_dict.values()
+                if 'datalogger' in module[0].__class__.__name__ and module[0].saving==True]
+
+    def event(self, kind, detail):
+        if kind=='stop':
+            self.stopping=True
+        elif kind=='error':
+            self.manager.log_error(detail)
+        elif kind=='save':
+            for logger in self.loggers():
+                logger.save_to_file(detail)
+        elif kind=='folder':
+            for logger in self.loggers():
+                if logger.folder_name!=detail:
+                    logger.change_folder(detail)
+
+    def deliver(self, scan):
+        values=scan['values'][:scan['rows']]
+        for device, attr, column in self.columns:
+            setattr(device,attr,values[:,column])
+
+        self.SS_target.state='SS' if scan['state']==1 else 'USS'
+        self.SS_target.first_reading_time, self.SS_target.last_reading_time=scan['t']
+
+        for device in self.observed:
+            device.new_values.set()
+
+    async def taken(self):
+        # Until the logger has cleared the new values
+        await asyncio.sleep(0)
+        while any(device.new_values.is_set() for device in self.observed):
+            if self._shutdown.is_set():
+                return
+            await asyncio.sleep(self.poll/10)
+
+    async def process(self):
+        try:
+            if self.listener is None:
+                self.listener=threading.Thread(target=self.listen,name=self.name+' events',daemon=True)
+                self.listener.start()
+
+            while not self._shutdown.is_set():
+                self.status='waiting 0'
+                scans=self.ring.read()
+                if len(scans)==0:
+                    if self.stopping or not multiprocessing.parent_process().is_alive():
+                        self.manager.shutdown()
+                        break
+                    await asyncio.sleep(self.poll)
+                    continue
+
+                self.status='passing on 0'
+                if self.latest_only:
+                    scans=scans[-1:]
+                for scan in scans:
+                    self.deliver(scan)
+                    await self.taken()
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        print(f'{self.name}: shutting down')
+        self._shutdown.set()
+        if self.ring.lost>0:
+            print(f'{self.name}: {self.ring.lost} scans lost')
+        self.events.put(None)
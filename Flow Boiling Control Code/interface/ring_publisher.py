@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:50 2026
+
+Ring publisher. The control process's end of a multi-process run (see core/deployment.py).
+
+    - ring_publisher takes the logger's place on the event loop: it waits for each scan, copies every recorded
+      value into the scan ring (see core/scan_ring.py) and lets the sensors carry on. Saving, the tables and
+      printing are done by the logging and display processes, from the ring, so they can't delay control.
+    - alarms, errors, folder changes and saves meant for the logger go to the other processes on their event queues
+    - commands typed into the display process's keylogger arrive on the command queue, and are carried out here
+      on the event loop (see core/commands.py). Results and errors are printed by this process.
+
+remote_datalogger stands in for the datalogger in the control process, so that the manager, checkpoints, the
+campaign and tcr_fit still find a logger with its folder and settings. Anything it is asked to do is passed on.
+"""
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from modules.module import *
+from core.commands import command_error, run_command
+from core.scan_ring import scan_ring, stack_columns
+
+class ring_publisher(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.publisher=self
+
+        self.SS_target=self.manager.find(kwargs['SS_target'])
+        self.outputs=kwargs['outputs']
+        self.commands=kwargs['commands']
+
+        # Every recorded value, in the same order as the logger's internal memory
+        self.observed_objects={}
+        channels=[]
+        for device, details in self.manager.recorded_variables.items():
+            self.observed_objects[device]=self.manager.find(device)
+            for attrs in details.values():
+                channels.extend([(device,attr) for attr in attrs])
+        self.channels=list(dict.fromkeys(channels))
+
+        # Room for the longest scan the DAQ takes
+        max_rows=kwargs.get('max_rows',max(getattr(self.SS_target,'n_sweeps',{'':1}).values()))
+        self.ring=scan_ring(blocks={'values':[device+'.'+attr for device, attr in self.channels]},
+                            max_rows=int(max_rows),capacity=kwargs.get('capacity',1000))
+        self.listener=None
+
+        self.status='Startup 1'
+
+    def layout(self):
+        # What the other processes need to know to follow the ring
+        return {'ring':self.ring.name,
+                'recorded_variables':self.manager.recorded_variables,
+                'SS_target':self.SS_target.name,
+                'objects':list(self.manager.hardware_dict)+list(self.manager.module_dict)}
+
+    def pack_values(self):
+        columns=[]
+        for device, attr in self.channels:
+            try:
+                values=np.atleast_1d(np.asarray(getattr(self.observed_objects[device],attr),dtype=float))
+            except (AttributeError,TypeError,ValueError):
+                values=np.array([np.nan])
+            columns.append(values)
+
+        return stack_columns(columns)
+
+    def publish(self):
+        self.ring.write(state=1 if self.SS_target.state=='SS' else 0,
+                        step=self.manager.controller.step_count if 'controller' in dir(self.manager) else 0,
+                        t=(self.SS_target.first_reading_time,self.SS_target.last_reading_time),
+                        values=self.pack_values())
+
+    def send(self, kind, detail=None):
+        # To every other process. Queues never block; they are emptied by a thread of their own.
+        for queue in self.outputs:
+            queue.put((kind,detail))
+
+    def listen(self):
+        # Runs in its own thread. Commands are handed over to the event loop to be carried out.
+        while True:
+            command=self.commands.get()
+            if command is None:
+                break
+            self.loop.call_soon_threadsafe(self.execute,command)
+
+    def execute(self, command):
+        try:
+            result=run_command(self.manager,command)
+            if command.get('cmd') in ('help','status'):
+                print(result)
+        except command_error as error:
+            c1= '\x1b[1;30;43m'
+            c2='\x1b[0m'
+            print (c1+f'----{error}'+c2)
+
+    async def process(self):
+        try:
+            if self.listener is None:
+                self.listener=threading.Thread(target=self.listen,name=self.name+' commands',daemon=True)
+                self.listener.start()
+
+            while not self._shutdown.is_set():
+                self.status='waiting 0'
+                for device in self.observed_objects.values():
+                    if not device.new_values.is_set():
+                        await device.new_values.wait()
+
+                self.status='publishing 0'
+                with self.manager.tracer.span(self.name+'.publish'):
+                    self.publish()
+                for device in self.observed_objects.values():
+                    device.new_values.clear()
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        # The ring itself is deleted once the other processes have finished with it (see core/deployment.py)
+        print(f'{self.name}: shutting down')
+        self._shutdown.set()
+        self.send('stop')
+        self.commands.put(None)
+
+class remote_datalogger(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+
+        self.saving=kwargs['saving']
+        self.save_path=kwargs['save_path']
+        self.folder_name=kwargs['folder_name']
+        self.filenumber=1
+        self.startup=True
+
+        self.status='Startup 1'
+
+    def send(self, kind, detail):
+        if 'publisher' in dir(self.manager):
+            self.manager.publisher.send(kind,detail)
+
+    def log_error(self, message):
+        self.send('error',message)
+
+    def save_to_file(self, state):
+        self.send('save',state)
+
+    def create_directories(self):
+        # The logging process makes the folders
+        self.send('folder',self.folder_name)
+
+    def change_folder(self, folder_name):
+        self.folder_name=folder_name
+        self.send('folder',folder_name)
+        print(f'Now saving to {folder_name}')
+
+    def save_trace(self, tracer):
+        # Stage timings are only known in this process, so they are written from here
+        if self.saving==True:
+            dir_name=os.path.join(self.save_path,self.folder_name,'trace_logs')
+            if not os.path.exists(dir_name):
+                os.makedirs(dir_name)
+
+            file_name=''.join(['trace_',time.strftime('%Y%m%d_%H%M%S'),'.json'])
+            tracer.dump(os.path.join(dir_name,file_name))
+            print(f'Saving {file_name}')
+
+    async def process(self):
+        try:
+            self.status='running 0'
+            await self._shutdown.wait()
+        except:
+            self.status=re.sub('\d','2',self.status)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:41:03 2026
+
+Telemetry publisher. Streams every scan, after the sensors have converted it, to any number of subscribers on a
+local TCP socket. Dashboards and analysis scripts can then watch a run live, in their own processes.
+
+Each message is a 4-byte little-endian length, then a payload starting with a 1-byte message type:
+    SCHEMA (0): JSON. Names of the channels ('P1.P', 'H1.T', ...) in the order they appear in each scan.
+                Sent to each subscriber when it connects, and again whenever the channels change.
+    SCAN   (1): header '<IdBHHH' (sequence, run time [s], state 0=USS/1=SS, controller step, rows, channels),
+                then rows x channels float64 values, row by row. One row per sweep; values which only
+                have one reading (i.e. setpoints) are repeated on every row.
+    EVENT  (2): JSON list [t, type, target, detail]. Alarms, errors and stalls, as sent to the error log.
+
+Scans are packed once, on the event loop, when the controller has finished with them. Each subscriber then has
+its own queue of at most queue_length messages and its own sending task. A subscriber which can't keep up
+loses its oldest messages rather than slowing anything else down; gaps show up in the sequence numbers.
+
+To watch a run from another console:
+    python -m interface.telemetry --port 5555
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from modules.module import *
+
+SCHEMA=0
+SCAN=1
+EVENT=2
+
+LENGTH=struct.Struct('<I')
+SCAN_HEADER=struct.Struct('<IdBHHH')
+
+def frame(kind, body):
+    return LENGTH.pack(len(body)+1)+bytes([kind])+body
+
+class subscriber(object):
+    # One connected client: a bounded queue and a task which sends from it
+    def __init__(self, writer, queue_length):
+        self.writer=writer
+        self.queue=deque(maxlen=queue_length)
+        self.ready=asyncio.Event()
+        self.dropped=0
+
+    def put(self, message):
+        if len(self.queue)==self.queue.maxlen:
+            self.dropped+=1
+        self.queue.append(message)
+        self.ready.set()
+
+    async def send(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while len(self.queue)>0:
+                self.writer.write(self.queue.popleft())
+                # Only waits if this subscriber's socket buffer is full. Meanwhile its queue keeps dropping the oldest.
+                await self.writer.drain()
+
+class telemetry(core_module):
+    def __init__(self, name, manager, **kwargs):
+        super().__init__(name,manager,**kwargs)
+        self.manager.telemetry=self
+
+        self.controller=self.manager.find(kwargs['controller'])
+        self.host=kwargs.get('host','127.0.0.1')
+        self.port=kwargs.get('port',5555)
+        self.queue_length=kwargs.get('queue_length',256)
+
+        self.subscribers=set()
+        self.sequence=0
+        self.channels=[]
+        self.schema=b''
+        self.server=None
+
+        self.status='Startup 1'
+
+    def find_channels(self):
+        # Every recorded variable of every device, as in the logger's SS file
+        channels=[]
+        for device, details in self.manager.recorded_variables.items():
+            for attr in details.get('SS',[]):
+                channels.append((device,attr))
+        return channels
+
+    def update_schema(self, channels):
+        self.channels=channels
+        body=json.dumps({'channels':[device+'.'+attr for device, attr in channels]}).encode()
+        self.schema=frame(SCHEMA,body)
+        self.publish(self.schema)
+
+    def pack_scan(self):
+        columns=[]
+        for device, attr in self.channels:
+            try:
+                values=np.atleast_1d(np.asarray(getattr(self.manager.find(device),attr),dtype=float))
+            except (AttributeError,KeyError,TypeError,ValueError):
+                values=np.array([np.nan])
+            columns.append(values)
+
+        rows=max([len(values) for values in columns]+[1])
+        table=np.full((rows,len(columns)),np.nan)
+        for number, values in enumerate(columns):
+            table[:len(values),number]=values
+            table[len(values):,number]=values[-1]
+
+        self.sequence+=1
+        state=1 if self.controller.state=='SS' else 0
+        header=SCAN_HEADER.pack(self.sequence,time.time()-self.manager.startup_time,state,
+                                self.controller.step_count,rows,len(columns))
+        return frame(SCAN,header+table.astype('<f8').tobytes())
+
+    def publish(self, message):
+        for client in self.subscribers:
+            client.put(message)
+
+    def event(self, message):
+        # Called by the manager for alarms and errors
+        if len(self.subscribers)>0:
+            self.publish(frame(EVENT,json.dumps([str(item) for item in message]).encode()))
+
+    async def connected(self, reader, writer):
+        client=subscriber(writer,self.queue_length)
+        if len(self.schema)>0:
+            client.put(self.schema)
+        self.subscribers.add(client)
+        print(f"Telemetry subscriber connected from {writer.get_extra_info('peername')}")
+
+        sending=asyncio.ensure_future(client.send())
+        try:
+            # Subscribers don't send anything. An empty read means they have gone.
+            await reader.read()
+        finally:
+            self.subscribers.discard(client)
+            sending.cancel()
+            writer.close()
+            print(f'Telemetry subscriber left. {client.dropped} messages dropped')
+
+    async def process(self):
+        try:
+            self.status='starting server 0'
+            if self.server is None:
+                self.server=await asyncio.start_server(self.connected,self.host,self.port)
+                print(f'Telemetry on {self.host}:{self.port}')
+
+            while not self._shutdown.is_set():
+                self.status='waiting 0'
+                await self.controller.processed.wait()
+
+                # Nothing is packed unless someone is listening
+                if len(self.subscribers)==0:
+                    continue
+
+                self.status='publishing 0'
+                with self.manager.tracer.span(self.name+'.publish'):
+                    channels=self.find_channels()
+                    if channels!=self.channels:
+                        self.update_schema(channels)
+                    self.publish(self.pack_scan())
+
+        except:
+            self.status=re.sub('\d','2',self.status)
+
+    def stop(self):
+        print(f'{self.name}: shutting down')
+        self._shutdown.set()
+        if self.server is not None:
+            self.server.close()
+        for client in self.subscribers:
+            client.writer.close()
+
+def read_messages(host='127.0.0.1', port=5555):
+    # Simple blocking subscriber. Yields ('schema', dict), ('scan', dict) and ('event', list).
+    # Scan values come as a rows x channels array, with the channel names from the latest schema.
+    with socket.create_connection((host,port)) as connection:
+        stream=connection.makefile('rb')
+        channels=[]
+        while True:
+            length=stream.read(LENGTH.size)
+            if len(length)<LENGTH.size:
+                return
+            payload=stream.read(LENGTH.unpack(length)[0])
+            kind, body=payload[0], payload[1:]
+
+            if kind==SCHEMA:
+                schema=json.loads(body)
+                channels=schema['channels']
+                yield 'schema', schema
+
+            elif kind==SCAN:
+                sequence, t, state, step, rows, columns=SCAN_HEADER.unpack(body[:SCAN_HEADER.size])
+                values=np.frombuffer(body[SCAN_HEADER.size:],dtype='<f8').reshape(rows,columns)
+                yield 'scan', {'sequence':sequence,'t':t,'state':'SS' if state==1 else 'USS','step':step,
+                               'channels':channels,'values':values}
+
+            elif kind==EVENT:
+                yield 'event', json.loads(body)
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Print telemetry from a running experiment.')
+    parser.add_argument('--host',default='127.0.0.1')
+    parser.add_argument('--port',type=int,default=5555)
+    args=parser.parse_args()
+
+    last=None
+    for kind, message in read_messages(args.host,args.port):
+        if kind=='scan':
+            if last is not None and message['sequence']!=last+1:
+                print(f"{message['sequence']-last-1} scans dropped")
+            last=message['sequence']
+            latest=dict(zip(message['channels'],message['values'][-1]))
+            print(f"#{message['sequence']} t={message['t']:.2f} {message['state']} step {message['step']}: "
+                  +', '.join(f'{channel}={value:.3g}' for channel, value in latest.items()))
+        else:
+            print(kind,message)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:35:58 2026
+
+Non-interactive launcher. Runs one or more run specifications (see config/run_spec.py) back to back, without
+the questions asked by __main__.
+
+Usage (from this folder):
+    python launcher.py runs/chip3.toml runs/chip4.json
+    python launcher.py runs/chip3.toml --check         # only validate the specifications
+    python launcher.py runs/chip3.toml --processes     # logging and display in processes of their own
+
+Every specification is checked before the first run starts, so a mistake in the last run of the queue is
+found straight away rather than hours later.
+
+Each run lasts until it is shut down (keylogger 'quit', or a 'Stop' alarm), or until its 'duration' [s] has
+passed. The next run then starts. Drivers are only imported once, so later runs start faster than the first.
+
+With --processes, each run is split over three processes (control, logging and display) joined by a scan ring in
+shared memory, so that saving and drawing tables can't delay control. See core/deployment.py.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from __init__ import *
+
+async def execute(spec, processes=False):
+    # Returns the manager once the run is over, so objects can still be found by name (man.find)
+    startup=time.perf_counter()
+    separate=None
+    if processes:
+        try:
+            separate=deployment(spec)
+        except ValueError as error:
+            print(f'{error}. Running in one process.')
+    
+    man=module_manager()
+    hardwares, modules=await build(man,spec if separate is None else separate)
+    
+    if spec.resume:
+        checkpoint=find_checkpoint(spec)
+        if checkpoint is None:
+            print(f'{spec.name}: no checkpoint found, starting from the beginning')
+        else:
+            man.checkpoint.restore(checkpoint)
+    
+    print(f'{spec.name}: started in {time.perf_counter()-startup:.2f} s '
+          f'(drivers imported in {sum(import_times.values()):.2f} s)')
+    if separate is None:
+        # Returns once every task of the run has finished
+        await run_experiment(man,hardwares,modules,duration=spec.duration)
+        return man
+    
+    separate.start(man)
+    try:
+        await run_experiment(man,hardwares,modules,duration=spec.duration)
+    finally:
+        separate.join()
+    return man
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Run flow boiling experiments from run specification files.')
+    parser.add_argument('specs',nargs='+',help='JSON, TOML or YAML run specification files, run in the order given')
+    parser.add_argument('--check',action='store_true',help='validate the specifications and exit')
+    parser.add_argument('--processes',action='store_true',help='run logging and display in separate processes')
+    args=parser.parse_args(argv)
+
+    queue=[]
+    failed=False
+    for path in args.specs:
+        try:
+            queue.extend(load_specs(path))
+        except (ValueError,OSError,ImportError) as error:
+            print(f'Invalid specification {error}')
+            failed=True
+
+    if failed:
+        return 1
+
+    print(f'{len(queue)} run(s) queued: {", ".join(spec.name for spec in queue)}')
+    if args.check:
+        return 0
+
+    for number, spec in enumerate(queue):
+        print(f'\nRun {number+1} of {len(queue)}: {spec.name}, started at {time.asctime()}')
+        # Each run gets a fresh event loop
+        asyncio.run(execute(spec,processes=args.processes))
+
+    return 0
+
+if __name__=='__main__':
+    sys.exit(main())
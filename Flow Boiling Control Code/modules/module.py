@@ -10,7 +10,12 @@ import time
 import asyncio
 from collections import defaultdict
 
+from core.supervisor import reported_status
+
 class core_module(object):
+    # Status changes are passed straight to the manager
+    status=reported_status()
+    
     def __init__(self, name, manager, **kwargs):
         self.name=name
         
@@ -21,7 +26,7 @@ class core_module(object):
         # self.is_dummy=kwargs['is_dummy']
 
         self.loop=asyncio.get_event_loop()
-        self._shutdown=asyncio.Event(loop=self.loop)
+        self._shutdown=asyncio.Event()
         
         self.status="Startup 1"
     
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# Tests import the control code the same way __main__ does, from this folder's parent
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
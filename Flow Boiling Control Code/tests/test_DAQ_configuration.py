@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+DAQ configuration (hardware/DAQ/general_DAQ.py): commands batched into compound messages, and the configuration
+cache which lets a restart skip the reset. Run against the emulated DAQ6510.
+"""
+import asyncio
+import json
+
+import pytest
+
+from core.manager import module_manager
+from hardware.DAQ.emulated_DAQ import emulated_DAQ
+from hardware.DAQ.general_DAQ import batch_commands
+from hardware.DAQ.Keithley_DAQ6510 import DAQ6510
+
+CHANNELS={101:['SENS:FUNC "VOLT:DC", (@101)','SENS:VOLT:RANG 10, (@101)'],
+          102:['SENS:FUNC "TEMP", (@102)']}
+
+class recording_DAQ(emulated_DAQ):
+    # Keeps every message written, so the resets can be counted
+    def __init__(self, address, **kwargs):
+        super().__init__(address,**kwargs)
+        self.messages=[]
+
+    def write(self, cmd):
+        self.messages.append(cmd)
+        super().write(cmd)
+
+def start(instrument, cache, channels=CHANNELS):
+    # A DAQ on the given (emulated) instrument, activated as at the start of a run
+    async def run():
+        DAQ=DAQ6510('DAQ',module_manager(),address='EMU1',method='emulated',connection=instrument,dummy=False,
+                    n_sweeps={'SS':1,'USS':1},USS_count=1,SS_count=1,config_cache=cache)
+        DAQ.configuration_strings={channel:list(commands) for channel, commands in channels.items()}
+        instrument.messages.clear()
+        DAQ.activate()
+        return DAQ
+
+    return asyncio.run(run())
+
+def resets(instrument):
+    return instrument.messages.count('*RST')
+
+def test_commands_start_from_the_root():
+    assert batch_commands(['TRAC:CLE',':FORM:ASC:PREC 6','*RST'],100)==[':TRAC:CLE;:FORM:ASC:PREC 6;*RST']
+
+@pytest.mark.parametrize('max_message, messages',[(14,[':A 1;:B 2;:C 3']),
+                                                  (13,[':A 1;:B 2',':C 3']),
+                                                  (9,[':A 1;:B 2',':C 3']),
+                                                  (8,[':A 1',':B 2',':C 3'])])
+def test_split_at_max_message(max_message, messages):
+    assert batch_commands(['A 1','B 2','C 3'],max_message)==messages
+    assert all(len(message)<=max_message for message in messages)
+
+def test_long_command_sent_on_its_own():
+    assert batch_commands(['A 1','LONG COMMAND','B 2'],8)==[':A 1',':LONG COMMAND',':B 2']
+
+def test_no_commands():
+    assert batch_commands([],100)==[]
+
+def test_restart_skips_the_reset(tmp_path):
+    instrument=recording_DAQ('EMU1')
+    cache=str(tmp_path/'config.json')
+
+    start(instrument,cache)
+    assert resets(instrument)==1
+    with open(cache) as file:
+        assert list(json.load(file))==['EMU1']
+
+    # Same configuration, instrument still set up: no reset
+    start(instrument,cache)
+    assert resets(instrument)==0
+    assert 'ABOR' in instrument.messages
+
+def test_changed_configuration_resets(tmp_path):
+    instrument=recording_DAQ('EMU1')
+    cache=str(tmp_path/'config.json')
+    start(instrument,cache)
+
+    start(instrument,cache,channels={101:CHANNELS[101]})
+    assert resets(instrument)==1
+
+def test_power_cycled_instrument_resets(tmp_path):
+    cache=str(tmp_path/'config.json')
+    start(recording_DAQ('EMU1'),cache)
+
+    # Same hash in the cache, but the instrument has no scan any more
+    instrument=recording_DAQ('EMU1')
+    start(instrument,cache)
+    assert resets(instrument)==1
+
+def test_no_cache_always_resets():
+    instrument=recording_DAQ('EMU1')
+    start(instrument,None)
+    start(instrument,None)
+    assert resets(instrument)==1
+
+def test_failed_start_is_forgotten(tmp_path):
+    instrument=recording_DAQ('EMU1')
+    cache=str(tmp_path/'config.json')
+    DAQ=start(instrument,cache)
+
+    DAQ.remember_configuration(None)
+    with open(cache) as file:
+        assert json.load(file)=={}
+
+@pytest.mark.parametrize('contents',[None,'not json'])
+def test_missing_or_corrupt_cache(tmp_path, contents):
+    cache=tmp_path/'config.json'
+    if contents is not None:
+        cache.write_text(contents)
+
+    instrument=recording_DAQ('EMU1')
+    DAQ=start(instrument,str(cache))
+    assert resets(instrument)==1
+    assert list(DAQ.read_cache())==['EMU1']
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Calibration store (core/calibration_store.py): the latest calibration of each heater is the one looked up, and
+heaters fall back on their configured coefficients.
+"""
+import importlib
+import itertools
+import os
+
+import pytest
+
+from core.calibration_store import calibration_store, chip_name, heater_coefficients
+
+# The module itself: core's star import puts the class in its place as core.calibration_store
+store_module=importlib.import_module('core.calibration_store')
+
+FIRST={'H1':{'a':0,'b':2.1,'c':-220.,'offset':0,'U_b [%]':0.3,'U_c [%]':0.1},
+       'H2':{'b':2.2,'c':-225.}}
+SECOND={'H1':{'a':0,'b':2.3,'c':-230.,'offset':0.5}}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Calibrations a second apart, so which is latest never depends on the clock
+    clock=itertools.count(1e9)
+    monkeypatch.setattr(store_module.time,'time',lambda: next(clock))
+    return calibration_store(str(tmp_path/store_module.STORE_NAME))
+
+@pytest.mark.parametrize('folder, chip',[('chip3_cal','chip3'),('chip3_fw_50ml_min','chip3'),
+                                         (os.path.join('Data','chip4_bw_30ml_min_12',''),'chip4')])
+def test_chip_name(folder, chip):
+    assert chip_name(folder)==chip
+
+def test_latest_calibration_wins(store):
+    store.write('chip3',FIRST,source='first')
+    store.write('chip3',SECOND,source='second')
+
+    assert store.lookup('chip3','H1')=={'a':0,'b':2.3,'c':-230.,'offset':0.5}
+    # Heaters which weren't calibrated again keep their last calibration, with a and offset filled in
+    assert store.lookup('chip3','H2')=={'a':0,'b':2.2,'c':-225.,'offset':0}
+
+def test_chips_are_kept_apart(store):
+    store.write('chip3',FIRST)
+    store.write('chip4',SECOND)
+    assert store.chips()==['chip3','chip4']
+    assert store.lookup('chip4','H2') is None
+    assert store.lookup('chip5','H1') is None
+
+def test_read_once_and_refreshed_by_writes(store):
+    store.write('chip3',FIRST)
+    assert store.lookup('chip3','H1')['b']==2.1
+
+    # Looked up again without going back to the file
+    os.remove(store.path)
+    assert store.lookup('chip3','H2')['b']==2.2
+
+    # A write drops what was kept
+    store.write('chip3',SECOND)
+    assert store.lookup('chip3','H1')['b']==2.3
+    assert store.lookup('chip3','H2') is None
+
+def test_no_store_yet(tmp_path):
+    store=calibration_store(str(tmp_path/'missing.sqlite'))
+    assert store.chip('chip3')=={}
+    assert store.chips()==[]
+    assert not os.path.exists(store.path)
+
+def test_heater_takes_stored_coefficients(store):
+    store.write('chip3',FIRST)
+    kwargs={'b':1.,'c':-100.,'chip':'chip3','calibration_store':store.path}
+    assert heater_coefficients('H1',kwargs)=={'a':0,'b':2.1,'c':-220.,'offset':0}
+    # Not in the store: configured coefficients
+    assert heater_coefficients('H5',kwargs)=={'b':1.,'c':-100.}
+
+def test_heater_without_chip_uses_configuration(store):
+    store.write('chip3',FIRST)
+    assert heater_coefficients('H1',{'b':1.,'c':-100.,'calibration_store':store.path})=={'b':1.,'c':-100.}
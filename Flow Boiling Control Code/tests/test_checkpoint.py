@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints (core/checkpoint.py): what is written comes back on restore, and a write which fails part way
+leaves the last checkpoint as it was.
+"""
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.checkpoint import checkpointer
+from core.manager import module_manager
+
+class fake_datalogger(object):
+    # Counted as a logger by its class name, as the real one is
+    def __init__(self, folder_name, filenumber):
+        self.folder_name=folder_name
+        self.filenumber=filenumber
+        self.saving=True
+        self.startup=True
+
+def run(path, step_count=7):
+    # A manager with one of everything a checkpoint covers. Must be called from inside the event loop.
+    manager=module_manager()
+    manager.controller=SimpleNamespace(step_count=step_count)
+    PSU=SimpleNamespace(SP=np.array([12.5]),fine=True,fine_counter=3)
+    manager.control_dict['PSU']=[PSU]
+    DAQ=SimpleNamespace(SS_bin={},state='SS',_counter=3,locked=False,USS_count=50)
+    manager.hardware_dict['DAQ']=[DAQ,'']
+    manager.sensor_dict['TC1']=SimpleNamespace(history=[20.1,20.2,20.3])
+    manager.module_dict['log']=[fake_datalogger('chip3_fw_50ml_min',4),'']
+    return manager, checkpointer(manager,warmup=10,path=str(path))
+
+def test_round_trip(tmp_path):
+    path=tmp_path/'checkpoint.json'
+
+    async def save():
+        manager, checkpoint=run(path)
+        checkpoint.write()
+
+    async def resume():
+        manager, checkpoint=run(path,step_count=0)
+        PSU=manager.control_dict['PSU'][0]
+        PSU.SP, PSU.fine, PSU.fine_counter=np.array([0.]), False, 0
+        manager.sensor_dict['TC1'].history=[]
+        manager.module_dict['log'][0].filenumber=1
+        checkpoint.restore(str(path))
+        return manager
+
+    asyncio.run(save())
+    manager=asyncio.run(resume())
+
+    assert manager.controller.step_count==7
+    PSU=manager.control_dict['PSU'][0]
+    assert PSU.SP.tolist()==[12.5]
+    assert (PSU.fine,PSU.fine_counter)==(True,3)
+    assert manager.sensor_dict['TC1'].history==[20.1,20.2,20.3]
+    logger=manager.module_dict['log'][0]
+    assert (logger.filenumber,logger.startup)==(4,False)
+
+def test_DAQ_resumes_in_USS_after_a_warm_up(tmp_path):
+    path=tmp_path/'checkpoint.json'
+
+    async def round_trip():
+        manager, checkpoint=run(path)
+        checkpoint.write()
+        checkpoint.restore(str(path))
+        return manager.hardware_dict['DAQ'][0]
+
+    DAQ=asyncio.run(round_trip())
+    assert (DAQ.state,DAQ.locked,DAQ._counter)==('USS',True,40)
+
+def test_written_whole_and_moved_into_place(tmp_path):
+    path=tmp_path/'checkpoint.json'
+
+    async def save():
+        manager, checkpoint=run(path)
+        checkpoint.write()
+        return checkpoint.last_write
+
+    assert asyncio.run(save()) is not None
+    assert os.listdir(tmp_path)==['checkpoint.json']
+    with open(path) as file:
+        assert json.load(file)['step_count']==7
+
+def test_failed_write_keeps_the_last_checkpoint(tmp_path, monkeypatch):
+    path=tmp_path/'checkpoint.json'
+
+    async def save(step_count):
+        manager, checkpoint=run(path,step_count=step_count)
+        checkpoint.write()
+
+    asyncio.run(save(7))
+
+    def broken(state, file, **kwargs):
+        file.write('{"time":')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(json,'dump',broken)
+    with pytest.raises(OSError):
+        asyncio.run(save(8))
+    monkeypatch.undo()
+
+    with open(path) as file:
+        assert json.load(file)['step_count']==7
+
+def test_nothing_written_when_disabled(tmp_path):
+    path=tmp_path/'checkpoint.json'
+
+    async def save():
+        manager, checkpoint=run(path)
+        checkpoint.enabled=False
+        checkpoint.write()
+
+    asyncio.run(save())
+    assert not path.exists()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Operator commands (core/commands.py) and the command server which takes them as JSON
+(interface/command_server.py).
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.commands import command_error, parse_text, run_command
+from core.manager import module_manager
+from interface.command_server import command_client, command_server
+
+class stand_in_controller(object):
+    def __init__(self, manager):
+        self.name='cont'
+        self.state='USS'
+        self.step_count=2
+        self.processed=asyncio.Event()
+        self.changes=[]
+        self.manager=manager
+
+    def change_attribute(self, device, attribute, value):
+        self.changes.append((device,attribute,value))
+        setattr(self.manager.find(device),attribute,np.array([value]))
+
+def rig():
+    # A PSU and a pump to set, and a pressure sensor to read. Must be called from inside the event loop.
+    manager=module_manager()
+    manager.controller=stand_in_controller(manager)
+    manager.module_dict['cont']=[manager.controller,'waiting 0']
+    for name in ('PSU','PUMP'):
+        device=SimpleNamespace(name=name,SP=np.array([0.]))
+        manager.hardware_dict[name]=[device,'waiting 0']
+        manager.control_dict[name]=[device]
+    manager.hardware_dict['P1']=[SimpleNamespace(name='P1',P=[1.25]),'waiting 0']
+    manager.recorded_variables['P1']={'SS':['P']}
+    return manager
+
+@pytest.mark.parametrize('text, command',[('set_PSU_20',{'cmd':'set','parameter':'PSU','value':'20'}),
+                                          ('set_PUMP.SP_50',{'cmd':'set','parameter':'PUMP.SP','value':'50'}),
+                                          ('inp_3',{'cmd':'inp','value':'3'}),
+                                          ('skip',{'cmd':'skip'})])
+def test_parse_text(text, command):
+    assert parse_text(text)==command
+
+def test_parse_incomplete_set():
+    with pytest.raises(command_error):
+        parse_text('set_PSU')
+
+def test_set_and_get():
+    async def run():
+        manager=rig()
+        changed=run_command(manager,{'cmd':'set','parameter':'PSU','value':'20'})
+        return changed, run_command(manager,{'cmd':'get','parameters':['PSU','P1','P1.P']})
+
+    changed, values=asyncio.run(run())
+    assert changed=={'PSU.SP':20.}
+    assert values=={'PSU.SP':[20.],'P1.P':[1.25]}
+
+def test_batch_is_all_or_nothing():
+    async def run():
+        manager=rig()
+        with pytest.raises(command_error):
+            run_command(manager,{'cmd':'batch','set':{'PSU':20,'PUMP':'fast'}})
+        unchanged=list(manager.controller.changes)
+        run_command(manager,{'cmd':'batch','set':{'PSU':20,'PUMP.SP':50}})
+        return unchanged, manager.controller.changes
+
+    unchanged, changes=asyncio.run(run())
+    assert unchanged==[]
+    assert changes==[('PSU','SP',20.),('PUMP','SP',50.)]
+
+@pytest.mark.parametrize('command',[{'cmd':'flow'},
+                                    {'cmd':'get'},
+                                    {'cmd':'get','parameter':'H9'},
+                                    {'cmd':'get','parameter':'P1.T'},
+                                    {'cmd':'set','parameter':'H9','value':1},
+                                    {'cmd':'batch','set':{}}])
+def test_refused(command):
+    async def run():
+        run_command(rig(),command)
+
+    with pytest.raises(command_error):
+        asyncio.run(run())
+
+def test_status():
+    async def run():
+        return run_command(rig(),{'cmd':'status'})
+
+    status=asyncio.run(run())
+    assert status['PSU']=='waiting 0'
+    assert (status['step_count'],status['state'])==(2,'USS')
+
+def test_server_replies():
+    async def run():
+        manager=rig()
+        server=command_server('cmds',manager,controller='cont')
+        client=SimpleNamespace(subscriptions=[])
+        replies=[server.handle(client,line) for line in
+                 ('not json','[1]','{"id": 1, "cmd": "flow"}','{"id": 2, "cmd": "subscribe", "parameters": ["P1"]}')]
+        return replies, client.subscriptions
+
+    (bad, listed, unknown, subscribed), subscriptions=asyncio.run(run())
+    assert not bad['ok'] and not listed['ok']
+    assert unknown=={'id':1,'ok':False,'error':'flow not a command.'}
+    assert subscribed=={'id':2,'ok':True,'result':{'P1.P':[1.25]}}
+    assert subscriptions==['P1']
+
+def test_client_and_server():
+    async def run():
+        manager=rig()
+        server=command_server('cmds',manager,controller='cont',port=0)
+        task=asyncio.create_task(server.process())
+        while server.server is None:
+            await asyncio.sleep(0.01)
+        port=server.server.sockets[0].getsockname()[1]
+
+        def script():
+            # Blocking, as a script would be
+            with command_client(port=port) as client:
+                changed=client.request('batch',set={'PSU':20,'PUMP':50})
+                try:
+                    client.request('set',parameter='H9',value=1)
+                except command_error as error:
+                    refused=str(error)
+                return changed, refused
+
+        result=await asyncio.get_running_loop().run_in_executor(None,script)
+        server.stop()
+        task.cancel()
+        return result
+
+    changed, refused=asyncio.run(run())
+    assert changed=={'PSU.SP':20.,'PUMP.SP':50.}
+    assert 'H9' in refused
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Scan ring (core/scan_ring.py): scans written and read back through the sequence counters, scans split over several
+slots, and readers which fall behind or catch the writer part way through a slot.
+"""
+import importlib
+from itertools import islice
+
+import numpy as np
+import pytest
+
+from core.scan_ring import scan_ring
+
+ring_module=importlib.import_module('core.scan_ring')
+
+@pytest.fixture
+def rings(monkeypatch):
+    # A writer and a reader of it, in this process. The reader is opened as one of our own processes would, so it
+    # leaves the ring registered for the writer to delete.
+    monkeypatch.setattr(ring_module.multiprocessing,'parent_process',lambda: object())
+    writer=scan_ring(None,blocks={'values':['T','P']},max_rows=2,capacity=4)
+    reader=scan_ring(writer.name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+def scan(value, rows=2):
+    return np.full((rows,2),float(value))
+
+def test_round_trip(rings):
+    writer, reader=rings
+    assert writer.write(state=1,step=3,t=(10.,10.5),values=[[1.,2.],[3.,4.]])==1
+
+    assert reader.latest()==1
+    record=reader.copy(1)
+    assert (record['scan'],record['rows'],record['state'],record['step'])==(1,2,1,3)
+    assert record['t'].tolist()==[10.,10.5]
+    assert record['values'].tolist()==[[1.,2.],[3.,4.]]
+    assert reader.sequence[0]==2
+
+def test_fewer_rows_than_the_slot(rings):
+    writer, reader=rings
+    writer.write(values=scan(5,rows=1))
+    record=reader.copy(1)
+    assert record['rows']==1
+    assert record['values'][:record['rows']].tolist()==[[5.,5.]]
+
+def test_long_scan_takes_several_slots(rings):
+    writer, reader=rings
+    # Five sweeps into slots of two rows: three slots, the times spread between the first and last readings
+    values=np.arange(10.).reshape(5,2)
+    assert writer.write(t=(0.,4.),values=values)==3
+
+    records=reader.read()
+    assert [record['rows'] for record in records]==[2,2,1]
+    assert [record['t'].tolist() for record in records]==[[0.,1.],[2.,3.],[4.,4.]]
+    assert np.concatenate([record['values'][:record['rows']] for record in records]).tolist()==values.tolist()
+
+def test_slot_being_written_is_not_read(rings):
+    writer, reader=rings
+    writer.write(values=scan(1))
+    # The writer has started on scan 5, in the same slot as scan 1
+    writer.sequence[0]=2*5-1
+    assert reader.get(1) is None and reader.copy(1) is None
+    assert reader.read()==[]
+    assert reader.lost==1
+
+def test_reader_behind_loses_the_oldest(rings):
+    writer, reader=rings
+    for number in range(1,7):
+        writer.write(values=scan(number))
+
+    records=reader.read()
+    assert [record['scan'] for record in records]==[3,4,5,6]
+    assert [record['values'][0,0] for record in records]==[3.,4.,5.,6.]
+    assert reader.lost==2
+    assert reader.get(2) is None
+
+    # Only new scans are read next time
+    writer.write(values=scan(7))
+    assert [record['scan'] for record in reader.read()]==[7]
+    assert reader.lost==2
+
+def test_new_reader_starts_from_the_oldest(rings):
+    writer, reader=rings
+    for number in range(1,7):
+        writer.write(values=scan(number))
+
+    late=scan_ring(writer.name)
+    assert late.position==2
+    assert [record['scan'] for record in late.read()]==[3,4,5,6]
+    assert late.lost==0
+    late.close()
+
+def test_follow(rings):
+    writer, reader=rings
+    for number in range(1,4):
+        writer.write(values=scan(number))
+
+    followed=reader.follow()
+    assert [record['scan'] for record in islice(followed,3)]==[1,2,3]
+
+    # Scan 4 is overwritten while the caller still has it
+    writer.write(values=scan(4))
+    record=next(followed)
+    assert record['scan']==4
+    for number in range(5,9):
+        writer.write(values=scan(number))
+    assert next(followed)['scan']==5
+    assert reader.lost==1
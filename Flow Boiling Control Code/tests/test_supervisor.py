@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Supervisor (core/supervisor.py): status reports and crashes reaching its queue, the back-off between restarts
+and the restart budget.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.manager import module_manager
+from core.supervisor import reported_status, supervisor
+
+class device(object):
+    status=reported_status()
+
+    def __init__(self, name, manager):
+        self.name=name
+        self.manager=manager
+        self._shutdown=asyncio.Event()
+
+def stand_in_manager():
+    # Only what the supervisor uses
+    alarms=[]
+    manager=SimpleNamespace(_shutdown=asyncio.Event(),tasks=[],alarms=alarms,
+                            alarm=lambda obj, alarm_type, action: alarms.append((obj.name,alarm_type,action)))
+    return manager
+
+def restart_delays(sup, obj, restarts):
+    # Delays the supervisor would wait before each restart. Restarts aren't actually run.
+    delays=[]
+    sup.restart=lambda obj, delay: delays.append(delay)
+    sup.spawn=lambda coroutine: coroutine
+    for _ in range(restarts):
+        sup.schedule_restart(obj)
+        sup.restarting.discard(obj.name)
+    return delays
+
+def test_error_status_is_queued():
+    async def run():
+        manager=module_manager()
+        obj=device('PSU',manager)
+        manager.hardware_dict['PSU']=[obj,'']
+
+        obj.status='setting 0'
+        obj.status='setting 1'
+        assert manager.supervisor.queue.empty()
+        assert manager.hardware_dict['PSU'][1]=='setting 1'
+
+        obj.status='setting 2'
+        return manager.supervisor.queue.get_nowait()
+
+    obj, event, detail=asyncio.run(run())
+    assert (obj.name,event,detail)==('PSU','error','setting 2')
+
+def test_unchanged_status_is_not_reported_again():
+    async def run():
+        manager=module_manager()
+        obj=device('PSU',manager)
+        obj.status='setting 2'
+        obj.status='setting 2'
+        return manager.supervisor.queue.qsize()
+
+    assert asyncio.run(run())==1
+
+def test_nothing_queued_during_shutdown():
+    async def run():
+        manager=module_manager()
+        obj=device('PSU',manager)
+        obj._shutdown.set()
+        obj.status='setting 2'
+        return manager.supervisor.queue.qsize()
+
+    assert asyncio.run(run())==0
+
+def test_crash_is_queued():
+    async def run():
+        sup=supervisor(stand_in_manager())
+        obj=SimpleNamespace(name='DAQ',_shutdown=asyncio.Event())
+
+        async def broken():
+            raise RuntimeError('lost connection')
+
+        await sup.guarded(obj,broken())
+        return sup.queue.get_nowait()
+
+    obj, event, detail=asyncio.run(run())
+    assert event=='crash'
+    assert 'lost connection' in detail
+
+def test_finishing_after_shutdown_is_not_a_crash():
+    async def run():
+        sup=supervisor(stand_in_manager())
+        obj=SimpleNamespace(name='DAQ',_shutdown=asyncio.Event())
+        obj._shutdown.set()
+
+        async def finished():
+            pass
+
+        await sup.guarded(obj,finished())
+        return sup.queue.qsize()
+
+    assert asyncio.run(run())==0
+
+def test_back_off_doubles_up_to_the_limit():
+    sup=supervisor(stand_in_manager(),max_restarts=10,base_delay=0.5,max_delay=4)
+    obj=SimpleNamespace(name='PSU')
+    assert restart_delays(sup,obj,6)==[0.5,1,2,4,4,4]
+
+def test_gives_up_once_the_budget_is_used():
+    manager=stand_in_manager()
+    sup=supervisor(manager,max_restarts=3,exhausted_action='Stop')
+    obj=SimpleNamespace(name='PSU')
+
+    assert len(restart_delays(sup,obj,4))==3
+    assert 'PSU' in sup.abandoned
+    assert manager.alarms==[('PSU','restart budget','Stop')]
+
+def test_restarts_outside_the_window_are_forgotten():
+    sup=supervisor(stand_in_manager(),max_restarts=3,window=300,base_delay=0.5)
+    obj=SimpleNamespace(name='PSU')
+    restart_delays(sup,obj,3)
+
+    # As if the first two restarts were more than a window ago
+    history=sup.history['PSU']
+    history[0]-=1000
+    history[1]-=1000
+
+    assert restart_delays(sup,obj,1)==[1]
+    assert 'PSU' not in sup.abandoned
+
+@pytest.mark.parametrize('status',['','running 0','done 1'])
+def test_status_reads_back(status):
+    obj=device('PSU',None)
+    obj.status=status
+    assert obj.status==status
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Running TCR fit (core/tcr_fit.py): one weighted point per block, against a weighted least-squares fit of the block
+means done in one go.
+"""
+import numpy as np
+import pytest
+
+from core.tcr_fit import running_fit
+
+def blocks(rng, readings=50, offset=0.):
+    # Heater R [ohm] and oven T [degC] at five oven temperatures, the spread of T differing from block to block
+    R=offset+np.array([100.,104.,108.,112.,116.])
+    T=2.5*(R-offset)-230+rng.normal(0,0.05,5)
+    spreads=np.array([0.02,0.05,0.1,0.05,0.2])
+    return [(R_i+rng.normal(0,0.01,readings),T_i+rng.normal(0,spread,readings))
+            for R_i, T_i, spread in zip(R,T,spreads)]
+
+def weighted_fit(data, resolution=1e-3):
+    # Straight WLS through the block means, weighted by the inverse variance of each mean T
+    x=np.array([np.mean(R) for R, T in data])
+    y=np.array([np.mean(T) for R, T in data])
+    w=np.array([1/max(np.var(T,ddof=1)/len(T),resolution**2) for R, T in data])
+
+    x_mean=np.sum(w*x)/np.sum(w)
+    y_mean=np.sum(w*y)/np.sum(w)
+    sxx=np.sum(w*(x-x_mean)**2)
+    m=np.sum(w*(x-x_mean)*(y-y_mean))/sxx
+    c=y_mean-m*x_mean
+    s2=np.sum(w*(y-m*x-c)**2)/(len(x)-2)
+    return m, c, np.sqrt(s2/sxx), np.sqrt(s2*(1/np.sum(w)+x_mean**2/sxx))
+
+def running(data, **kwargs):
+    fit=running_fit(**kwargs)
+    for R, T in data:
+        # In a few scans, as the run would give them
+        for R_scan, T_scan in zip(np.array_split(R,5),np.array_split(T,5)):
+            fit.add(R_scan,T_scan)
+        fit.end_block()
+    return fit
+
+@pytest.mark.parametrize('offset',[0.,1e4])
+def test_matches_weighted_least_squares(offset):
+    data=blocks(np.random.default_rng(1),offset=offset)
+    assert running(data).fit()==pytest.approx(weighted_fit(data),rel=1e-6)
+
+def test_one_point_per_block():
+    # Ten times the readings at the same temperatures: still five points, so the errors hardly change
+    few=running(blocks(np.random.default_rng(2),readings=20))
+    many=running(blocks(np.random.default_rng(2),readings=200))
+    assert (few.n,many.n)==(5,5)
+    assert many.fit()[2]==pytest.approx(few.fit()[2],rel=0.5)
+
+def test_identical_readings_get_the_resolution_weight():
+    fit=running_fit(resolution=0.01)
+    fit.add([100.]*10,[20.]*10)
+    fit.end_block()
+    assert fit.w==pytest.approx(1e4)
+
+def test_needs_three_blocks():
+    data=blocks(np.random.default_rng(3))
+    assert np.isnan(running(data[:2]).fit()).all()
+    assert not np.isnan(running(data[:3]).fit()).any()
+
+def test_readings_need_not_line_up():
+    # Fewer resistance readings than temperatures, and a NaN, in a block
+    fit=running_fit()
+    fit.add([100.,np.nan],[20.,20.2,20.4])
+    fit.end_block()
+    assert (fit.x0,fit.y0)==(100.,pytest.approx(20.2))
+
+def test_state_round_trip():
+    data=blocks(np.random.default_rng(4))
+    first=running(data[:3])
+    second=running_fit()
+    second.restore(first.state())
+
+    for R, T in data[3:]:
+        first.add(R,T)
+        first.end_block()
+        second.add(R,T)
+        second.end_block()
+    assert second.fit()==first.fit()
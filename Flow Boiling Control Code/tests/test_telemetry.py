@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetry (interface/telemetry.py): the message format, a slow subscriber's queue, and a run followed by a local
+subscriber with read_messages.
+"""
+import asyncio
+from itertools import islice
+from types import SimpleNamespace
+
+import numpy as np
+
+from core.manager import module_manager
+from interface import telemetry as tel
+
+def publisher(**kwargs):
+    # Telemetry for a pressure sensor (one reading per sweep) and a PSU setpoint. Must be called from inside the
+    # event loop.
+    manager=module_manager()
+    controller=SimpleNamespace(name='cont',state='SS',step_count=3,processed=asyncio.Event())
+    manager.module_dict['cont']=[controller,'']
+    manager.hardware_dict['P1']=[SimpleNamespace(name='P1',P=[1.0,1.5,2.0]),'']
+    manager.hardware_dict['PSU']=[SimpleNamespace(name='PSU',SP=np.array([12.])),'']
+    manager.recorded_variables={'P1':{'SS':['P']},'PSU':{'SS':['SP']}}
+    return tel.telemetry('tel',manager,controller='cont',**kwargs)
+
+def unpack(message):
+    length=tel.LENGTH.unpack(message[:tel.LENGTH.size])[0]
+    payload=message[tel.LENGTH.size:]
+    assert len(payload)==length
+    return payload[0], payload[1:]
+
+def test_scan_message():
+    async def run():
+        telemetry=publisher()
+        telemetry.update_schema(telemetry.find_channels())
+        return telemetry.channels, telemetry.pack_scan()
+
+    channels, message=asyncio.run(run())
+    assert channels==[('P1','P'),('PSU','SP')]
+
+    kind, body=unpack(message)
+    assert kind==tel.SCAN
+    sequence, t, state, step, rows, columns=tel.SCAN_HEADER.unpack(body[:tel.SCAN_HEADER.size])
+    assert (sequence,state,step,rows,columns)==(1,1,3,3,2)
+    values=np.frombuffer(body[tel.SCAN_HEADER.size:],dtype='<f8').reshape(rows,columns)
+    # The setpoint has one value, repeated on every row
+    assert values.tolist()==[[1.0,12.],[1.5,12.],[2.0,12.]]
+
+def test_slow_subscriber_loses_the_oldest():
+    client=tel.subscriber(None,queue_length=2)
+    for message in (b'1',b'2',b'3'):
+        client.put(message)
+    assert list(client.queue)==[b'2',b'3']
+    assert client.dropped==1
+
+def test_local_subscriber():
+    async def run():
+        telemetry=publisher(port=0)
+        task=asyncio.create_task(telemetry.process())
+        while telemetry.server is None:
+            await asyncio.sleep(0.01)
+        port=telemetry.server.sockets[0].getsockname()[1]
+
+        loop=asyncio.get_running_loop()
+        received=loop.run_in_executor(None,lambda: list(islice(tel.read_messages('127.0.0.1',port),3)))
+        while len(telemetry.subscribers)==0:
+            await asyncio.sleep(0.01)
+
+        # The controller has finished with a scan
+        telemetry.controller.processed.set()
+        telemetry.controller.processed.clear()
+        await asyncio.sleep(0.05)
+        telemetry.event([1.5,'Alarm','H1','Stop'])
+
+        messages=await asyncio.wait_for(received,5)
+        telemetry.stop()
+        task.cancel()
+        return messages
+
+    (schema_kind, schema), (scan_kind, scan), (event_kind, event)=asyncio.run(run())
+    assert schema_kind=='schema' and schema['channels']==['P1.P','PSU.SP']
+    assert scan_kind=='scan'
+    assert (scan['sequence'],scan['state'],scan['step'])==(1,'SS',3)
+    assert scan['channels']==['P1.P','PSU.SP']
+    assert scan['values'][:,0].tolist()==[1.0,1.5,2.0]
+    assert event_kind=='event' and event==['1.5','Alarm','H1','Stop']
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Thermocouple conversion (hardware/DAQ/thermocouples.py), against the NIST ITS-90 reference tables, and the
+host-side conversion of TC sensors in 'voltage' mode.
+
+Run from the control code folder:
+    python -m pytest tests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from hardware.DAQ import thermocouples
+from hardware.DAQ.phys_sensors import TC, PT100
+from core.manager import module_manager
+
+# (type, T [degC], E [mV]) from the NIST tables, reference junction at 0 degC
+TABLE=[('T',100,4.279),
+       ('T',200,9.288),
+       ('K',1000,41.276),
+       ('J',500,27.393),
+       ('E',-100,-5.237)]
+
+# Range [degC] of each type's inverse polynomials, and their error against the tables [degC]
+INVERSE={'T':((-200,400),0.04),
+         'J':((-210,1200),0.05),
+         'K':((-200,1372),0.06),
+         'E':((-200,1000),0.03)}
+
+@pytest.mark.parametrize('tc_type, T, E',TABLE)
+def test_emf_matches_table(tc_type, T, E):
+    assert thermocouples.emf(tc_type,T)==pytest.approx(E,abs=5e-4)
+
+@pytest.mark.parametrize('tc_type, T, E',TABLE)
+def test_temperature_matches_table(tc_type, T, E):
+    assert thermocouples.temperature(tc_type,E)==pytest.approx(T,abs=INVERSE[tc_type][1])
+
+@pytest.mark.parametrize('tc_type',sorted(INVERSE))
+def test_round_trip_within_inverse_error(tc_type):
+    (low, high), error=INVERSE[tc_type]
+    T=np.linspace(low,high,2001)
+    back=thermocouples.temperature(tc_type,thermocouples.emf(tc_type,T))
+    assert not np.isnan(back).any()
+    assert np.max(np.abs(back-T))<=error
+
+def test_whole_arrays_keep_their_shape():
+    T=np.array([[0,25],[50,100]])
+    assert thermocouples.emf('T',T).shape==(2,2)
+    assert thermocouples.temperature('T',thermocouples.emf('T',T))==pytest.approx(T,abs=0.04)
+
+@pytest.mark.parametrize('tc_type, T',[('T',-300),('T',401),('J',1201),('K',1373),('E',1001)])
+def test_emf_outside_range_is_nan(tc_type, T):
+    assert np.isnan(thermocouples.emf(tc_type,T))
+
+@pytest.mark.parametrize('tc_type, E',[('T',-5.7),('T',21),('J',70),('K',55),('E',-9),('E',77)])
+def test_temperature_outside_range_is_nan(tc_type, E):
+    assert np.isnan(thermocouples.temperature(tc_type,E))
+
+def test_unknown_type():
+    with pytest.raises(ValueError):
+        thermocouples.emf('X',25)
+
+def sensors(**kwargs):
+    # A PT100 and a TC on a stand-in DAQ. Must be called from inside the event loop.
+    manager=module_manager()
+    DAQ=SimpleNamespace(name='DAQ',channel_dict={},SS_bin={},n_sweeps={'USS':1},configuration_strings={})
+    manager.hardware_dict['DAQ']=[DAQ,'']
+    common={'DAQ_type':'DAQ6510','DAQ':'DAQ','alarms':[],'SS':False,'SP':0,'nplc':1,'settling_time':0}
+    reference=PT100('PT',manager,channel=101,**common)
+    thermocouple=TC('TC',manager,channel=102,mode='voltage',**common,**kwargs)
+    return reference, thermocouple
+
+def measured(tc_type, T, T_ref):
+    # Voltage [V] the DAQ reads with the junction at T and the terminals at T_ref
+    return list((thermocouples.emf(tc_type,T)-thermocouples.emf(tc_type,T_ref))/1e3)
+
+def test_reference_junction_top_up():
+    async def run():
+        reference, thermocouple=sensors(reference='PT')
+        reference.T=np.array([24.9,25.1])
+        reference.processed.set()
+        thermocouple.signal=measured('T',np.array([60.,120.]),25.)
+        await thermocouple.process_data()
+        return thermocouple.T
+
+    assert asyncio.run(run())==pytest.approx([60,120],abs=0.05)
+
+def test_fixed_reference_temperature():
+    async def run():
+        reference, thermocouple=sensors(reference_T=22.,tc_type='K')
+        thermocouple.signal=measured('K',np.array([300.]),22.)
+        await thermocouple.process_data()
+        return thermocouple.T
+
+    assert asyncio.run(run())==pytest.approx([300],abs=0.06)
+
+def test_waits_for_reference_of_the_same_scan():
+    async def run():
+        reference, thermocouple=sensors(reference='PT')
+        reference.T=np.array([0.])
+        thermocouple.signal=measured('T',np.array([80.]),30.)
+
+        task=asyncio.create_task(thermocouple.process_data())
+        await asyncio.sleep(0.01)
+        assert not task.done()
+
+        reference.T=np.array([30.])
+        reference.processed.set()
+        await task
+        return thermocouple.T
+
+    assert asyncio.run(run())==pytest.approx([80],abs=0.05)
+
+def test_voltage_mode_needs_a_reference():
+    async def run():
+        sensors()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Timer (core/timer.py): deadlines after an overrun with either policy, free-running with an interval of 0, and
+waiting for the DAQ to be done with a trigger.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.manager import module_manager
+from core.timer import timer
+
+def periodic(interval=1., **kwargs):
+    # A timer and the DAQ it triggers. Must be called from inside the event loop.
+    manager=module_manager()
+    DAQ=SimpleNamespace(name='DAQ',state='USS',triggered=asyncio.Event(),trigger_cleared=asyncio.Event())
+    manager.hardware_dict['DAQ']=[DAQ,'']
+    tim=timer('tim',manager,target='DAQ',SS_target='DAQ',mode='periodic',intervals={'SS':interval,'USS':interval},
+              **kwargs)
+    tim.interval=interval
+    return tim, DAQ
+
+def deadline_after(tim, deadline, now):
+    # Next deadline, as worked out at loop time 'now'
+    tim.loop=SimpleNamespace(time=lambda: now)
+    tim.deadline=deadline
+    return tim.next_deadline()
+
+def test_on_time():
+    async def run():
+        tim, DAQ=periodic()
+        return deadline_after(tim,10.,10.2), tim.overruns
+
+    assert asyncio.run(run())==(11.,0)
+
+def test_skip_drops_missed_deadlines():
+    async def run():
+        tim, DAQ=periodic()
+        # Woke up at 14.5: 11, 12 and 13 are dropped, and 14 is sent now
+        return deadline_after(tim,10.,14.5), tim.overruns, tim.skipped
+
+    assert asyncio.run(run())==(14.,1,3)
+
+def test_catch_up_keeps_the_last_few():
+    async def run():
+        tim, DAQ=periodic(overrun_policy='catch_up',max_catch_up=2)
+        return deadline_after(tim,10.,14.5), tim.overruns, tim.skipped
+
+    # 11, 12 and 13 missed: 12 and 13 are sent straight away, 11 is dropped
+    assert asyncio.run(run())==(12.,1,1)
+
+def test_free_running_has_no_grid():
+    async def run():
+        tim, DAQ=periodic(interval=0)
+        return deadline_after(tim,10.,14.5), tim.overruns
+
+    assert asyncio.run(run())==(14.5,0)
+
+def test_negative_interval_refused():
+    async def run():
+        periodic(interval=-1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+def test_unknown_policy_refused():
+    async def run():
+        periodic(overrun_policy='later')
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+def test_busy_DAQ_drops_the_trigger():
+    async def run():
+        tim, DAQ=periodic()
+        DAQ.triggered.set()
+        tim.fire(tim.loop.time())
+        return tim.overruns, tim.skipped
+
+    assert asyncio.run(run())==(1,1)
+
+def test_free_running_waits_for_the_DAQ():
+    async def run():
+        tim, DAQ=periodic(interval=0)
+        task=asyncio.create_task(tim.process())
+
+        # Triggered straight away, then not again until the DAQ has cleared the trigger
+        await asyncio.sleep(0.01)
+        assert DAQ.triggered.is_set()
+        DAQ.triggered.clear()
+        await asyncio.sleep(0.01)
+        assert not DAQ.triggered.is_set()
+
+        DAQ.trigger_cleared.set()
+        await asyncio.sleep(0.01)
+        triggered_again=DAQ.triggered.is_set()
+
+        tim.stop()
+        DAQ.trigger_cleared.set()
+        await asyncio.wait_for(task,1)
+        return triggered_again
+
+    assert asyncio.run(run())
+
+def test_catch_up_gives_up_after_one_interval():
+    async def run():
+        tim, DAQ=periodic(interval=0.05,overrun_policy='catch_up')
+        DAQ.triggered.set()
+        start=tim.loop.time()
+        await tim.wait_for_target()
+        return tim.loop.time()-start
+
+    assert asyncio.run(run())==pytest.approx(0.05,abs=0.03)